@@ -4,10 +4,11 @@ FastAPI dependencies for Mellow AI Service
 
 from fastapi import Depends
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
 
-# Re-export the database dependency for convenience
+# Re-export the database dependencies for convenience
 get_database = get_db
+get_async_database = get_async_db
 
 # Additional dependencies can be added here as needed
 # For example: authentication, rate limiting, etc. 
\ No newline at end of file
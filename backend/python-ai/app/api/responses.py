@@ -0,0 +1,23 @@
+"""
+Response classes for Mellow AI Service
+"""
+
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+
+class FastJSONResponse(Response):
+    """
+    JSON response rendered with orjson
+
+    Returned directly from a route, it skips response_model validation and
+    the standard json encoder, so list endpoints can hand over plain rows.
+    orjson writes datetimes in the same ISO 8601 form as isoformat().
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        """Serialize the content to JSON bytes"""
+        return orjson.dumps(content)
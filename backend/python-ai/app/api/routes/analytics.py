@@ -2,55 +2,144 @@
 Analytics routes for Mellow AI Service
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
 from sqlalchemy.orm import Session
 
 from app.models.schemas import AnalyticsResponse
 from app.api.dependencies import get_database
+from app.services.analytics_cache import analytics_cache
+from app.services.analytics_jobs import JOB_KINDS, analytics_worker
 from app.services.analytics_service import AnalyticsService
 
 router = APIRouter()
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against a result's ETag (weak comparison)
+    
+    Args:
+        if_none_match: Header value sent by the client, if any
+        etag: ETag of the current result
+        
+    Returns:
+        True if the client already has the current result
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+def _not_modified(etag: str) -> Response:
+    """Build an empty 304 response for a result the client already has"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+def _set_cache_headers(response: Response, etag: str) -> None:
+    """Let clients revalidate results with If-None-Match"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+
+def _analytics_with_topics(db: Session) -> dict:
+    """
+    Combine live conversation counts with the latest topics snapshot
+    
+    Topic extraction scans the full history, so it is never run in the
+    request: until the first snapshot exists the topic lists are empty.
+    
+    Args:
+        db: Database session
+        
+    Returns:
+        Dictionary matching AnalyticsResponse
+    """
+    analytics_data = AnalyticsService.get_conversation_counts(db)
+    snapshot = analytics_worker.snapshot("topics")
+    if snapshot is None:
+        analytics_data.update(common_topics=[], common_phrases=[], topics_as_of=None)
+    else:
+        analytics_data.update(snapshot.value, topics_as_of=snapshot.as_of.isoformat())
+    return analytics_data
+
 @router.get("/analytics", response_model=AnalyticsResponse)
-async def get_analytics(db: Session = Depends(get_database)):
+async def get_analytics(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_database)
+):
     """
     Get conversation analytics
     
     Args:
+        response: Response used to set the ETag header
+        if_none_match: ETag of the result the client already has
         db: Database session
         
     Returns:
         Analytics data including conversation counts and common topics
+        (or 304 Not Modified if the client's copy is current)
     """
     try:
-        analytics_data = AnalyticsService.get_conversation_analytics(db)
-        
-        return AnalyticsResponse(
-            total_conversations=analytics_data["total_conversations"],
-            recent_conversations=analytics_data["recent_conversations"],
-            common_topics=analytics_data["common_topics"]
+        analytics_data, etag = analytics_cache.get_or_compute(
+            analytics_cache.make_key("analytics"),
+            lambda: _analytics_with_topics(db)
         )
+        if _etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+        _set_cache_headers(response, etag)
+        
+        return AnalyticsResponse(**analytics_data)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analytics error: {str(e)}")
 
+# Longest window served as an hourly series
+MAX_HOURLY_DAYS = 31
+
 @router.get("/analytics/trends")
-async def get_conversation_trends(days: int = 7, db: Session = Depends(get_database)):
+async def get_conversation_trends(
+    response: Response,
+    days: int = 7,
+    tz: str = "UTC",
+    interval: str = "day",
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_database)
+):
     """
     Get conversation trends over specified period
     
     Args:
+        response: Response used to set the ETag header
         days: Number of days to analyze (default: 7)
+        tz: IANA time zone the days are counted in (default: UTC)
+        interval: "day" or "hour" (default: day)
+        if_none_match: ETag of the result the client already has
         db: Database session
         
     Returns:
-        Trend data for the specified period
+        Zero-filled trend data for the specified period
+        (or 304 Not Modified if the client's copy is current)
     """
     try:
         if days < 1 or days > 365:
             raise HTTPException(status_code=400, detail="Days must be between 1 and 365")
-            
-        trends_data = AnalyticsService.get_conversation_trends(db, days)
+        if interval not in ("day", "hour"):
+            raise HTTPException(status_code=400, detail="Interval must be 'day' or 'hour'")
+        if interval == "hour" and days > MAX_HOURLY_DAYS:
+            raise HTTPException(status_code=400, detail=f"Hourly trends cover at most {MAX_HOURLY_DAYS} days")
+        
+        try:
+            trends_data, etag = analytics_cache.get_or_compute(
+                analytics_cache.make_key("trends", days=days, tz=tz, interval=interval),
+                lambda: AnalyticsService.get_conversation_trends(db, days, tz=tz, interval=interval)
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if _etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+        _set_cache_headers(response, etag)
         return trends_data
     
     except HTTPException:
@@ -59,19 +148,88 @@ async def get_conversation_trends(days: int = 7, db: Session = Depends(get_datab
         raise HTTPException(status_code=500, detail=f"Analytics error: {str(e)}")
 
 @router.get("/analytics/insights")
-async def get_message_insights(db: Session = Depends(get_database)):
+async def get_message_insights(
+    response: Response,
+    if_none_match: Optional[str] = Header(None)
+):
     """
     Get insights about message patterns and characteristics
     
     Args:
-        db: Database session
+        response: Response used to set the ETag header
+        if_none_match: ETag of the result the client already has
         
     Returns:
         Message insights including length analysis and emotion distribution
+        from the latest snapshot, with its "as_of" time
+        (or 304 Not Modified if the client's copy is current)
     """
     try:
-        insights_data = AnalyticsService.get_message_insights(db)
+        snapshot = analytics_worker.snapshot("insights")
+        if snapshot is None:
+            # Not computed yet: start a refresh and serve empty insights meanwhile
+            analytics_worker.refresh(["insights"])
+            insights_data = {
+                "average_message_length": 0,
+                "total_analyzed": 0,
+                "emotion_distribution": {},
+                "as_of": None
+            }
+        else:
+            insights_data = {**snapshot.value, "as_of": snapshot.as_of.isoformat()}
+        
+        etag = analytics_cache.make_etag(insights_data)
+        if _etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+        _set_cache_headers(response, etag)
         return insights_data
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Analytics error: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Analytics error: {str(e)}")
+
+@router.post("/analytics/refresh", status_code=202)
+async def refresh_analytics(kind: str = "all"):
+    """
+    Recompute analytics snapshots in the background
+    
+    Args:
+        kind: "topics", "insights" or "all" (default: all)
+        
+    Returns:
+        The started jobs (a job already running for a kind is returned instead
+        of starting another); poll /analytics/jobs/{job_id} for their status
+    """
+    if kind != "all" and kind not in JOB_KINDS:
+        raise HTTPException(status_code=400, detail=f"Kind must be 'all' or one of: {', '.join(JOB_KINDS)}")
+    
+    jobs = analytics_worker.refresh(JOB_KINDS if kind == "all" else [kind])
+    return {"jobs": [job.to_dict() for job in jobs]}
+
+@router.get("/analytics/jobs")
+async def get_analytics_jobs():
+    """
+    Get recent analytics jobs
+    
+    Returns:
+        Recent jobs (newest first) and the worker's counters
+    """
+    return {
+        "jobs": [job.to_dict() for job in analytics_worker.jobs()],
+        "worker": analytics_worker.stats()
+    }
+
+@router.get("/analytics/jobs/{job_id}")
+async def get_analytics_job(job_id: int):
+    """
+    Get the status of one analytics job
+    
+    Args:
+        job_id: ID returned by /analytics/refresh
+        
+    Returns:
+        Job status
+    """
+    job = analytics_worker.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
\ No newline at end of file
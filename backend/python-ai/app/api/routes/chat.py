@@ -2,25 +2,46 @@
 Chat routes for Mellow AI Service
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+from datetime import datetime
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
-from app.models.schemas import ChatRequest, ChatResponse, ConversationResponse
-from app.api.dependencies import get_database
+from app.models.schemas import (
+    BatchChatRequest, BatchChatResponse, BatchChatResult,
+    ChatRequest, ChatResponse, ConversationResponse, ConversationSearchResult
+)
+from app.api.dependencies import get_database, get_async_database
+from app.api.responses import FastJSONResponse
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, SessionLocal
 from app.services.ai_service import AIService
+from app.services.archive_service import conversation_archiver
 from app.services.conversation_service import ConversationService
+from app.services.memory_service import conversation_memory
+from app.services.search_service import SearchService
+from app.services.summary_service import conversation_summarizer
+from app.services.write_behind import write_behind
 
 router = APIRouter()
 
 @router.post("/generate-response", response_model=ChatResponse)
-async def generate_response(chat_request: ChatRequest, db: Session = Depends(get_database)):
+async def generate_response(chat_request: ChatRequest, db: AsyncSession = Depends(get_async_database)):
     """
     Generate AI response to user message
     
+    Database access and the Gemini call are both awaited, so a slow model
+    call never stalls the event loop for other requests.
+    
     Args:
         chat_request: The chat request containing the user message
-        db: Database session
+        db: Async database session
         
     Returns:
         AI-generated response
@@ -29,35 +50,312 @@ async def generate_response(chat_request: ChatRequest, db: Session = Depends(get
         user_message = chat_request.message.lower().strip()
 
         # Get recent conversation context (last 5 conversations)
-        recent_conversations = ConversationService.get_conversation_context(db, limit=5)
+        recent_conversations = await ConversationService.get_conversation_context_async(
+            db, limit=5, user_id=chat_request.user_id, session_id=chat_request.session_id
+        )
+        summary = await conversation_summarizer.get_summary_async(db, chat_request.user_id)
+        memories = await conversation_memory.recall_async(
+            db, chat_request.user_id, user_message, exclude=[turn.id for turn in recent_conversations]
+        )
 
         # Generate a contextual response
-        ai_response = AIService.generate_contextual_response(user_message, recent_conversations)
+        ai_response = await AIService.generate_contextual_response_async(
+            user_message, recent_conversations, summary, memories
+        )
         
-        # Save the conversation to database
-        ConversationService.save_conversation(db, chat_request.message, ai_response)
+        # Save the conversation to database (queued for a batched write when write-behind is on)
+        queued = settings.WRITE_BEHIND_ENABLED and write_behind.enqueue(
+            chat_request.message, ai_response,
+            user_id=chat_request.user_id, session_id=chat_request.session_id
+        )
+        if not queued:
+            await ConversationService.save_conversation_async(
+                db, chat_request.message, ai_response,
+                user_id=chat_request.user_id, session_id=chat_request.session_id
+            )
 
         return ChatResponse(response=ai_response)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating response: {str(e)}")
 
+@router.post("/generate-response/batch", response_model=BatchChatResponse)
+async def generate_response_batch(batch_request: BatchChatRequest, db: AsyncSession = Depends(get_async_database)):
+    """
+    Generate AI responses to many messages of one user/session at once
+    
+    Context is fetched once for the whole batch, model calls run
+    concurrently (at most BATCH_PARALLELISM at a time) and all successful
+    turns are saved in one bulk insert.
+    
+    Args:
+        batch_request: The messages plus the user/session they belong to
+        db: Async database session
+        
+    Returns:
+        Per-message results (response and conversation ID, or error) in input order
+    """
+    if len(batch_request.messages) > settings.BATCH_MAX_MESSAGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch may contain at most {settings.BATCH_MAX_MESSAGES} messages"
+        )
+    
+    try:
+        recent_conversations = await ConversationService.get_conversation_context_async(
+            db, limit=5, user_id=batch_request.user_id, session_id=batch_request.session_id
+        )
+        summary = await conversation_summarizer.get_summary_async(db, batch_request.user_id)
+        recent_ids = [turn.id for turn in recent_conversations]
+        
+        parallelism = asyncio.Semaphore(settings.BATCH_PARALLELISM)
+        recall_lock = asyncio.Lock()
+        
+        async def generate(message: str) -> str:
+            if not message.strip():
+                raise ValueError("Message is empty")
+            user_message = message.lower().strip()
+            # The shared session cannot run statements concurrently
+            async with recall_lock:
+                memories = await conversation_memory.recall_async(
+                    db, batch_request.user_id, user_message, exclude=recent_ids
+                )
+            async with parallelism:
+                return await AIService.generate_contextual_response_async(
+                    user_message, recent_conversations, summary, memories
+                )
+        
+        outcomes = await asyncio.gather(
+            *(generate(message) for message in batch_request.messages),
+            return_exceptions=True
+        )
+        
+        saved = [
+            (index, batch_request.messages[index], outcome)
+            for index, outcome in enumerate(outcomes)
+            if not isinstance(outcome, BaseException)
+        ]
+        conversation_ids = await ConversationService.save_conversation_batch_async(
+            db, [(message, ai_response) for _, message, ai_response in saved],
+            user_id=batch_request.user_id, session_id=batch_request.session_id
+        )
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating responses: {str(e)}")
+    
+    results = [
+        BatchChatResult(index=index, error=str(outcome))
+        if isinstance(outcome, BaseException)
+        else BatchChatResult(index=index, response=outcome)
+        for index, outcome in enumerate(outcomes)
+    ]
+    for (index, _, _), conversation_id in zip(saved, conversation_ids):
+        results[index].conversation_id = conversation_id
+    
+    return BatchChatResponse(results=results, succeeded=len(saved), failed=len(results) - len(saved))
+
+def _format_sse(event: str, data: dict) -> str:
+    """Format a single Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/generate-response/stream")
+async def generate_response_stream(chat_request: ChatRequest):
+    """
+    Stream AI response to user message as Server-Sent Events
+    
+    Emits "token" events with partial text as the model produces it, a
+    "reset" event if the model fails partway and the fallback response
+    replaces the partial text, and a final "done" event once the full
+    response has been saved.
+    
+    Args:
+        chat_request: The chat request containing the user message
+        
+    Returns:
+        A text/event-stream response
+    """
+    user_message = chat_request.message.lower().strip()
+
+    async def event_stream():
+        # The session is opened here rather than injected, because the
+        # request dependencies are torn down before the body is streamed
+        async with AsyncSessionLocal() as db:
+            try:
+                recent_conversations = await ConversationService.get_conversation_context_async(
+                    db, limit=5, user_id=chat_request.user_id, session_id=chat_request.session_id
+                )
+                summary = await conversation_summarizer.get_summary_async(db, chat_request.user_id)
+                memories = await conversation_memory.recall_async(
+                    db, chat_request.user_id, user_message, exclude=[turn.id for turn in recent_conversations]
+                )
+
+                chunks = []
+                async for event, text in AIService.stream_contextual_response(
+                    user_message, recent_conversations, summary, memories
+                ):
+                    if event == "reset":
+                        chunks = []
+                        yield _format_sse("reset", {})
+                    else:
+                        chunks.append(text)
+                        yield _format_sse("token", {"text": text})
+
+                ai_response = "".join(chunks).strip()
+                conversation_id = None
+                queued = settings.WRITE_BEHIND_ENABLED and write_behind.enqueue(
+                    chat_request.message, ai_response,
+                    user_id=chat_request.user_id, session_id=chat_request.session_id
+                )
+                if not queued:
+                    conversation = await ConversationService.save_conversation_async(
+                        db, chat_request.message, ai_response,
+                        user_id=chat_request.user_id, session_id=chat_request.session_id
+                    )
+                    conversation_id = conversation.id
+
+                yield _format_sse("done", {"response": ai_response, "conversation_id": conversation_id})
+
+            except Exception as e:
+                yield _format_sse("error", {"detail": f"Error generating response: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Largest page a client may request from /conversations
+MAX_PAGE_SIZE = 1000
+
 @router.get("/conversations", response_model=List[ConversationResponse])
-async def get_conversations(limit: int = 10, db: Session = Depends(get_database)):
+async def get_conversations(
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    preview_chars: Optional[int] = None,
+    db: Session = Depends(get_database)
+):
     """
-    Get recent conversations
+    Get recent conversations, newest first
+    
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the
+    next page; the header is absent on the last page. Rows are serialized
+    straight to JSON with orjson (response_model only documents the shape).
     
     Args:
         limit: Maximum number of conversations to return
+        cursor: Cursor from the previous page's X-Next-Cursor header
+        preview_chars: Only return the first this many characters of each message
         db: Database session
         
     Returns:
         List of recent conversations
     """
     try:
-        conversations = ConversationService.get_recent_conversations(db, limit=limit)
-        return ConversationService.format_conversations_for_response(conversations)
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            raise HTTPException(status_code=400, detail=f"Limit must be between 1 and {MAX_PAGE_SIZE}")
+        if preview_chars is not None and preview_chars < 1:
+            raise HTTPException(status_code=400, detail="preview_chars must be at least 1")
+        
+        try:
+            rows, next_cursor = ConversationService.get_conversation_rows_page(
+                db, limit=limit, cursor=cursor, preview_chars=preview_chars
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        response = FastJSONResponse(ConversationService.format_conversation_rows(rows))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return response
     
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+@router.get("/conversations/export")
+async def export_conversations(since: Optional[datetime] = None, until: Optional[datetime] = None):
+    """
+    Export conversations as newline-delimited JSON, oldest first
+    
+    Rows are written straight from a server-side database cursor, so
+    memory use stays flat however large the export is.
+    
+    Args:
+        since: Only include conversations at or after this time
+        until: Only include conversations before this time
+        
+    Returns:
+        An application/x-ndjson streaming response
+    """
+    def ndjson_lines():
+        # Runs in the threadpool; owns its session because the request
+        # dependencies are torn down before the body is streamed
+        db = SessionLocal()
+        try:
+            for row in ConversationService.iter_conversation_rows(db, since=since, until=until):
+                yield orjson.dumps(row) + b"\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        ndjson_lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=conversations.ndjson"}
+    )
+
+@router.get("/conversations/search", response_model=List[ConversationSearchResult])
+async def search_conversations(
+    response: Response,
+    q: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    user_id: Optional[int] = None,
+    db: Session = Depends(get_database)
+):
+    """
+    Search conversations by text, best match first
+    
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the
+    next page; the header is absent on the last page.
+    
+    Args:
+        response: Response used to set the pagination header
+        q: Search text
+        limit: Maximum number of results to return
+        cursor: Cursor from the previous page's X-Next-Cursor header
+        user_id: Only search this user's conversations
+        db: Database session
+        
+    Returns:
+        List of matching conversations with their rank
+    """
+    try:
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            raise HTTPException(status_code=400, detail=f"Limit must be between 1 and {MAX_PAGE_SIZE}")
+        if not q.strip():
+            raise HTTPException(status_code=400, detail="Search text cannot be empty")
+        
+        try:
+            results, next_cursor = SearchService.search(db, q, limit=limit, cursor=cursor, user_id=user_id)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return [
+            ConversationSearchResult(
+                id=conversation.id,
+                user_message=conversation.user_message,
+                ai_response=conversation.ai_response,
+                timestamp=conversation.timestamp.isoformat(),
+                rank=rank
+            )
+            for conversation, rank in results
+        ]
+    
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
@@ -66,6 +364,9 @@ async def get_conversation(conversation_id: int, db: Session = Depends(get_datab
     """
     Get a specific conversation by ID
     
+    Conversations in archived partitions are read back from their archive
+    file (read-only: they cannot be deleted through the API).
+    
     Args:
         conversation_id: The conversation ID
         db: Database session
@@ -76,7 +377,21 @@ async def get_conversation(conversation_id: int, db: Session = Depends(get_datab
     try:
         conversation = ConversationService.get_conversation_by_id(db, conversation_id)
         if not conversation:
-            raise HTTPException(status_code=404, detail="Conversation not found")
+            archive_files = conversation_archiver.archive_files_for(db, conversation_id)
+            archived = None
+            if archive_files:
+                # Decompressing and scanning the file is blocking work
+                archived = await asyncio.to_thread(
+                    conversation_archiver.read_archived, archive_files, conversation_id
+                )
+            if archived is None:
+                raise HTTPException(status_code=404, detail="Conversation not found")
+            return ConversationResponse(
+                id=archived["id"],
+                user_message=archived["user_message"],
+                ai_response=archived["ai_response"],
+                timestamp=archived["timestamp"]
+            )
         
         return ConversationResponse(
             id=conversation.id,
@@ -4,7 +4,8 @@ Health check routes for Mellow AI Service
 
 from fastapi import APIRouter
 from app.models.schemas import HealthResponse
-from app.core.database import test_connection
+from app.core.database import health_probe, get_pool_stats
+from app.services.service_stats import collect_service_stats
 
 router = APIRouter()
 
@@ -13,11 +14,25 @@ async def health_check():
     """
     Health check endpoint
     
-    Returns the status of the service and database connection
+    Returns the status of the service and database connection. The
+    database status comes from a background-refreshed probe, so this
+    endpoint does not take a connection from the pool.
     """
-    db_status = test_connection()
+    db_status = health_probe.is_connected()
     return HealthResponse(
         status="healthy" if db_status else "unhealthy",
         database="connected" if db_status else "disconnected",
-        service="python-ai"
-    ) 
\ No newline at end of file
+        service="python-ai",
+        checked_at=health_probe.checked_at.isoformat() if health_probe.checked_at else None,
+        pool=get_pool_stats()
+    ) 
+
+@router.get("/health/components")
+async def component_stats():
+    """
+    In-process component statistics
+    
+    Returns the counters of every registered cache, queue and background
+    worker (see app.services.service_stats), keyed by component name
+    """
+    return collect_service_stats()
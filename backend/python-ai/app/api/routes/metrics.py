@@ -0,0 +1,78 @@
+"""
+Metrics routes for Mellow AI Service
+"""
+
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from app.core.database import get_pool_stats
+from app.services.service_stats import SERVICE_STATS
+
+router = APIRouter()
+
+class ServiceStatsCollector:
+    """Exposes the registered service counters (caches, queues) and the pools as metrics"""
+
+    def collect(self):
+        cache = SERVICE_STATS["response_cache"]()
+        for name in ("hits", "misses", "evictions", "expirations"):
+            yield CounterMetricFamily(
+                f"mellow_response_cache_{name}", f"Response cache {name}", value=cache[name]
+            )
+        yield GaugeMetricFamily("mellow_response_cache_entries", "Cached responses", value=cache["size"])
+
+        store = SERVICE_STATS["context_store"]()
+        for name in ("hits", "misses", "evictions"):
+            yield CounterMetricFamily(
+                f"mellow_context_store_{name}", f"Context store {name}", value=store[name]
+            )
+        yield GaugeMetricFamily("mellow_context_store_keys", "Users/sessions in the context store", value=store["keys"])
+        yield GaugeMetricFamily("mellow_context_store_bytes", "Approximate context store size", value=store["bytes"])
+
+        memory = SERVICE_STATS["memory"]()
+        yield GaugeMetricFamily("mellow_memory_users", "Users with a loaded memory index", value=memory["users"])
+        yield GaugeMetricFamily("mellow_memory_turns", "Turns in loaded memory indexes", value=memory["turns"])
+        yield GaugeMetricFamily("mellow_memory_bytes", "Approximate memory index size", value=memory["bytes"])
+        for name in ("recalls", "recalled_turns", "loads", "evictions"):
+            yield CounterMetricFamily(
+                f"mellow_memory_{name}", f"Memory {name.replace('_', ' ')}", value=memory[name]
+            )
+
+        writes = SERVICE_STATS["write_behind"]()
+        yield GaugeMetricFamily("mellow_write_behind_queue_depth", "Conversations waiting to be written", value=writes["queue_depth"])
+        yield GaugeMetricFamily("mellow_write_behind_last_flush_seconds", "Duration of the last write-behind flush", value=writes["last_flush_seconds"])
+        for name in ("flushed", "failed_flushes", "dropped"):
+            yield CounterMetricFamily(
+                f"mellow_write_behind_{name}", f"Write-behind {name.replace('_', ' ')}", value=writes[name]
+            )
+
+        scheduler = SERVICE_STATS["scheduler"]()
+        yield GaugeMetricFamily("mellow_model_scheduler_in_flight", "Model calls in flight", value=scheduler["in_flight"])
+        yield GaugeMetricFamily("mellow_model_scheduler_waiting", "Model calls waiting to start", value=scheduler["waiting"])
+        yield CounterMetricFamily("mellow_model_scheduler_rate_limited", "Rate-limit errors from the model API", value=scheduler["rate_limited"])
+
+        checked_out = GaugeMetricFamily("mellow_db_pool_checked_out", "Connections checked out", labels=["engine"])
+        overflow = GaugeMetricFamily("mellow_db_pool_overflow", "Overflow connections open", labels=["engine"])
+        max_wait = GaugeMetricFamily("mellow_db_pool_max_wait_seconds", "Longest pool checkout wait", labels=["engine"])
+        timeouts = CounterMetricFamily("mellow_db_pool_timeouts", "Pool checkout timeouts", labels=["engine"])
+        for engine_name, pool in get_pool_stats().items():
+            checked_out.add_metric([engine_name], pool.get("checked_out", 0))
+            overflow.add_metric([engine_name], pool.get("overflow", 0))
+            max_wait.add_metric([engine_name], pool.get("max_wait_ms", 0.0) / 1000)
+            timeouts.add_metric([engine_name], pool.get("timeouts", 0))
+        yield checked_out
+        yield overflow
+        yield max_wait
+        yield timeouts
+
+REGISTRY.register(ServiceStatsCollector())
+
+@router.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics endpoint
+    
+    Returns all metrics in the Prometheus text exposition format
+    """
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,70 @@
+"""
+Background task helpers for Mellow AI Service
+"""
+
+import asyncio
+import inspect
+import logging
+from typing import Callable, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class PeriodicTask:
+    """
+    Runs a job on a fixed interval for the lifetime of the application
+
+    Coroutine functions are awaited on the event loop; plain functions are
+    run in a worker thread so blocking work (e.g. synchronous SQLAlchemy)
+    never stalls request handling.
+    """
+
+    def __init__(self, name: str, interval_seconds: float, func: Callable, run_immediately: bool = False):
+        """
+        Initialize the periodic task
+
+        Args:
+            name: Name used in log messages
+            interval_seconds: Seconds to wait between runs
+            func: Function or coroutine function to run
+            run_immediately: Run once right after start instead of waiting one interval
+        """
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self.run_immediately = run_immediately
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the task on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        """Cancel the task and wait for it to finish"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self) -> None:
+        """Run the job once, logging instead of raising on failure"""
+        try:
+            if inspect.iscoroutinefunction(self.func):
+                await self.func()
+            else:
+                await asyncio.to_thread(self.func)
+        except Exception as e:
+            logger.error(f"Background task '{self.name}' failed: {str(e)}")
+
+    async def _run(self) -> None:
+        """Task loop"""
+        if not self.run_immediately:
+            await asyncio.sleep(self.interval_seconds)
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval_seconds)
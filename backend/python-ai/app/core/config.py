@@ -19,6 +19,16 @@ class Settings:
     DB_USER: str = os.getenv('DB_USER', 'mellow_user')
     DB_PASSWORD: str = os.getenv('DB_PASSWORD', 'mellow_password')
     
+    # Database connection pool settings
+    DB_POOL_SIZE: int = int(os.getenv('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW: int = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_TIMEOUT: int = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+    DB_POOL_RECYCLE: int = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    DB_POOL_PRE_PING: bool = os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true'
+    # Server-side statement timeout in milliseconds (0 disables it)
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '0'))
+    HEALTH_PROBE_INTERVAL_SECONDS: float = float(os.getenv('HEALTH_PROBE_INTERVAL_SECONDS', '5'))
+    
     # Application settings
     APP_TITLE: str = "Mellow AI Service"
     APP_VERSION: str = "1.0.0"
@@ -33,11 +43,115 @@ class Settings:
     GEMINI_MODEL: str = os.getenv('GEMINI_MODEL', 'gemini-2.0-flash')
     GEMINI_MAX_TOKENS: int = int(os.getenv('GEMINI_MAX_TOKENS', '8000'))
     GEMINI_TEMPERATURE: float = float(os.getenv('GEMINI_TEMPERATURE', '0.7'))
+    # Share one model call between concurrent requests with an identical prompt
+    GEMINI_COALESCE_REQUESTS: bool = os.getenv('GEMINI_COALESCE_REQUESTS', 'True').lower() == 'true'
+    
+    # Chat response latency budget
+    # Longest wait for Gemini before the static response is used (0 waits indefinitely)
+    CHAT_DEADLINE_SECONDS: float = float(os.getenv('CHAT_DEADLINE_SECONDS', '20'))
+    # When a call counts as slow (0 uses the rolling p95 of recent responses)
+    CHAT_SLOW_AFTER_SECONDS: float = float(os.getenv('CHAT_SLOW_AFTER_SECONDS', '0'))
+    # What to do about a slow call: "hedge", "fallback" or "none"
+    CHAT_SLOW_ACTION: str = os.getenv('CHAT_SLOW_ACTION', 'hedge')
+    CHAT_LATENCY_WINDOW: int = int(os.getenv('CHAT_LATENCY_WINDOW', '200'))
+    CHAT_LATENCY_MIN_SAMPLES: int = int(os.getenv('CHAT_LATENCY_MIN_SAMPLES', '20'))
+    
+    # Batch generation settings
+    BATCH_MAX_MESSAGES: int = int(os.getenv('BATCH_MAX_MESSAGES', '100'))
+    BATCH_PARALLELISM: int = int(os.getenv('BATCH_PARALLELISM', '4'))
+    
+    # Prompt builder settings (estimated tokens)
+    PROMPT_INPUT_TOKEN_BUDGET: int = int(os.getenv('PROMPT_INPUT_TOKEN_BUDGET', '4000'))
+    PROMPT_MAX_MESSAGE_TOKENS: int = int(os.getenv('PROMPT_MAX_MESSAGE_TOKENS', '2000'))
+    PROMPT_MAX_TURN_TOKENS: int = int(os.getenv('PROMPT_MAX_TURN_TOKENS', '400'))
+    PROMPT_MAX_HISTORY_TURNS: int = int(os.getenv('PROMPT_MAX_HISTORY_TURNS', '3'))
+    PROMPT_MAX_SUMMARY_TOKENS: int = int(os.getenv('PROMPT_MAX_SUMMARY_TOKENS', '400'))
+    PROMPT_MAX_MEMORY_TOKENS: int = int(os.getenv('PROMPT_MAX_MEMORY_TOKENS', '600'))
+    
+    # Rolling conversation summary settings
+    SUMMARY_ENABLED: bool = os.getenv('SUMMARY_ENABLED', 'True').lower() == 'true'
+    # "local" (deterministic extractive summary) or "gemini"
+    SUMMARY_BACKEND: str = os.getenv('SUMMARY_BACKEND', 'local')
+    SUMMARY_TRIGGER_TURNS: int = int(os.getenv('SUMMARY_TRIGGER_TURNS', '10'))
+    SUMMARY_KEEP_RECENT_TURNS: int = int(os.getenv('SUMMARY_KEEP_RECENT_TURNS', '3'))
+    SUMMARY_MAX_TURNS_PER_RUN: int = int(os.getenv('SUMMARY_MAX_TURNS_PER_RUN', '50'))
+    SUMMARY_MAX_CHARS: int = int(os.getenv('SUMMARY_MAX_CHARS', '1500'))
+    SUMMARY_CACHE_SIZE: int = int(os.getenv('SUMMARY_CACHE_SIZE', '10000'))
+
+    # Retrieval of relevant past turns (local hashing embedder + IVF vector index)
+    RAG_ENABLED: bool = os.getenv('RAG_ENABLED', 'True').lower() == 'true'
+    RAG_TOP_K: int = int(os.getenv('RAG_TOP_K', '3'))
+    RAG_MIN_SCORE: float = float(os.getenv('RAG_MIN_SCORE', '0.1'))
+    RAG_EMBEDDING_DIM: int = int(os.getenv('RAG_EMBEDDING_DIM', '256'))
+    RAG_MAX_TURNS_PER_USER: int = int(os.getenv('RAG_MAX_TURNS_PER_USER', '2000'))
+    RAG_MAX_BYTES: int = int(os.getenv('RAG_MAX_BYTES', str(64 * 1024 * 1024)))
+    RAG_IVF_TRAIN_THRESHOLD: int = int(os.getenv('RAG_IVF_TRAIN_THRESHOLD', '1024'))
+    RAG_IVF_NPROBE: int = int(os.getenv('RAG_IVF_NPROBE', '8'))
+    
+    # Gemini call scheduler settings (quota limits of 0 disable that limit)
+    GEMINI_MAX_CONCURRENCY: int = int(os.getenv('GEMINI_MAX_CONCURRENCY', '8'))
+    GEMINI_REQUESTS_PER_MINUTE: float = float(os.getenv('GEMINI_REQUESTS_PER_MINUTE', '0'))
+    GEMINI_TOKENS_PER_MINUTE: float = float(os.getenv('GEMINI_TOKENS_PER_MINUTE', '0'))
+    GEMINI_QUEUE_MAX: int = int(os.getenv('GEMINI_QUEUE_MAX', '100'))
+    GEMINI_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv('GEMINI_QUEUE_TIMEOUT_SECONDS', '10'))
+    GEMINI_RATE_LIMIT_RETRIES: int = int(os.getenv('GEMINI_RATE_LIMIT_RETRIES', '1'))
+    # Output tokens assumed per call when reserving tokens-per-minute budget
+    GEMINI_EXPECTED_OUTPUT_TOKENS: int = int(os.getenv('GEMINI_EXPECTED_OUTPUT_TOKENS', '512'))
+    
+    # Response cache settings
+    RESPONSE_CACHE_ENABLED: bool = os.getenv('RESPONSE_CACHE_ENABLED', 'True').lower() == 'true'
+    RESPONSE_CACHE_SIZE: int = int(os.getenv('RESPONSE_CACHE_SIZE', '1024'))
+    RESPONSE_CACHE_TTL_SECONDS: int = int(os.getenv('RESPONSE_CACHE_TTL_SECONDS', '3600'))
+    # Also cache turns that carry prior conversation context (off: only context-free openers are cached)
+    RESPONSE_CACHE_CONTEXT_TURNS: bool = os.getenv('RESPONSE_CACHE_CONTEXT_TURNS', 'False').lower() == 'true'
+    
+    # Analytics result cache settings (results are also invalidated by conversation writes)
+    ANALYTICS_CACHE_ENABLED: bool = os.getenv('ANALYTICS_CACHE_ENABLED', 'True').lower() == 'true'
+    ANALYTICS_CACHE_SIZE: int = int(os.getenv('ANALYTICS_CACHE_SIZE', '256'))
+    ANALYTICS_CACHE_TTL_SECONDS: int = int(os.getenv('ANALYTICS_CACHE_TTL_SECONDS', '60'))
+    
+    # Conversation context store settings
+    CONTEXT_STORE_TURNS: int = int(os.getenv('CONTEXT_STORE_TURNS', '5'))
+    CONTEXT_STORE_MAX_KEYS: int = int(os.getenv('CONTEXT_STORE_MAX_KEYS', '10000'))
+    CONTEXT_STORE_MAX_BYTES: int = int(os.getenv('CONTEXT_STORE_MAX_BYTES', str(64 * 1024 * 1024)))
+    
+    # Write-behind persistence settings
+    WRITE_BEHIND_ENABLED: bool = os.getenv('WRITE_BEHIND_ENABLED', 'False').lower() == 'true'
+    WRITE_BEHIND_BATCH_SIZE: int = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', '100'))
+    WRITE_BEHIND_FLUSH_INTERVAL_MS: int = int(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL_MS', '200'))
+    WRITE_BEHIND_MAX_QUEUE: int = int(os.getenv('WRITE_BEHIND_MAX_QUEUE', '10000'))
+    
+    # Analytics settings
+    ROLLUP_RECONCILE_INTERVAL_SECONDS: int = int(os.getenv('ROLLUP_RECONCILE_INTERVAL_SECONDS', '3600'))
+    # UTC days (today included) each reconcile checks; 0 checks the full history
+    ROLLUP_RECONCILE_DAYS: int = int(os.getenv('ROLLUP_RECONCILE_DAYS', '2'))
+    TOPIC_EXTRACTION_CHUNK_SIZE: int = int(os.getenv('TOPIC_EXTRACTION_CHUNK_SIZE', '5000'))
+    TOPIC_INCLUDE_BIGRAMS: bool = os.getenv('TOPIC_INCLUDE_BIGRAMS', 'True').lower() == 'true'
+    # Background analytics snapshots (topics and insights are served from the latest snapshot)
+    ANALYTICS_WORKERS: int = int(os.getenv('ANALYTICS_WORKERS', '1'))
+    ANALYTICS_SNAPSHOT_INTERVAL_SECONDS: int = int(os.getenv('ANALYTICS_SNAPSHOT_INTERVAL_SECONDS', '300'))
+    ANALYTICS_JOB_HISTORY: int = int(os.getenv('ANALYTICS_JOB_HISTORY', '50'))
+    
+    # Conversation partition maintenance and archival settings (Postgres, partitioned table only)
+    PARTITION_MAINTENANCE_INTERVAL_SECONDS: int = int(os.getenv('PARTITION_MAINTENANCE_INTERVAL_SECONDS', '86400'))
+    # Monthly partitions kept created ahead of the current month
+    PARTITION_PREMAKE_MONTHS: int = int(os.getenv('PARTITION_PREMAKE_MONTHS', '3'))
+    ARCHIVE_ENABLED: bool = os.getenv('ARCHIVE_ENABLED', 'False').lower() == 'true'
+    ARCHIVE_DIR: str = os.getenv('ARCHIVE_DIR', 'archive')
+    # Full months kept in the database before a partition is archived
+    ARCHIVE_RETENTION_MONTHS: int = int(os.getenv('ARCHIVE_RETENTION_MONTHS', '12'))
+    # Drop archived partitions (False only detaches them, leaving a standalone table)
+    ARCHIVE_DROP_PARTITIONS: bool = os.getenv('ARCHIVE_DROP_PARTITIONS', 'True').lower() == 'true'
     
     @property
     def database_url(self) -> str:
         """Generate database URL from individual components"""
         return f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    @property
+    def async_database_url(self) -> str:
+        """Generate asyncio database URL (asyncpg driver) from individual components"""
+        return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+
 # Global settings instance
 settings = Settings() 
\ No newline at end of file
@@ -2,16 +2,122 @@
 Database connection and session management for Mellow AI Service
 """
 
-from sqlalchemy import create_engine, text
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import create_engine, exc, text
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+
+class PoolWaitStats:
+    """Time spent waiting to check a connection out of a pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, wait_seconds: float, timed_out: bool) -> None:
+        """Record one checkout attempt"""
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += int(timed_out)
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def as_dict(self) -> dict:
+        """Get the counters as a dictionary"""
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3)
+            }
+
+class _WaitTimingMixin:
+    """Pool mixin that records how long each checkout waited for a connection"""
+
+    @property
+    def wait_stats(self) -> PoolWaitStats:
+        if not hasattr(self, "_wait_stats"):
+            self._wait_stats = PoolWaitStats()
+        return self._wait_stats
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.wait_stats.record(time.perf_counter() - started, timed_out)
+
+class InstrumentedQueuePool(_WaitTimingMixin, QueuePool):
+    """QueuePool with checkout wait timing"""
+
+class InstrumentedAsyncQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool with checkout wait timing"""
+
+def _pool_options() -> dict:
+    """Connection pool options shared by the sync and async engines"""
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING
+    }
+
+def _connect_args(driver: str) -> dict:
+    """Driver-specific connect arguments (server-side statement timeout)"""
+    if not settings.DB_STATEMENT_TIMEOUT_MS:
+        return {}
+    if driver == "asyncpg":
+        return {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+    return {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
 
 # Create database engine
-engine = create_engine(settings.database_url, echo=settings.DEBUG)
+engine = create_engine(
+    settings.database_url,
+    echo=settings.DEBUG,
+    poolclass=InstrumentedQueuePool,
+    connect_args=_connect_args("psycopg2"),
+    **_pool_options()
+)
+
+instrument_engine(engine, "sync")
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Create asyncio database engine (used by the non-blocking chat path)
+async_engine = create_async_engine(
+    settings.async_database_url,
+    echo=settings.DEBUG,
+    poolclass=InstrumentedAsyncQueuePool,
+    connect_args=_connect_args("asyncpg"),
+    **_pool_options()
+)
+
+instrument_engine(async_engine.sync_engine, "async")
+
+# Create asyncio session factory
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 def get_db():
     """
     Database dependency for FastAPI
@@ -24,6 +130,16 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """
+    Asyncio database dependency for FastAPI
+
+    Yields an AsyncSession and ensures it's closed after use, so the
+    event loop is never blocked on a database round trip
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def test_connection() -> bool:
     """
     Test database connection
@@ -39,4 +155,67 @@ def test_connection() -> bool:
         return True
     except Exception as e:
         print(f"Database connection failed: {e}")
-        return False 
\ No newline at end of file
+        return False 
+
+def _pool_status(pool) -> dict:
+    """Live status of one connection pool"""
+    status = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0)
+        })
+    if isinstance(pool, _WaitTimingMixin):
+        status.update(pool.wait_stats.as_dict())
+    return status
+
+def get_pool_stats() -> dict:
+    """
+    Get live connection pool statistics
+    
+    Returns:
+        Dictionary with the sync and async pools' checked-out connections,
+        overflow and checkout wait times
+    """
+    return {
+        "sync": _pool_status(engine.pool),
+        "async": _pool_status(async_engine.sync_engine.pool)
+    }
+
+class DatabaseHealthProbe:
+    """
+    Database health refreshed in the background
+    
+    /health reads the last result instead of opening a connection per
+    probe, so frequent orchestrator checks don't compete with chat traffic.
+    """
+
+    def __init__(self):
+        self.connected: Optional[bool] = None
+        self.checked_at: Optional[datetime] = None
+        self.latency_ms: Optional[float] = None
+
+    def refresh(self) -> bool:
+        """
+        Run the connection test and store the result
+        
+        Returns:
+            bool: True if connection successful, False otherwise
+        """
+        started = time.perf_counter()
+        connected = test_connection()
+        self.latency_ms = round((time.perf_counter() - started) * 1000, 3)
+        self.connected = connected
+        self.checked_at = datetime.now(timezone.utc)
+        return connected
+
+    def is_connected(self) -> bool:
+        """Last known connection status (tests the connection if never checked)"""
+        if self.connected is None:
+            return self.refresh()
+        return self.connected
+
+# Global instance
+health_probe = DatabaseHealthProbe()
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""
+Prometheus metrics for Mellow AI Service
+"""
+
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from prometheus_client import Counter, Histogram
+
+# Latency buckets (seconds) sized for HTTP handlers and model calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Statement types reported individually; anything else is "OTHER"
+DB_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+# Prompt sizes in (estimated) tokens
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+# Database statements are much faster, so they get finer buckets
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+# In-memory index lookups should stay well under a millisecond
+LOOKUP_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "mellow_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+
+GEMINI_CALL_DURATION = Histogram(
+    "mellow_gemini_call_duration_seconds",
+    "Latency of upstream Gemini calls",
+    ["mode"],
+    buckets=LATENCY_BUCKETS
+)
+
+GEMINI_CALLS = Counter(
+    "mellow_gemini_calls_total",
+    "Upstream Gemini calls by outcome (success, empty, error)",
+    ["mode", "outcome"]
+)
+
+CHAT_RESPONSES = Counter(
+    "mellow_chat_responses_total",
+    "Chat responses by source (gemini or static_fallback) and fallback reason",
+    ["source", "reason"]
+)
+
+CHAT_RESPONSE_PATHS = Counter(
+    "mellow_chat_response_paths_total",
+    "Which path answered a deadline-bound chat request (primary, hedge, slow_fallback, deadline_fallback)",
+    ["path"]
+)
+
+COALESCED_CALLS = Counter(
+    "mellow_coalesced_calls_total",
+    "Calls merged into an identical call already in flight",
+    ["name"]
+)
+
+PROMPT_TOKENS = Histogram(
+    "mellow_prompt_tokens",
+    "Estimated input tokens per built prompt, by segment (system, summary, memory, history, message, total)",
+    ["segment"],
+    buckets=TOKEN_BUCKETS
+)
+
+SCHEDULER_WAIT = Histogram(
+    "mellow_model_scheduler_wait_seconds",
+    "Time model calls waited in the scheduler queue before starting",
+    buckets=LATENCY_BUCKETS
+)
+
+SCHEDULER_REJECTIONS = Counter(
+    "mellow_model_scheduler_rejections_total",
+    "Model calls rejected by the scheduler (queue_full or deadline)",
+    ["reason"]
+)
+
+SCHEDULER_RETRIES = Counter(
+    "mellow_model_scheduler_retries_total",
+    "Rate-limited model calls retried by the scheduler"
+)
+
+DB_QUERY_DURATION = Histogram(
+    "mellow_db_query_duration_seconds",
+    "Database statement latency by engine and statement type",
+    ["engine", "operation"],
+    buckets=DB_BUCKETS
+)
+
+MEMORY_SEARCH_DURATION = Histogram(
+    "mellow_memory_search_seconds",
+    "Latency of vector index lookups for relevant past turns",
+    buckets=LOOKUP_BUCKETS
+)
+
+def record_chat_response(source: str, reason: str = "none") -> None:
+    """
+    Count one chat response
+
+    Args:
+        source: "gemini" or "static_fallback"
+        reason: Why the fallback was used ("none" for Gemini responses)
+    """
+    CHAT_RESPONSES.labels(source=source, reason=reason).inc()
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """
+    Time every statement run on an engine through SQLAlchemy cursor events
+
+    Args:
+        engine: Sync engine (pass async_engine.sync_engine for asyncio engines)
+        name: Engine label value
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started_at"].pop()
+        words = statement.split(None, 1)
+        operation = words[0].upper() if words else "OTHER"
+        if operation not in DB_OPERATIONS:
+            operation = "OTHER"
+        DB_QUERY_DURATION.labels(engine=name, operation=operation).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started_at"):
+            connection.info["query_started_at"].pop()
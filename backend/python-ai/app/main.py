@@ -3,12 +3,20 @@ Main FastAPI application for Mellow AI Service
 """
 
 import logging
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
-from app.core.database import test_connection
-from app.api.routes import health, chat, analytics
+from app.core.database import health_probe
+from app.core.background import PeriodicTask
+from app.core.metrics import HTTP_REQUEST_DURATION
+from app.api.routes import health, chat, analytics, metrics
+from app.services.analytics_jobs import analytics_worker
+from app.services.archive_service import maintain_partitions
+from app.services.rollup_service import reconcile_rollups
+from app.services.summary_service import conversation_summarizer
+from app.services.write_behind import write_behind
 
 # Configure logging
 logging.basicConfig(
@@ -33,18 +41,74 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Record per-route request latency
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Observe request latency (time to response headers for streaming routes)"""
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_DURATION.labels(
+            method=request.method,
+            route=route.path if route else "unmatched",
+            status=str(status_code)
+        ).observe(time.perf_counter() - started)
+
 # Include routers
 app.include_router(health.router, tags=["Health"])
 app.include_router(chat.router, tags=["Chat"])
 app.include_router(analytics.router, tags=["Analytics"])
+app.include_router(metrics.router, tags=["Metrics"])
+
+# Background jobs started with the application
+background_tasks = [
+    PeriodicTask(
+        "database-health-probe",
+        settings.HEALTH_PROBE_INTERVAL_SECONDS,
+        health_probe.refresh
+    ),
+    PeriodicTask(
+        "rollup-reconcile",
+        settings.ROLLUP_RECONCILE_INTERVAL_SECONDS,
+        reconcile_rollups
+    ),
+    PeriodicTask(
+        "conversation-partitions",
+        settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS,
+        maintain_partitions,
+        run_immediately=True
+    ),
+]
 
 # Startup event
 @app.on_event("startup")
 async def startup_event():
     """Initialize the application on startup"""
     print(f"{settings.APP_TITLE} v{settings.APP_VERSION} starting up...")
-    print(f"Database connection: {'✓' if test_connection() else '✗'}")
+    print(f"Database connection: {'✓' if health_probe.refresh() else '✗'}")
     print(f"Debug mode: {settings.DEBUG}")
+    for task in background_tasks:
+        task.start()
+    if settings.WRITE_BEHIND_ENABLED:
+        write_behind.start()
+    if settings.SUMMARY_ENABLED:
+        conversation_summarizer.start()
+    analytics_worker.start()
+
+# Shutdown event
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background jobs and flush queued writes on shutdown"""
+    await write_behind.stop()
+    await conversation_summarizer.stop()
+    await analytics_worker.stop()
+    for task in background_tasks:
+        await task.stop()
 
 # Root endpoint
 @app.get("/")
@@ -58,7 +122,8 @@ async def root():
             "/health",
             "/generate-response",
             "/conversations",
-            "/analytics"
+            "/analytics",
+            "/metrics"
         ]
     }
 
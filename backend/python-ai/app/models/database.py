@@ -2,7 +2,7 @@
 SQLAlchemy database models for Mellow AI Service
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 
@@ -13,16 +13,80 @@ class Conversation(Base):
     """
     Conversation model representing chat interactions
     
-    Matches the schema used by the Node.js backend for consistency
+    Matches the schema used by the Node.js backend for consistency. In
+    Postgres the table is range partitioned by UTC month on timestamp and
+    its primary key is (id, timestamp); both are created by
+    database/init/07-conversation-partitioning.sql, not from this model.
+    The model maps id alone as the key, since ids all come from one
+    sequence and identify rows on their own.
     """
     __tablename__ = "conversations"
 
     id = Column(Integer, primary_key=True, index=True)
     user_message = Column(Text, nullable=False)
     ai_response = Column(Text, nullable=False)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    # References users.id (foreign key created by database/init/02-users.sql)
+    user_id = Column(Integer, nullable=True, index=True)
+    # Partition key
+    timestamp = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     def __repr__(self):
-        return f"<Conversation(id={self.id}, timestamp={self.timestamp})>" 
\ No newline at end of file
+        return f"<Conversation(id={self.id}, timestamp={self.timestamp})>" 
+
+class ConversationRollup(Base):
+    """
+    Pre-aggregated conversation counts
+    
+    One row per (granularity, bucket): "hour" and "day" buckets in UTC; the
+    total is the sum of the day rows. Kept current by ConversationService
+    writes and periodically reconciled against the conversations table.
+    """
+    __tablename__ = "conversation_rollups"
+
+    granularity = Column(String(16), primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    conversation_count = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ConversationRollup(granularity={self.granularity}, bucket={self.bucket}, count={self.conversation_count})>"
+
+class ConversationSummary(Base):
+    """
+    Running summary of a user's older conversations
+    
+    Maintained off the request path by the conversation summarizer; covers
+    every conversation of the user up to last_conversation_id.
+    """
+    __tablename__ = "conversation_summaries"
+
+    user_id = Column(Integer, primary_key=True)
+    summary = Column(Text, nullable=False)
+    last_conversation_id = Column(Integer, nullable=False, default=0)
+    turns_summarized = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<ConversationSummary(user_id={self.user_id}, turns_summarized={self.turns_summarized})>"
+
+class ConversationArchive(Base):
+    """
+    A monthly conversations partition exported to a compressed JSONL file
+    
+    Written by the conversation archiver when it detaches a partition past
+    the retention window; the id range lets archived records be found by id.
+    """
+    __tablename__ = "conversation_archives"
+
+    partition_name = Column(String(63), primary_key=True)
+    range_start = Column(DateTime(timezone=True), nullable=False)
+    range_end = Column(DateTime(timezone=True), nullable=False)
+    min_id = Column(Integer, nullable=True)
+    max_id = Column(Integer, nullable=True)
+    row_count = Column(BigInteger, nullable=False, default=0)
+    file_path = Column(Text, nullable=False)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<ConversationArchive(partition_name={self.partition_name}, row_count={self.row_count})>"
@@ -9,11 +9,32 @@ from datetime import datetime
 class ChatRequest(BaseModel):
     """Request schema for chat endpoints"""
     message: str
+    user_id: Optional[int] = None
+    session_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     """Response schema for chat endpoints"""
     response: str
 
+class BatchChatRequest(BaseModel):
+    """Request schema for batch generation (all messages share one user/session context)"""
+    messages: List[str]
+    user_id: Optional[int] = None
+    session_id: Optional[str] = None
+
+class BatchChatResult(BaseModel):
+    """Result for one message of a batch, in input order"""
+    index: int
+    response: Optional[str] = None
+    conversation_id: Optional[int] = None
+    error: Optional[str] = None
+
+class BatchChatResponse(BaseModel):
+    """Response schema for batch generation"""
+    results: List[BatchChatResult]
+    succeeded: int
+    failed: int
+
 class ConversationResponse(BaseModel):
     """Response schema for conversation data"""
     id: int
@@ -21,14 +42,22 @@ class ConversationResponse(BaseModel):
     ai_response: str
     timestamp: str
 
+class ConversationSearchResult(ConversationResponse):
+    """Response schema for a conversation search match"""
+    rank: float
+
 class AnalyticsResponse(BaseModel):
     """Response schema for analytics data"""
     total_conversations: int
     recent_conversations: int
     common_topics: List[str]
+    common_phrases: List[str] = []
+    topics_as_of: Optional[str] = None
 
 class HealthResponse(BaseModel):
     """Response schema for health check"""
     status: str
     database: str
-    service: str 
\ No newline at end of file
+    service: str
+    checked_at: Optional[str] = None
+    pool: Optional[dict] = None 
\ No newline at end of file
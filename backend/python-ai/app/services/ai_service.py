@@ -2,11 +2,16 @@
 AI response generation service for Mellow AI Service
 """
 
+import asyncio
 import logging
-from typing import List
-from app.models.database import Conversation
+import time
+from typing import AsyncIterator, List, Optional, Tuple
+from app.core.metrics import CHAT_RESPONSE_PATHS, record_chat_response
+from app.services.context_store import ConversationTurn
 from app.utils.text_processing import detect_message_intent
 from app.services.gemini_service import gemini_service
+from app.services.model_scheduler import DeadlineExceededError
+from app.services.response_deadline import response_deadline
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -15,42 +20,195 @@ class AIService:
     """Service for generating AI responses to user messages"""
     
     @staticmethod
-    def generate_contextual_response(user_message: str, recent_conversations: List[Conversation]) -> str:
+    async def generate_contextual_response_async(
+        user_message: str,
+        recent_conversations: List[ConversationTurn],
+        summary: Optional[str] = None,
+        memories: Optional[List[ConversationTurn]] = None
+    ) -> str:
         """
-        Generate a response using Gemini AI with fallback to static responses
+        Generate a response using Gemini AI without blocking the event loop
+        
+        Falls back to static responses when Gemini is unavailable, fails or
+        returns nothing. Awaits the asyncio Gemini call so other requests keep
+        being served meanwhile, and keeps to the response latency budget (see
+        _generate_within_deadline).
         
         Args:
             user_message: The user's input message
-            recent_conversations: List of recent conversation objects for context
+            recent_conversations: Recent turns for context, newest first
+            summary: Running summary of the user's earlier conversations
+            memories: Earlier turns relevant to the message
             
         Returns:
             Generated AI response string
         """
-        # Try to generate response using Gemini first
         if gemini_service.is_available():
             try:
-                gemini_response = gemini_service.generate_response(user_message, recent_conversations)
+                gemini_response, path = await AIService._generate_within_deadline(
+                    user_message, recent_conversations, summary, memories
+                )
                 if gemini_response:
-                    print("Using Gemini-generated response")
+                    logger.debug(f"Using Gemini-generated response ({path} request)")
+                    record_chat_response("gemini")
                     return gemini_response
+                elif path.endswith("fallback"):
+                    logger.warning(f"Gemini too slow ({path}), falling back to static responses")
+                    record_chat_response("static_fallback", "deadline")
                 else:
-                    print("Gemini returned empty response, falling back to static responses")
+                    logger.warning("Gemini returned no response, falling back to static responses")
+                    record_chat_response("static_fallback", "no_response")
+            except DeadlineExceededError as e:
+                logger.warning(f"Gemini call could not start in time: {str(e)}, falling back to static responses")
+                record_chat_response("static_fallback", "deadline")
             except Exception as e:
-                print(f"Error with Gemini service: {str(e)}, falling back to static responses")
+                logger.error(f"Error with Gemini service: {str(e)}, falling back to static responses")
+                record_chat_response("static_fallback", "error")
         else:
-            print("Gemini service not available, using static responses")
+            logger.debug("Gemini service not available, using static responses")
+            record_chat_response("static_fallback", "unavailable")
         
-        # Fallback to static responses
         return AIService._generate_static_response(user_message, recent_conversations)
     
     @staticmethod
-    def _generate_static_response(user_message: str, recent_conversations: List[Conversation]) -> str:
+    async def _generate_within_deadline(
+        user_message: str,
+        recent_conversations: List[ConversationTurn],
+        summary: Optional[str] = None,
+        memories: Optional[List[ConversationTurn]] = None
+    ) -> Tuple[Optional[str], str]:
+        """
+        Call Gemini within the response latency budget
+        
+        Once the call is slow (fixed threshold or rolling p95) it is either
+        hedged with a second request, first answer winning, or abandoned for
+        the fallback. Nothing waits past the deadline. Calls that lose are
+        cancelled.
+        
+        Args:
+            user_message: The user's input message
+            recent_conversations: Recent turns for context, newest first
+            summary: Running summary of the user's earlier conversations
+            memories: Earlier turns relevant to the message
+            
+        Returns:
+            (response or None, path) where path is "primary", "hedge",
+            "slow_fallback", "deadline_fallback" or "no_response"
+            
+        Raises:
+            Exception: Every call failed (the last call's error)
+        """
+        started = time.monotonic()
+        deadline_seconds = response_deadline.deadline()
+        deadline = started + deadline_seconds if deadline_seconds else None
+        slow_after = response_deadline.slow_after()
+        
+        primary = asyncio.create_task(
+            gemini_service.generate_response_async(
+                user_message, recent_conversations, summary, memories, deadline=deadline
+            )
+        )
+        pending = {primary: "primary"}
+        error: Optional[BaseException] = None
+        try:
+            if slow_after is not None:
+                done, _ = await asyncio.wait(pending, timeout=slow_after)
+                if not done:
+                    if response_deadline.slow_action == "fallback":
+                        CHAT_RESPONSE_PATHS.labels(path="slow_fallback").inc()
+                        return None, "slow_fallback"
+                    hedge = asyncio.create_task(
+                        gemini_service.generate_response_async(
+                            user_message, recent_conversations, summary, memories, deadline=deadline, hedge=True
+                        )
+                    )
+                    pending[hedge] = "hedge"
+            
+            while pending:
+                timeout = deadline - time.monotonic() if deadline is not None else None
+                if timeout is not None and timeout <= 0:
+                    break
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in done:
+                    path = pending.pop(task)
+                    if task.exception() is not None:
+                        # A hedge still in flight may yet succeed
+                        error = task.exception()
+                        continue
+                    response = task.result()
+                    if response:
+                        response_deadline.tracker.observe(time.monotonic() - started)
+                        CHAT_RESPONSE_PATHS.labels(path=path).inc()
+                        return response, path
+            
+            if pending:
+                CHAT_RESPONSE_PATHS.labels(path="deadline_fallback").inc()
+                return None, "deadline_fallback"
+            if error is not None:
+                raise error
+            return None, "no_response"
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    @staticmethod
+    async def stream_contextual_response(
+        user_message: str,
+        recent_conversations: List[ConversationTurn],
+        summary: Optional[str] = None,
+        memories: Optional[List[ConversationTurn]] = None
+    ) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Stream a response using Gemini AI with fallback to static responses
+        
+        Yields ("token", text) events as partial text arrives. If Gemini fails
+        before or during the stream, a ("reset", "") event tells the client to
+        discard any partial text, then the static response is streamed instead.
+        
+        Args:
+            user_message: The user's input message
+            recent_conversations: Recent turns for context, newest first
+            summary: Running summary of the user's earlier conversations
+            memories: Earlier turns relevant to the message
+            
+        Yields:
+            (event, text) tuples where event is "token" or "reset"
+        """
+        if gemini_service.is_available():
+            streamed_any = False
+            try:
+                async for chunk in gemini_service.stream_response_async(
+                    user_message, recent_conversations, summary, memories
+                ):
+                    streamed_any = True
+                    yield "token", chunk
+                if streamed_any:
+                    logger.debug("Using Gemini-streamed response")
+                    record_chat_response("gemini")
+                    return
+                logger.warning("Gemini returned empty stream, falling back to static responses")
+                record_chat_response("static_fallback", "no_response")
+            except Exception as e:
+                logger.error(f"Error with Gemini stream: {str(e)}, falling back to static responses")
+                record_chat_response("static_fallback", "error")
+                if streamed_any:
+                    yield "reset", ""
+        else:
+            logger.debug("Gemini service not available, using static responses")
+            record_chat_response("static_fallback", "unavailable")
+        
+        yield "token", AIService._generate_static_response(user_message, recent_conversations)
+    
+    @staticmethod
+    def _generate_static_response(user_message: str, recent_conversations: List[ConversationTurn]) -> str:
         """
         Generate a static response based on user input and conversation history (fallback method)
         
         Args:
             user_message: The user's input message
-            recent_conversations: List of recent conversation objects for context
+            recent_conversations: Recent turns for context, newest first
             
         Returns:
             Generated static response string
@@ -0,0 +1,154 @@
+"""
+Analytics result cache for Mellow AI Service
+
+Keeps computed analytics results per endpoint and parameters until the
+next conversation write, so polling dashboards do not recompute (or, with
+ETag/If-None-Match, even re-download) unchanged results.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, NamedTuple, Tuple
+
+from app.core.config import settings
+
+class CachedResult(NamedTuple):
+    """One cached analytics result"""
+    version: int
+    expires_at: float
+    value: Any
+    etag: str
+
+class AnalyticsCache:
+    """
+    Write-versioned LRU cache of analytics results
+
+    Every conversation write bumps `version`, which makes all cached results
+    stale at once. Writes this process does not see (the Node backend, other
+    workers) are covered by the TTL instead, as are results that depend on
+    the clock (e.g. "last 24 hours").
+    """
+
+    def __init__(self, enabled: bool, max_size: int, ttl_seconds: float):
+        """
+        Initialize the cache
+
+        Args:
+            enabled: Cache results at all (ETags are served either way)
+            max_size: Maximum number of cached results (LRU evicted beyond this)
+            ttl_seconds: Seconds a cached result stays valid without writes
+        """
+        self.enabled = enabled
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(endpoint: str, **params) -> str:
+        """
+        Build a cache key from an endpoint name and its parameters
+
+        Args:
+            endpoint: Endpoint name
+            **params: Parameters the result depends on
+
+        Returns:
+            Cache key string
+        """
+        return f"{endpoint}:{json.dumps(params, sort_keys=True, default=str)}"
+
+    @staticmethod
+    def make_etag(value: Any) -> str:
+        """
+        Build a weak ETag from a result's content
+
+        Content-based, so every worker gives the same result the same ETag.
+
+        Args:
+            value: JSON-serializable result
+
+        Returns:
+            ETag header value
+        """
+        payload = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+        return f'W/"{hashlib.sha256(payload).hexdigest()[:32]}"'
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Tuple[Any, str]:
+        """
+        Get a cached result, computing and caching it on a miss
+
+        Args:
+            key: Cache key from make_key
+            compute: Function computing the result
+
+        Returns:
+            Tuple of (result, ETag)
+        """
+        now = time.monotonic()
+        with self._lock:
+            version = self.version
+            entry = self._entries.get(key)
+            if self.enabled and entry is not None and entry.version == version and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value, entry.etag
+            self.misses += 1
+
+        value = compute()
+        etag = self.make_etag(value)
+        if self.enabled and self.max_size > 0:
+            with self._lock:
+                # Stored with the version seen before computing, so a write
+                # that raced the computation leaves the entry already stale
+                self._entries[key] = CachedResult(version, time.monotonic() + self.ttl_seconds, value, etag)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return value, etag
+
+    def invalidate(self) -> None:
+        """Mark every cached result stale (called after conversation writes)"""
+        with self._lock:
+            self.version += 1
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        """Drop all cached results (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Get cache counters
+
+        Returns:
+            Dictionary with size, version, hits, misses, invalidations and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+# Global instance
+analytics_cache = AnalyticsCache(
+    enabled=settings.ANALYTICS_CACHE_ENABLED,
+    max_size=settings.ANALYTICS_CACHE_SIZE,
+    ttl_seconds=settings.ANALYTICS_CACHE_TTL_SECONDS
+)
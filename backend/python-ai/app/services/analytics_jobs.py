@@ -0,0 +1,251 @@
+"""
+Background analytics jobs for Mellow AI Service
+
+Topic extraction and message insights are pure-Python text crunching over
+the stored conversations. They run here, in a process pool on a schedule
+or on demand, and request handlers only read the latest snapshot, so
+analytics never holds up the event loop that also serves chat.
+"""
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from app.core.background import PeriodicTask
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.analytics_cache import analytics_cache
+from app.services.analytics_service import AnalyticsService
+from app.utils.topic_extraction import TopicExtractor
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Snapshots the worker computes
+JOB_KINDS = ("topics", "insights")
+
+class Snapshot(NamedTuple):
+    """Latest result of one kind of job"""
+    value: Any
+    as_of: datetime
+
+class AnalyticsJob:
+    """One run of an analytics computation"""
+
+    def __init__(self, job_id: int, kind: str, trigger: str):
+        """
+        Initialize a queued job
+
+        Args:
+            job_id: Job ID (unique per process)
+            kind: What the job computes (one of JOB_KINDS)
+            trigger: "schedule" or "manual"
+        """
+        self.id = job_id
+        self.kind = kind
+        self.trigger = trigger
+        self.status = "queued"
+        self.queued_at = datetime.now(timezone.utc)
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.duration_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        """Whether the job has finished, successfully or not"""
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self) -> dict:
+        """Job status as a JSON-serializable dictionary"""
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "trigger": self.trigger,
+            "status": self.status,
+            "queued_at": self.queued_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "duration_seconds": self.duration_seconds,
+            "error": self.error
+        }
+
+class AnalyticsWorker:
+    """
+    Computes analytics snapshots off the event loop
+
+    Every `interval_seconds` (and once at startup) each kind of snapshot is
+    recomputed; refresh() does the same on demand. A refresh of a kind that
+    is already queued or running joins that job instead of starting another.
+    Each job reads the database in its own session on a worker thread, and
+    the text processing itself runs in a pool of `workers` processes (or on
+    that thread when workers is 0).
+    """
+
+    def __init__(self, workers: int, interval_seconds: float, history_size: int):
+        """
+        Initialize the worker
+
+        Args:
+            workers: Worker processes for the text processing (0 uses a thread)
+            interval_seconds: Seconds between scheduled refreshes
+            history_size: Finished jobs kept for status lookups
+        """
+        self.workers = workers
+        self.interval_seconds = interval_seconds
+        self.history_size = history_size
+        self._executor: Optional[Executor] = None
+        self._schedule = PeriodicTask("analytics-snapshots", interval_seconds, self._refresh_scheduled, run_immediately=True)
+        self._snapshots: Dict[str, Snapshot] = {}
+        self._jobs: "OrderedDict[int, AnalyticsJob]" = OrderedDict()
+        self._active: Dict[str, AnalyticsJob] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._ids = itertools.count(1)
+        self.succeeded = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        """Start the process pool and the schedule on the running event loop"""
+        if self.workers > 0 and self._executor is None:
+            # spawn: forking a process that holds an event loop, threads and
+            # database connections is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        self._schedule.start()
+
+    async def stop(self) -> None:
+        """Stop the schedule, cancel running jobs and shut the pool down"""
+        await self._schedule.stop()
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def refresh(self, kinds: Iterable[str] = JOB_KINDS, trigger: str = "manual") -> List[AnalyticsJob]:
+        """
+        Start recomputing snapshots in the background
+
+        Args:
+            kinds: Snapshots to recompute
+            trigger: What asked for the refresh ("schedule" or "manual")
+
+        Returns:
+            One job per kind (an already running job if there is one)
+        """
+        jobs = []
+        for kind in kinds:
+            if kind not in JOB_KINDS:
+                raise ValueError(f"Unknown analytics job kind: {kind}")
+            job = self._active.get(kind)
+            if job is None:
+                job = AnalyticsJob(next(self._ids), kind, trigger)
+                self._active[kind] = job
+                self._jobs[job.id] = job
+                self._trim_history()
+                self._tasks[job.id] = asyncio.create_task(self._run(job), name=f"analytics-{kind}-{job.id}")
+            jobs.append(job)
+        return jobs
+
+    def snapshot(self, kind: str) -> Optional[Snapshot]:
+        """Latest snapshot of a kind, or None if none has been computed yet"""
+        return self._snapshots.get(kind)
+
+    def get_job(self, job_id: int) -> Optional[AnalyticsJob]:
+        """Look up a recent job by ID"""
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> List[AnalyticsJob]:
+        """Recent jobs, newest first"""
+        return list(reversed(self._jobs.values()))
+
+    def stats(self) -> dict:
+        """
+        Get worker counters
+
+        Returns:
+            Dictionary with pool size, running jobs, job outcomes and snapshot ages
+        """
+        return {
+            "workers": self.workers,
+            "interval_seconds": self.interval_seconds,
+            "running": sorted(self._active),
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "snapshots": {kind: snapshot.as_of.isoformat() for kind, snapshot in self._snapshots.items()}
+        }
+
+    async def _refresh_scheduled(self) -> None:
+        """Scheduled refresh of every snapshot (waits so runs never overlap)"""
+        jobs = self.refresh(JOB_KINDS, trigger="schedule")
+        await asyncio.gather(*(self._tasks[job.id] for job in jobs if job.id in self._tasks), return_exceptions=True)
+
+    async def _run(self, job: AnalyticsJob) -> None:
+        """Run a job and record its outcome"""
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        try:
+            value = await asyncio.to_thread(self._compute, job.kind)
+            self._snapshots[job.kind] = Snapshot(value, datetime.now(timezone.utc))
+            # Cached responses were built from the previous snapshot
+            analytics_cache.invalidate()
+            job.status = "succeeded"
+            self.succeeded += 1
+        except Exception as e:
+            logger.error(f"Analytics job {job.id} ({job.kind}) failed: {str(e)}")
+            job.status = "failed"
+            job.error = str(e)
+            self.failed += 1
+        finally:
+            if job.status == "running":
+                # Cancelled on shutdown
+                job.status = "failed"
+                job.error = "cancelled"
+            job.finished_at = datetime.now(timezone.utc)
+            job.duration_seconds = round(time.perf_counter() - started, 3)
+            self._active.pop(job.kind, None)
+            self._tasks.pop(job.id, None)
+
+    def _compute(self, kind: str) -> Any:
+        """Compute one snapshot in a fresh session (runs on a worker thread)"""
+        db = SessionLocal()
+        try:
+            if kind == "topics":
+                return self._compute_topics(db)
+            return AnalyticsService.get_message_insights(db, executor=self._executor)
+        finally:
+            db.close()
+
+    def _compute_topics(self, db) -> dict:
+        """Count topics over the full history in the shared pool"""
+        extractor = TopicExtractor(
+            include_bigrams=settings.TOPIC_INCLUDE_BIGRAMS,
+            workers=self.workers,
+            executor=self._executor
+        )
+        common_topics, common_phrases = AnalyticsService.get_common_topics(db, extractor=extractor)
+        return {"common_topics": common_topics, "common_phrases": common_phrases}
+
+    def _trim_history(self) -> None:
+        """Forget the oldest finished jobs beyond history_size"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(self._jobs) - self.history_size)]:
+            del self._jobs[job_id]
+
+# Global instance
+analytics_worker = AnalyticsWorker(
+    workers=settings.ANALYTICS_WORKERS,
+    interval_seconds=settings.ANALYTICS_SNAPSHOT_INTERVAL_SECONDS,
+    history_size=settings.ANALYTICS_JOB_HISTORY
+)
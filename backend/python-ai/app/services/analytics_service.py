@@ -2,85 +2,175 @@
 Analytics service for conversation analysis and insights
 """
 
-from datetime import datetime, timedelta
-from typing import List
+from collections import Counter
+from datetime import datetime, time, timedelta, timezone
+from concurrent.futures import Executor
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from app.core.config import settings
 from app.models.database import Conversation
-from app.utils.text_processing import extract_common_topics
+from app.services.rollup_service import RollupService
+from app.utils.text_processing import message_insights
+from app.utils.topic_extraction import TopicExtractor, top_topics
+
+# Zones whose local days are exactly the UTC days of the per-day rollup
+UTC_ZONE_NAMES = {"UTC", "Etc/UTC", "Etc/Universal", "Universal", "Zulu", "Etc/Zulu", "GMT", "Etc/GMT"}
 
 class AnalyticsService:
     """Service for generating conversation analytics and insights"""
     
     @staticmethod
-    def get_conversation_analytics(db: Session) -> dict:
+    def get_conversation_counts(db: Session) -> dict:
         """
-        Get comprehensive analytics about conversations
+        Get total and last-24-hour conversation counts from the rollups
         
         Args:
             db: Database session
             
         Returns:
-            Dictionary containing analytics data
+            Dictionary with total_conversations and recent_conversations
         """
-        # Total conversations
-        total_conversations = db.query(Conversation).count()
-        
-        # Recent conversations (last 24 hours)
-        yesterday = datetime.now() - timedelta(days=1)
-        recent_conversations = db.query(Conversation).filter(
-            Conversation.timestamp >= yesterday
-        ).count()
+        # Total conversations (read from the maintained rollup, not a table scan)
+        total_conversations = RollupService.get_total(db)
         
-        # Simple topic extraction (basic keyword analysis)
-        conversations = db.query(Conversation.user_message).limit(100).all()
-        common_topics = extract_common_topics([conv.user_message for conv in conversations])
+        # Recent conversations (last 24 hours, at hour granularity)
+        yesterday = datetime.now(timezone.utc) - timedelta(days=1)
+        recent_conversations = RollupService.get_count_since(db, yesterday)
         
         return {
             "total_conversations": total_conversations,
-            "recent_conversations": recent_conversations,
-            "common_topics": common_topics
+            "recent_conversations": recent_conversations
         }
     
     @staticmethod
-    def get_conversation_trends(db: Session, days: int = 7) -> dict:
+    def get_common_topics(
+        db: Session,
+        limit: int = 5,
+        extractor: Optional[TopicExtractor] = None
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Extract the most common topics from every stored user message
+        
+        Messages are read through a server-side streaming cursor in chunks of
+        TOPIC_EXTRACTION_CHUNK_SIZE. This scans the whole table, so it is only
+        run by the background analytics worker.
+        
+        Args:
+            db: Database session
+            limit: Number of topics of each kind to return
+            extractor: Extractor to count with (defaults to counting in the calling thread)
+            
+        Returns:
+            Tuple of (top words, top two-word phrases)
+        """
+        result = db.execute(
+            select(Conversation.user_message).execution_options(
+                yield_per=settings.TOPIC_EXTRACTION_CHUNK_SIZE
+            )
+        )
+        
+        if extractor is None:
+            extractor = TopicExtractor(include_bigrams=settings.TOPIC_INCLUDE_BIGRAMS)
+        counts = extractor.count_chunks(result.scalars().partitions())
+        
+        return top_topics(counts, limit)
+    
+    @staticmethod
+    def get_conversation_trends(db: Session, days: int = 7, tz: str = "UTC", interval: str = "day") -> dict:
         """
         Get conversation trends over specified number of days
         
+        The window is the last `days` calendar days in `tz`, today included.
+        Series are read from the maintained rollups and zero-filled, so every
+        day or hour of the window is present. A UTC daily series reads one
+        row per day; local days in other zones are folded from the hour rows
+        (up to 24 per day), so they are only available in zones whose days
+        start on a whole UTC hour: an hour bucket of, say, Asia/Kolkata
+        would straddle two local days.
+        
         Args:
             db: Database session
             days: Number of days to analyze
+            tz: IANA time zone the days (and hour labels) are in
+            interval: "day" or "hour"
             
         Returns:
             Dictionary containing trend data
+            
+        Raises:
+            ValueError: If the time zone or interval is unknown, or daily
+                counts are asked for in a zone with a fractional-hour offset
         """
-        start_date = datetime.now() - timedelta(days=days)
+        zone = AnalyticsService._resolve_timezone(tz)
+        now = datetime.now(timezone.utc)
+        first_day = now.astimezone(zone).date() - timedelta(days=days - 1)
+        start = datetime.combine(first_day, time.min, tzinfo=zone).astimezone(timezone.utc)
+        
+        if interval == "day":
+            counts: Counter = Counter()
+            if tz in UTC_ZONE_NAMES:
+                for day, count in RollupService.get_daily_counts(db, start):
+                    counts[day.date()] += count
+            else:
+                # Local days do not line up with UTC days, so fold the hours,
+                # which only works if every local day starts on an hour bucket
+                for offset in range(days + 1):
+                    midnight = datetime.combine(first_day + timedelta(days=offset), time.min, tzinfo=zone)
+                    if midnight.utcoffset().total_seconds() % 3600:
+                        raise ValueError(
+                            f"Daily trends are not available in {tz}: its days do not start on a whole UTC hour "
+                            f"(use interval=hour)"
+                        )
+                for hour, count in RollupService.get_hourly_counts(db, start):
+                    counts[hour.astimezone(zone).date()] += count
+            
+            series = []
+            for offset in range(days):
+                day = first_day + timedelta(days=offset)
+                series.append({"date": str(day), "count": counts[day]})
+            return {"period_days": days, "timezone": tz, "interval": interval, "daily_conversations": series}
         
-        # Get conversations per day
-        daily_conversations = db.query(
-            func.date(Conversation.timestamp).label('date'),
-            func.count(Conversation.id).label('count')
-        ).filter(
-            Conversation.timestamp >= start_date
-        ).group_by(
-            func.date(Conversation.timestamp)
-        ).all()
+        if interval == "hour":
+            hourly = dict(RollupService.get_hourly_counts(db, start))
+            series = []
+            hour = RollupService.hour_bucket(start)
+            last_hour = RollupService.hour_bucket(now)
+            while hour <= last_hour:
+                series.append({"hour": hour.astimezone(zone).isoformat(), "count": hourly.get(hour, 0)})
+                hour += timedelta(hours=1)
+            return {"period_days": days, "timezone": tz, "interval": interval, "hourly_conversations": series}
         
-        return {
-            "period_days": days,
-            "daily_conversations": [
-                {"date": str(day.date), "count": day.count}
-                for day in daily_conversations
-            ]
-        }
+        raise ValueError(f"Unknown interval: {interval}")
     
     @staticmethod
-    def get_message_insights(db: Session) -> dict:
+    def _resolve_timezone(tz: str) -> ZoneInfo:
+        """
+        Look up an IANA time zone
+        
+        Args:
+            tz: Zone name, e.g. "Europe/Berlin"
+            
+        Returns:
+            The zone
+            
+        Raises:
+            ValueError: If the zone is unknown
+        """
+        try:
+            return ZoneInfo(tz)
+        except (ZoneInfoNotFoundError, ValueError) as e:
+            raise ValueError(f"Unknown time zone: {tz}") from e
+    
+    @staticmethod
+    def get_message_insights(db: Session, executor: Optional[Executor] = None) -> dict:
         """
         Get insights about message patterns and characteristics
         
         Args:
             db: Database session
+            executor: Pool to run the text analysis in (defaults to the calling thread)
             
         Returns:
             Dictionary containing message insights
@@ -89,28 +179,6 @@ class AnalyticsService:
         recent_messages = db.query(Conversation.user_message).limit(100).all()
         messages = [msg.user_message for msg in recent_messages]
         
-        if not messages:
-            return {
-                "average_message_length": 0,
-                "total_analyzed": 0,
-                "emotion_distribution": {}
-            }
-        
-        # Calculate average message length
-        avg_length = sum(len(msg.split()) for msg in messages) / len(messages)
-        
-        # Simple emotion detection
-        emotions = ["sad", "happy", "angry", "frustrated", "excited", "worried", "anxious"]
-        emotion_counts = {}
-        
-        for message in messages:
-            message_lower = message.lower()
-            for emotion in emotions:
-                if emotion in message_lower:
-                    emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
-        
-        return {
-            "average_message_length": round(avg_length, 2),
-            "total_analyzed": len(messages),
-            "emotion_distribution": emotion_counts
-        } 
\ No newline at end of file
+        if executor is not None:
+            return executor.submit(message_insights, messages).result()
+        return message_insights(messages) 
\ No newline at end of file
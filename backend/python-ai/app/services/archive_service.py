@@ -0,0 +1,368 @@
+"""
+Conversation partition maintenance and archival for Mellow AI Service
+
+In Postgres, conversations is range partitioned by UTC month (see
+database/init/07-conversation-partitioning.sql). This keeps upcoming
+partitions created ahead of time and moves months past the retention
+window out of the database into gzip-compressed JSONL files, so the hot
+table stays small. Archived records can still be read back by id.
+"""
+
+import gzip
+import logging
+import os
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+
+import orjson
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.database import Conversation, ConversationArchive
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Monthly partitions are named conversations_pYYYYMM
+PARTITION_NAME = re.compile(r"^conversations_p(\d{4})(\d{2})$")
+
+# Columns written to archive files; id comes first so a lookup can match a
+# line by its prefix without parsing it
+ARCHIVE_COLUMNS = (
+    Conversation.id,
+    Conversation.user_id,
+    Conversation.user_message,
+    Conversation.ai_response,
+    Conversation.timestamp,
+    Conversation.created_at,
+    Conversation.updated_at
+)
+
+# gzip level: most of the size reduction of level 9 at a fraction of the CPU
+COMPRESS_LEVEL = 6
+
+def add_months(month: date, months: int) -> date:
+    """First day of the month `months` after (or before, if negative) the month of a date"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+class ConversationArchiver:
+    """
+    Creates upcoming monthly partitions and archives expired ones
+
+    A month is archived once it is more than `retention_months` full months
+    before the current one: its rows are written to
+    `<archive_dir>/<partition>.jsonl.gz`, recorded in conversation_archives
+    and the partition is detached (and dropped, with `drop_partitions`).
+    The file is complete on disk before the partition is detached, so a
+    failure at any point loses no data. Does nothing unless the database is
+    Postgres with a partitioned conversations table.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        archive_dir: str,
+        retention_months: int,
+        premake_months: int,
+        drop_partitions: bool
+    ):
+        """
+        Initialize the archiver
+
+        Args:
+            enabled: Archive expired partitions (upcoming ones are created either way)
+            archive_dir: Directory the archive files are written to
+            retention_months: Full months kept in the database before the current one
+            premake_months: Months after the current one to keep partitions for
+            drop_partitions: Drop archived partitions instead of only detaching them
+        """
+        self.enabled = enabled
+        self.archive_dir = archive_dir
+        self.retention_months = retention_months
+        self.premake_months = premake_months
+        self.drop_partitions = drop_partitions
+        self.partitions_created = 0
+        self.partitions_archived = 0
+        self.rows_archived = 0
+        self.last_run: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    def maintain(self, db: Session, today: Optional[date] = None) -> dict:
+        """
+        Create upcoming partitions, then archive expired ones if enabled
+
+        Args:
+            db: Database session
+            today: Date to plan from (defaults to the current UTC date)
+
+        Returns:
+            Dictionary with the partitions created and archived
+        """
+        if not self.is_partitioned(db):
+            return {"partitioned": False, "created": [], "archived": []}
+        today = today or datetime.now(timezone.utc).date()
+        created = self.ensure_partitions(db, today)
+        archived = self.archive_expired(db, today) if self.enabled else []
+        self.last_run = datetime.now(timezone.utc)
+        return {"partitioned": True, "created": created, "archived": archived}
+
+    @staticmethod
+    def is_partitioned(db: Session) -> bool:
+        """Whether conversations is a partitioned Postgres table"""
+        if db.get_bind().dialect.name != "postgresql":
+            return False
+        return bool(db.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('conversations'))"
+        )).scalar())
+
+    def ensure_partitions(self, db: Session, today: date) -> List[str]:
+        """
+        Create the partitions for the current month and the next premake_months
+
+        Args:
+            db: Database session
+            today: Date to plan from
+
+        Returns:
+            Names of the partitions that did not exist yet
+        """
+        existing = {name for name, _ in self._monthly_partitions(db)}
+        created = []
+        for offset in range(self.premake_months + 1):
+            month = add_months(today, offset)
+            try:
+                name = db.execute(
+                    text("SELECT create_conversation_partition(:month)"), {"month": month}
+                ).scalar()
+                db.commit()
+            except Exception as e:
+                # e.g. rows for that month already sit in conversations_default
+                db.rollback()
+                logger.error(f"Could not create the conversations partition for {month:%Y-%m}: {str(e)}")
+                self.last_error = str(e)
+                continue
+            if name not in existing:
+                created.append(name)
+                self.partitions_created += 1
+                logger.info(f"Created conversations partition {name}")
+        return created
+
+    def archive_expired(self, db: Session, today: date) -> List[str]:
+        """
+        Archive every partition older than the retention window
+
+        Args:
+            db: Database session
+            today: Date to plan from
+
+        Returns:
+            Names of the archived partitions
+        """
+        cutoff = add_months(today, -self.retention_months)
+        archived = []
+        for name, month in self._monthly_partitions(db):
+            if add_months(month, 1) > cutoff:
+                continue
+            try:
+                self.archive_partition(db, name, month)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Could not archive conversations partition {name}: {str(e)}")
+                self.last_error = str(e)
+                continue
+            archived.append(name)
+        return archived
+
+    def archive_partition(self, db: Session, name: str, month: date) -> ConversationArchive:
+        """
+        Export one partition to a compressed JSONL file, then detach it
+
+        The partition is locked against writes for the whole transaction, so
+        the file holds exactly the rows that are detached. A write to the
+        partition waiting on the lock can deadlock with the detach; Postgres
+        then aborts one of them and the partition is retried on the next run.
+
+        Args:
+            db: Database session
+            name: Partition name (conversations_pYYYYMM)
+            month: First day of the partition's month
+
+        Returns:
+            The conversation_archives record written
+        """
+        quoted = db.get_bind().dialect.identifier_preparer.quote(name)
+        # Held until the detach commits, so no update or delete can land
+        # between the export and the detach (reads still go through)
+        db.execute(text(f"LOCK TABLE {quoted} IN SHARE MODE"))
+        path, row_count, min_id, max_id = self._export(db, quoted, name)
+
+        record = db.merge(ConversationArchive(
+            partition_name=name,
+            range_start=datetime(month.year, month.month, 1, tzinfo=timezone.utc),
+            range_end=datetime.combine(add_months(month, 1), datetime.min.time(), tzinfo=timezone.utc),
+            min_id=min_id,
+            max_id=max_id,
+            row_count=row_count,
+            file_path=path
+        ))
+        db.execute(text(f"ALTER TABLE conversations DETACH PARTITION {quoted}"))
+        if self.drop_partitions:
+            db.execute(text(f"DROP TABLE {quoted}"))
+        db.commit()
+
+        self.partitions_archived += 1
+        self.rows_archived += row_count
+        logger.info(f"Archived conversations partition {name}: {row_count} rows to {path}")
+        return record
+
+    def _export(self, db: Session, quoted: str, name: str) -> Tuple[str, int, Optional[int], Optional[int]]:
+        """Write a partition's rows to its archive file, returning (path, rows, min id, max id)"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.abspath(os.path.join(self.archive_dir, f"{name}.jsonl.gz"))
+        partial = f"{path}.partial"
+
+        row_count = 0
+        min_id = max_id = None
+        column_list = ", ".join(column.name for column in ARCHIVE_COLUMNS)
+        stmt = text(f"SELECT {column_list} FROM {quoted} ORDER BY id").columns(*ARCHIVE_COLUMNS)
+        result = db.execute(stmt.execution_options(yield_per=1000))
+        with gzip.open(partial, "wb", compresslevel=COMPRESS_LEVEL) as archive:
+            for row in result:
+                archive.write(orjson.dumps(row._asdict()) + b"\n")
+                row_count += 1
+                min_id = row.id if min_id is None else min_id
+                max_id = row.id
+        # Only a complete file takes the final name
+        with open(partial, "rb") as written:
+            os.fsync(written.fileno())
+        os.replace(partial, path)
+        # Make the rename itself durable before the partition can be dropped
+        directory = os.open(os.path.dirname(path), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+        return path, row_count, min_id, max_id
+
+    @staticmethod
+    def archive_files_for(db: Session, conversation_id: int) -> List[str]:
+        """
+        Find the archive files whose id range covers a conversation
+
+        Args:
+            db: Database session
+            conversation_id: The conversation ID
+
+        Returns:
+            Archive file paths (usually one; empty if the id was never archived)
+        """
+        if not ConversationArchiver.is_partitioned(db):
+            # conversation_archives only exists alongside the partitioned table
+            return []
+        return list(db.execute(
+            select(ConversationArchive.file_path).where(
+                ConversationArchive.min_id <= conversation_id,
+                ConversationArchive.max_id >= conversation_id
+            )
+        ).scalars())
+
+    @staticmethod
+    def archived_totals(db: Session) -> Tuple[Optional[datetime], int]:
+        """
+        Get the end of the newest archived month and the number of archived rows
+
+        Args:
+            db: Database session
+
+        Returns:
+            Tuple of (end of the archived range, or None if nothing is archived; rows archived)
+        """
+        if not ConversationArchiver.is_partitioned(db):
+            return None, 0
+        archived_until, row_count = db.execute(
+            select(func.max(ConversationArchive.range_end), func.coalesce(func.sum(ConversationArchive.row_count), 0))
+        ).one()
+        return archived_until, int(row_count)
+
+    @staticmethod
+    def read_archived(paths: List[str], conversation_id: int) -> Optional[dict]:
+        """
+        Read an archived conversation from its archive files
+
+        Scans the files sequentially, so callers should run it off the event loop.
+
+        Args:
+            paths: Files from archive_files_for
+            conversation_id: The conversation ID
+
+        Returns:
+            The archived row (timestamps as ISO 8601 strings), or None if not found
+        """
+        prefix = b'{"id":%d,' % conversation_id
+        for path in paths:
+            try:
+                with gzip.open(path, "rb") as archive:
+                    for line in archive:
+                        if line.startswith(prefix):
+                            return orjson.loads(line)
+            except FileNotFoundError:
+                logger.warning(f"Conversation archive file {path} is missing")
+        return None
+
+    def stats(self) -> dict:
+        """
+        Get archiver counters
+
+        Returns:
+            Dictionary with settings, partitions created/archived and the last run
+        """
+        return {
+            "enabled": self.enabled,
+            "archive_dir": self.archive_dir,
+            "retention_months": self.retention_months,
+            "premake_months": self.premake_months,
+            "partitions_created": self.partitions_created,
+            "partitions_archived": self.partitions_archived,
+            "rows_archived": self.rows_archived,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "last_error": self.last_error
+        }
+
+    @staticmethod
+    def _monthly_partitions(db: Session) -> List[Tuple[str, date]]:
+        """Attached monthly partitions as (name, first day of month), oldest first"""
+        names = db.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'conversations'::regclass"
+        )).scalars()
+        partitions = []
+        for name in names:
+            match = PARTITION_NAME.match(name)
+            if match:
+                partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+        return sorted(partitions, key=lambda partition: partition[1])
+
+def maintain_partitions() -> dict:
+    """Maintain partitions in a fresh session (entry point for the periodic job)"""
+    db = SessionLocal()
+    try:
+        return conversation_archiver.maintain(db)
+    except Exception as e:
+        conversation_archiver.last_error = str(e)
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+# Global instance
+conversation_archiver = ConversationArchiver(
+    enabled=settings.ARCHIVE_ENABLED,
+    archive_dir=settings.ARCHIVE_DIR,
+    retention_months=settings.ARCHIVE_RETENTION_MONTHS,
+    premake_months=settings.PARTITION_PREMAKE_MONTHS,
+    drop_partitions=settings.ARCHIVE_DROP_PARTITIONS
+)
@@ -0,0 +1,290 @@
+"""
+Per-user conversation context store for Mellow AI Service
+
+Keeps the most recent turns of each user/session in memory so building
+the prompt context does not need a database round trip.
+"""
+
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Deque, Dict, Iterable, List, NamedTuple, Optional
+
+from app.core.config import settings
+from app.models.database import Conversation
+
+class ConversationTurn(NamedTuple):
+    """Lightweight, session-independent record of one conversation turn"""
+    id: Optional[int]
+    user_message: str
+    ai_response: str
+    timestamp: Optional[datetime] = None
+    user_id: Optional[int] = None
+
+    @classmethod
+    def from_conversation(cls, conversation) -> "ConversationTurn":
+        """Build a turn from a Conversation ORM object (or any object with the same attributes)"""
+        return cls(
+            id=conversation.id,
+            user_message=conversation.user_message,
+            ai_response=conversation.ai_response,
+            timestamp=conversation.timestamp,
+            user_id=getattr(conversation, "user_id", None)
+        )
+
+# Columns of a ConversationTurn, in field order: select(*TURN_COLUMNS) rows
+# become turns with ConversationTurn._make, without loading ORM objects
+TURN_COLUMNS = (
+    Conversation.id,
+    Conversation.user_message,
+    Conversation.ai_response,
+    Conversation.timestamp,
+    Conversation.user_id
+)
+
+def context_key(user_id: Optional[int] = None, session_id: Optional[str] = None) -> str:
+    """
+    Build the context store key for a user or session
+
+    Args:
+        user_id: Authenticated user ID, if known
+        session_id: Client session ID, if known
+
+    Returns:
+        Key string; requests with neither share the global context
+    """
+    if user_id is not None:
+        return f"user:{user_id}"
+    if session_id:
+        return f"session:{session_id}"
+    return "global"
+
+class ConversationContextStore:
+    """
+    Bounded ring buffers of recent turns, one per user/session
+
+    Each buffer holds at most `turns_per_key` turns (newest first). Buffers
+    are evicted least-recently-used when there are more than `max_keys` of
+    them or their text exceeds `max_bytes` in total.
+    """
+
+    def __init__(self, turns_per_key: int, max_keys: int, max_bytes: int):
+        """
+        Initialize the store
+
+        Args:
+            turns_per_key: Turns kept per user/session
+            max_keys: Maximum number of users/sessions kept
+            max_bytes: Approximate cap on the total size of stored message text
+        """
+        self.turns_per_key = turns_per_key
+        self.max_keys = max_keys
+        self.max_bytes = max_bytes
+        self._buffers: "OrderedDict[str, Deque[ConversationTurn]]" = OrderedDict()
+        self._bytes = 0
+        # Turns appended to each key while a miss fill of it is in flight,
+        # one list per fill (see begin_fill)
+        self._fills: Dict[str, List[List[ConversationTurn]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _turn_size(turn: ConversationTurn) -> int:
+        """Approximate memory used by a turn's text"""
+        return len(turn.user_message) + len(turn.ai_response)
+
+    def get(self, key: str, limit: int) -> Optional[List[ConversationTurn]]:
+        """
+        Get the most recent turns for a key
+
+        Args:
+            key: Key from context_key
+            limit: Maximum number of turns wanted
+
+        Returns:
+            Up to `limit` turns, newest first, or None if the key is not loaded
+            (or more turns are wanted than a buffer holds)
+        """
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is None or limit > self.turns_per_key:
+                self.misses += 1
+                return None
+            self._buffers.move_to_end(key)
+            self.hits += 1
+            return list(buffer)[:limit]
+
+    def begin_fill(self, key: str) -> List[ConversationTurn]:
+        """
+        Start filling a miss for a key from the database
+
+        Turns appended to the key from now on are collected until the fill
+        is put, so put can keep those the database read did not see (e.g.
+        write-behind turns that are not flushed yet).
+
+        Args:
+            key: Key from context_key
+
+        Returns:
+            Fill token to pass to put
+        """
+        fill: List[ConversationTurn] = []
+        with self._lock:
+            self._fills.setdefault(key, []).append(fill)
+        return fill
+
+    def put(self, key: str, turns: Iterable[ConversationTurn], fill: List[ConversationTurn]) -> List[ConversationTurn]:
+        """
+        Load the buffer for a key (after a miss was filled from the database)
+
+        Turns appended since begin_fill are kept ahead of the database rows,
+        so a fill never overwrites turns recorded while it was in flight.
+
+        Args:
+            key: Key from context_key
+            turns: Most recent turns read from the database, newest first
+            fill: Token from the begin_fill call made before the read
+
+        Returns:
+            The loaded turns, newest first
+        """
+        with self._lock:
+            self._end_fill(key, fill)
+            buffer: Deque[ConversationTurn] = deque(fill[::-1][:self.turns_per_key], maxlen=self.turns_per_key)
+            appended_ids = {turn.id for turn in fill if turn.id is not None}
+            for turn in turns:
+                if len(buffer) == self.turns_per_key:
+                    break
+                if turn.id not in appended_ids:
+                    buffer.append(turn)
+
+            previous = self._buffers.pop(key, None)
+            if previous is not None:
+                self._bytes -= sum(self._turn_size(turn) for turn in previous)
+            self._buffers[key] = buffer
+            self._bytes += sum(self._turn_size(turn) for turn in buffer)
+            self._evict()
+            return list(buffer)
+
+    def cancel_fill(self, key: str, fill: List[ConversationTurn]) -> None:
+        """
+        Abandon a fill whose database read failed, leaving the key unloaded
+
+        Args:
+            key: Key from context_key
+            fill: Token from begin_fill
+        """
+        with self._lock:
+            self._end_fill(key, fill)
+
+    def append(self, key: str, turn: ConversationTurn) -> None:
+        """
+        Record a new turn for a key, if its buffer is loaded
+
+        Unloaded keys are left alone: the next read fills them from the
+        database, which already contains this turn (fills already in flight
+        collect it, see begin_fill).
+
+        Args:
+            key: Key from context_key
+            turn: The newly saved turn
+        """
+        with self._lock:
+            for fill in self._fills.get(key, ()):
+                fill.append(turn)
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                return
+            if len(buffer) == self.turns_per_key:
+                self._bytes -= self._turn_size(buffer[-1])
+            buffer.appendleft(turn)
+            self._bytes += self._turn_size(turn)
+            self._buffers.move_to_end(key)
+            self._evict()
+
+    def assign_id(self, keys: Iterable[str], turn: ConversationTurn, conversation_id: int) -> None:
+        """
+        Give a turn that was buffered before it was saved its conversation ID
+
+        Args:
+            keys: Keys the turn was appended under
+            turn: The turn object that was appended (matched by identity)
+            conversation_id: ID the turn was saved under
+        """
+        with self._lock:
+            for key in keys:
+                for turns in [self._buffers.get(key, ()), *self._fills.get(key, ())]:
+                    for position, buffered in enumerate(turns):
+                        if buffered is turn:
+                            turns[position] = turn._replace(id=conversation_id)
+                            break
+
+    def remove_conversation(self, conversation_id: int) -> None:
+        """
+        Drop every buffer that contains a conversation (e.g. after it was deleted)
+
+        Args:
+            conversation_id: ID of the removed conversation
+        """
+        with self._lock:
+            stale = [
+                key for key, buffer in self._buffers.items()
+                if any(turn.id == conversation_id for turn in buffer)
+            ]
+            for key in stale:
+                self._drop(key)
+            for fills in self._fills.values():
+                for fill in fills:
+                    fill[:] = [turn for turn in fill if turn.id != conversation_id]
+
+    def clear(self) -> None:
+        """Drop all buffers"""
+        with self._lock:
+            self._buffers.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Get store counters
+
+        Returns:
+            Dictionary with key count, approximate bytes, hits, misses and evictions
+        """
+        with self._lock:
+            return {
+                "keys": len(self._buffers),
+                "max_keys": self.max_keys,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+    def _end_fill(self, key: str, fill: List[ConversationTurn]) -> None:
+        """Stop collecting appends for a fill (caller holds the lock)"""
+        fills = [other for other in self._fills[key] if other is not fill]
+        if fills:
+            self._fills[key] = fills
+        else:
+            del self._fills[key]
+
+    def _drop(self, key: str) -> None:
+        """Remove one buffer (caller holds the lock)"""
+        buffer = self._buffers.pop(key)
+        self._bytes -= sum(self._turn_size(turn) for turn in buffer)
+
+    def _evict(self) -> None:
+        """Evict least recently used buffers until within limits (caller holds the lock)"""
+        while self._buffers and (len(self._buffers) > self.max_keys or self._bytes > self.max_bytes):
+            self._drop(next(iter(self._buffers)))
+            self.evictions += 1
+
+# Global instance
+context_store = ConversationContextStore(
+    turns_per_key=settings.CONTEXT_STORE_TURNS,
+    max_keys=settings.CONTEXT_STORE_MAX_KEYS,
+    max_bytes=settings.CONTEXT_STORE_MAX_BYTES
+)
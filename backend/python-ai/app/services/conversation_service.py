@@ -2,88 +2,249 @@
 Conversation management service for Mellow AI Service
 """
 
-from typing import List, Optional
-from sqlalchemy.orm import Session
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import and_, func, insert, or_, select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.database import Conversation
-from app.models.schemas import ConversationResponse
+from app.services.analytics_cache import analytics_cache
+from app.services.rollup_service import RollupService
+from app.services.search_service import search_index
+from app.services.context_store import TURN_COLUMNS, ConversationTurn, context_key, context_store
+from app.services.memory_service import conversation_memory
+from app.services.summary_service import conversation_summarizer
 
 class ConversationService:
     """Service for managing conversation data and operations"""
     
     @staticmethod
-    def get_recent_conversations(db: Session, limit: int = 10) -> List[Conversation]:
+    def _turn_columns(preview_chars: Optional[int] = None) -> tuple:
         """
-        Get recent conversations from the database
+        Columns of a ConversationTurn, optionally with the message bodies truncated
+        
+        Truncating with substr() in the query means the full text bodies are
+        never sent over the wire.
         
         Args:
-            db: Database session
-            limit: Maximum number of conversations to return
+            preview_chars: Maximum characters of each message, or None for the full text
             
         Returns:
-            List of recent Conversation objects
+            Tuple of columns in ConversationTurn field order
         """
-        return db.query(Conversation).order_by(
-            Conversation.timestamp.desc()
-        ).limit(limit).all()
+        if preview_chars is None:
+            return TURN_COLUMNS
+        return (
+            Conversation.id,
+            func.substr(Conversation.user_message, 1, preview_chars).label("user_message"),
+            func.substr(Conversation.ai_response, 1, preview_chars).label("ai_response"),
+            Conversation.timestamp,
+            Conversation.user_id
+        )
     
     @staticmethod
-    def get_conversation_context(db: Session, limit: int = 5) -> List[Conversation]:
+    def encode_cursor(conversation: Conversation) -> str:
         """
-        Get recent conversations for context in AI response generation
+        Encode a keyset pagination cursor pointing just after a conversation
         
         Args:
-            db: Database session
-            limit: Maximum number of conversations for context
+            conversation: The last conversation (or row with id and timestamp) on the current page
             
         Returns:
-            List of recent Conversation objects for context
+            Opaque URL-safe cursor string
         """
-        return db.query(Conversation).order_by(
-            Conversation.timestamp.desc()
-        ).limit(limit).all()
+        payload = json.dumps([conversation.timestamp.isoformat(), conversation.id])
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
     
     @staticmethod
-    def save_conversation(db: Session, user_message: str, ai_response: str) -> Conversation:
+    def decode_cursor(cursor: str) -> Tuple[datetime, int]:
         """
-        Save a new conversation to the database
+        Decode a keyset pagination cursor
+        
+        Args:
+            cursor: Cursor produced by encode_cursor
+            
+        Returns:
+            Tuple of (timestamp, id) of the last conversation already returned
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            timestamp, conversation_id = json.loads(base64.urlsafe_b64decode(padded))
+            return datetime.fromisoformat(timestamp), int(conversation_id)
+        except Exception as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+    
+    @staticmethod
+    def get_conversation_rows_page(
+        db: Session,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        preview_chars: Optional[int] = None
+    ) -> Tuple[List[Row], Optional[str]]:
+        """
+        Get one page of conversations as column-only rows, newest first
+        
+        Pages are positioned on (timestamp, id) rather than an OFFSET, so each
+        page is an index range scan on idx_conversations_timestamp no matter
+        how deep into the history the client is. The rows are plain tuples
+        rather than ORM objects, for serializing straight to JSON.
         
         Args:
             db: Database session
-            user_message: The user's message
-            ai_response: The AI's response
+            limit: Maximum number of rows to return
+            cursor: Cursor returned with the previous page, or None for the first page
+            preview_chars: Truncate both messages to this many characters in the database
             
         Returns:
-            The saved Conversation object
+            Tuple of (rows with id, user_message, ai_response and timestamp,
+            cursor for the next page or None if this is the last page)
         """
-        conversation = Conversation(
-            user_message=user_message,
-            ai_response=ai_response
+        # The response fields: the turn columns up to (not including) user_id
+        stmt = select(*ConversationService._turn_columns(preview_chars)[:4])
+        stmt = ConversationService._keyset_page(stmt, limit, cursor)
+        return ConversationService._split_page(db.execute(stmt).all(), limit)
+    
+    @staticmethod
+    def _keyset_page(query, limit: int, cursor: Optional[str]):
+        """Restrict a Query or select() to the page after a cursor (plus one row to detect more pages)"""
+        if cursor:
+            timestamp, conversation_id = ConversationService.decode_cursor(cursor)
+            # The first condition is a plain range on the indexed column;
+            # the second breaks ties between rows with the same timestamp
+            query = query.filter(
+                Conversation.timestamp <= timestamp,
+                or_(
+                    Conversation.timestamp < timestamp,
+                    and_(Conversation.timestamp == timestamp, Conversation.id < conversation_id)
+                )
+            )
+        
+        return query.order_by(
+            Conversation.timestamp.desc(),
+            Conversation.id.desc()
+        ).limit(limit + 1)
+    
+    @staticmethod
+    def _split_page(rows: list, limit: int) -> Tuple[list, Optional[str]]:
+        """Trim the extra row fetched by _keyset_page and build the next cursor from it"""
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, ConversationService.encode_cursor(rows[-1])
+        return rows, None
+    
+    @staticmethod
+    def iter_conversation_rows(
+        db: Session,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        chunk_size: int = 1000
+    ) -> Iterator[dict]:
+        """
+        Stream conversations as plain dictionaries, oldest first
+        
+        Rows come from a server-side cursor in chunks of chunk_size, so memory
+        use stays flat regardless of how many rows are exported.
+        
+        Args:
+            db: Database session
+            since: Only include conversations at or after this time
+            until: Only include conversations before this time
+            chunk_size: Rows fetched per round trip
+            
+        Yields:
+            Dictionaries with id, user_message, ai_response and timestamp
+        """
+        stmt = select(
+            Conversation.id,
+            Conversation.user_message,
+            Conversation.ai_response,
+            Conversation.timestamp
         )
-        db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
-        return conversation
+        if since is not None:
+            stmt = stmt.where(Conversation.timestamp >= since)
+        if until is not None:
+            stmt = stmt.where(Conversation.timestamp < until)
+        stmt = stmt.order_by(Conversation.timestamp, Conversation.id)
+        
+        result = db.execute(stmt.execution_options(yield_per=chunk_size))
+        for row in result:
+            yield {
+                "id": row.id,
+                "user_message": row.user_message,
+                "ai_response": row.ai_response,
+                "timestamp": row.timestamp.isoformat() if row.timestamp else None
+            }
     
     @staticmethod
-    def format_conversations_for_response(conversations: List[Conversation]) -> List[ConversationResponse]:
+    def _context_query(limit: int, user_id: Optional[int] = None, session_id: Optional[str] = None):
         """
-        Format conversation objects for API response
+        Build the database query that fills a context store miss
         
         Args:
-            conversations: List of Conversation objects
+            limit: Maximum number of conversations for context
+            user_id: Only use this user's conversations
+            session_id: Client session ID (sessions are not stored in the database)
             
         Returns:
-            List of ConversationResponse objects
-        """
-        return [
-            ConversationResponse(
-                id=conv.id,
-                user_message=conv.user_message,
-                ai_response=conv.ai_response,
-                timestamp=conv.timestamp.isoformat()
-            )
-            for conv in conversations
-        ]
+            Select statement, or None when the database cannot supply the context
+        """
+        stmt = select(*TURN_COLUMNS)
+        if user_id is not None:
+            stmt = stmt.where(Conversation.user_id == user_id)
+        elif session_id:
+            # Anonymous sessions only exist in memory; a miss means a fresh session
+            return None
+        return stmt.order_by(Conversation.timestamp.desc(), Conversation.id.desc()).limit(limit)
+    
+    @staticmethod
+    def _remember_turn(conversation: Conversation, user_id: Optional[int], session_id: Optional[str]) -> None:
+        """
+        Add a saved conversation to the context store and the user's memory
+        index, and count it towards the user's next summarization run
+        
+        Args:
+            conversation: The saved conversation
+            user_id: ID of the user the conversation belongs to
+            session_id: Client session ID for anonymous users
+        """
+        ConversationService._append_context(ConversationTurn.from_conversation(conversation), user_id, session_id)
+        conversation_memory.add(user_id, conversation.id, conversation.user_message, conversation.ai_response)
+        conversation_summarizer.note_turns(user_id)
+    
+    @staticmethod
+    def _append_context(turn: ConversationTurn, user_id: Optional[int], session_id: Optional[str]) -> None:
+        """
+        Add a saved turn to the user's/session's context and the global context
+        
+        The global context sees every turn, just as the unfiltered database
+        query would.
+        """
+        key = context_key(user_id, session_id)
+        context_store.append(key, turn)
+        if key != context_key():
+            context_store.append(context_key(), turn)
+    
+    @staticmethod
+    def format_conversation_rows(rows: List[Row]) -> List[dict]:
+        """
+        Format column-only rows for a FastJSONResponse
+        
+        Timestamps are left as datetimes: orjson writes them in the same form
+        as the isoformat() strings of ConversationResponse.
+        
+        Args:
+            rows: Rows from get_conversation_rows_page
+            
+        Returns:
+            List of dictionaries with id, user_message, ai_response and timestamp
+        """
+        return [row._asdict() for row in rows]
     
     @staticmethod
     def get_conversation_by_id(db: Session, conversation_id: int) -> Optional[Conversation]:
@@ -111,9 +272,154 @@ class ConversationService:
         Returns:
             True if deleted successfully, False if not found
         """
-        conversation = ConversationService.get_conversation_by_id(db, conversation_id)
+        # The message bodies are not needed to delete the row
+        conversation = db.query(Conversation).options(
+            load_only(Conversation.id, Conversation.user_id, Conversation.timestamp)
+        ).filter(Conversation.id == conversation_id).first()
         if conversation:
             db.delete(conversation)
+            if conversation.timestamp:
+                RollupService.record_conversations(db, [conversation.timestamp], delta=-1)
+            conversation_summarizer.invalidate(db, conversation.user_id, conversation_id)
             db.commit()
+            analytics_cache.invalidate()
+            context_store.remove_conversation(conversation_id)
+            search_index.remove(conversation_id)
+            conversation_memory.remove(conversation.user_id, conversation_id)
             return True
-        return False 
\ No newline at end of file
+        return False 
+    
+    @staticmethod
+    async def get_conversation_context_async(
+        db: AsyncSession,
+        limit: int = 5,
+        user_id: Optional[int] = None,
+        session_id: Optional[str] = None
+    ) -> List[ConversationTurn]:
+        """
+        Get recent conversations for context without blocking the event loop
+        
+        Args:
+            db: Async database session
+            limit: Maximum number of conversations for context
+            user_id: Only use this user's conversations
+            session_id: Client session ID for anonymous users
+            
+        Returns:
+            List of recent turns for context, newest first
+        """
+        key = context_key(user_id, session_id)
+        turns = context_store.get(key, limit)
+        if turns is not None:
+            return turns
+        
+        stmt = ConversationService._context_query(max(limit, context_store.turns_per_key), user_id, session_id)
+        fill = context_store.begin_fill(key)
+        try:
+            if stmt is None:
+                turns = []
+            else:
+                result = await db.execute(stmt)
+                turns = [ConversationTurn._make(row) for row in result]
+        except BaseException:
+            context_store.cancel_fill(key, fill)
+            raise
+        # Turns appended while the query ran are merged in ahead of its rows
+        turns = context_store.put(key, turns, fill)
+        return turns[:limit]
+    
+    @staticmethod
+    async def save_conversation_async(
+        db: AsyncSession,
+        user_message: str,
+        ai_response: str,
+        user_id: Optional[int] = None,
+        session_id: Optional[str] = None
+    ) -> Conversation:
+        """
+        Save a new conversation to the database without blocking the event loop
+        
+        Args:
+            db: Async database session
+            user_message: The user's message
+            ai_response: The AI's response
+            user_id: ID of the user the conversation belongs to
+            session_id: Client session ID for anonymous users
+            
+        Returns:
+            The saved Conversation object
+        """
+        conversation = Conversation(
+            user_message=user_message,
+            ai_response=ai_response,
+            user_id=user_id
+        )
+        db.add(conversation)
+        await RollupService.record_conversations_async(db, [datetime.now(timezone.utc)])
+        await db.commit()
+        analytics_cache.invalidate()
+        await db.refresh(conversation)
+        ConversationService._remember_turn(conversation, user_id, session_id)
+        return conversation
+    
+    @staticmethod
+    async def save_conversations_async(db: AsyncSession, rows: List[dict]) -> List[int]:
+        """
+        Save many conversations in one multi-row INSERT ... RETURNING
+        
+        Args:
+            db: Async database session
+            rows: Dictionaries with user_message, ai_response and optionally
+                user_id and timestamp
+            
+        Returns:
+            IDs of the saved conversations, in input order
+        """
+        if not rows:
+            return []
+        
+        result = await db.execute(
+            insert(Conversation).returning(Conversation.id, sort_by_parameter_order=True),
+            rows
+        )
+        conversation_ids = list(result.scalars().all())
+        
+        now = datetime.now(timezone.utc)
+        await RollupService.record_conversations_async(db, [row.get("timestamp") or now for row in rows])
+        await db.commit()
+        analytics_cache.invalidate()
+        for conversation_id, row in zip(conversation_ids, rows):
+            conversation_memory.add(row.get("user_id"), conversation_id, row["user_message"], row["ai_response"])
+            conversation_summarizer.note_turns(row.get("user_id"))
+        return conversation_ids
+    
+    @staticmethod
+    async def save_conversation_batch_async(
+        db: AsyncSession,
+        turns: List[Tuple[str, str]],
+        user_id: Optional[int] = None,
+        session_id: Optional[str] = None
+    ) -> List[int]:
+        """
+        Save many turns of one user/session in a single bulk insert
+        
+        Args:
+            db: Async database session
+            turns: (user_message, ai_response) pairs, in conversation order
+            user_id: ID of the user the conversations belong to
+            session_id: Client session ID for anonymous users
+            
+        Returns:
+            IDs of the saved conversations, in input order
+        """
+        now = datetime.now(timezone.utc)
+        conversation_ids = await ConversationService.save_conversations_async(db, [
+            {"user_message": user_message, "ai_response": ai_response, "user_id": user_id, "timestamp": now}
+            for user_message, ai_response in turns
+        ])
+        for conversation_id, (user_message, ai_response) in zip(conversation_ids, turns):
+            ConversationService._append_context(
+                ConversationTurn(conversation_id, user_message, ai_response, now, user_id),
+                user_id, session_id
+            )
+        return conversation_ids
@@ -3,19 +3,61 @@ Gemini AI service for generating responses using Google's Generative AI
 """
 
 import google.generativeai as genai
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
+import hashlib
 import logging
+import time
 from app.core.config import settings
-from app.models.database import Conversation
+from app.core.metrics import GEMINI_CALL_DURATION, GEMINI_CALLS
+from app.services.context_store import ConversationTurn
+from app.services.model_scheduler import model_scheduler
+from app.services.prompt_builder import PromptBuilder, estimate_tokens
+from app.services.response_cache import response_cache
+from app.services.single_flight import SingleFlight
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# System prompt for mental health support, measured once by the prompt builder
+SYSTEM_PROMPT = """You are Mellow, a compassionate AI assistant designed to provide mental health support and emotional guidance. Your role is to:
+
+1. Listen empathetically and without judgment
+2. Provide emotional support and validation
+3. Help users explore their thoughts and feelings
+4. Offer gentle guidance and coping strategies
+5. Encourage professional help when appropriate
+
+Guidelines:
+- Always be warm, understanding, and non-judgmental
+- Always be professional and make the conversation as real as possible. And make sure to keep it flowing and natural.
+- Validate the user's feelings and experiences
+- Ask thoughtful follow-up questions to help users reflect
+- Provide practical coping strategies when appropriate
+- Recognize when someone may need professional help and gently suggest it
+- Maintain appropriate boundaries - you're supportive but not a replacement for therapy
+- Keep responses conversational and not overly clinical
+- Focus on the user's emotional well-being and mental health
+
+Remember: You are here to support, listen, diagnose, and guide and to provide medical advice. With medical advice you will ask to consult doctor on `azfer@mellow.com`"""
+
 class GeminiService:
     """Service for interacting with Google's Gemini AI"""
     
     def __init__(self):
         """Initialize Gemini service with API key and configuration"""
+        self.prompt_builder = PromptBuilder(
+            system_prompt=SYSTEM_PROMPT,
+            input_token_budget=settings.PROMPT_INPUT_TOKEN_BUDGET,
+            max_message_tokens=settings.PROMPT_MAX_MESSAGE_TOKENS,
+            max_turn_tokens=settings.PROMPT_MAX_TURN_TOKENS,
+            max_history_turns=settings.PROMPT_MAX_HISTORY_TURNS,
+            max_summary_tokens=settings.PROMPT_MAX_SUMMARY_TOKENS,
+            max_memory_tokens=settings.PROMPT_MAX_MEMORY_TOKENS
+        )
+        
+        # Identical prompts in flight at the same time share one model call
+        self.inflight = SingleFlight("gemini")
+        
         if not settings.GEMINI_API_KEY:
             logger.warning("GEMINI_API_KEY not found. Gemini service will not be available.")
             self.model = None
@@ -33,97 +75,281 @@ class GeminiService:
         """Check if Gemini service is available"""
         return self.model is not None
     
-    def generate_response(self, user_message: str, conversation_context: List[Conversation] = None) -> Optional[str]:
+    async def generate_response_async(
+        self,
+        user_message: str,
+        conversation_context: List[ConversationTurn] = None,
+        summary: Optional[str] = None,
+        memories: Optional[List[ConversationTurn]] = None,
+        deadline: Optional[float] = None,
+        hedge: bool = False
+    ) -> Optional[str]:
         """
-        Generate a response using Gemini AI
+        Generate a response using Gemini AI without blocking the event loop
+        
+        Uses the SDK's asyncio transport, so a single worker can keep many
+        model calls in flight while it keeps serving other requests.
         
         Args:
             user_message: The user's input message
             conversation_context: Recent conversation history for context
+            summary: Running summary of the user's earlier conversations
+            memories: Earlier turns relevant to the message
+            deadline: time.monotonic() value by which the call must start
+                (defaults to the scheduler's queue timeout)
+            hedge: This is a hedged duplicate of a slow call, so it skips the
+                cache lookup and request coalescing (which would just join
+                the slow call)
             
         Returns:
-            Generated response or None if service is unavailable
+            Generated response or None if service is unavailable or the
+            response was empty
+            
+        Raises:
+            DeadlineExceededError: The call could not start before its deadline
+            Exception: The model call failed (the caller falls back and
+                records the error)
         """
         if not self.is_available():
             logger.warning("Gemini service is not available")
             return None
             
-        try:
-            # Build the system prompt for mental health support
-            system_prompt = self._build_system_prompt()
-            
-            # Build conversation context
-            context_string = self._build_context_string(conversation_context)
-            
-            # Create the full prompt
-            full_prompt = f"{system_prompt}\n\n{context_string}\n\nUser: {user_message}\n\nAssistant:"
-            
-            # Generate response
-            response = self.model.generate_content(
-                full_prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=settings.GEMINI_MAX_TOKENS,
-                    temperature=settings.GEMINI_TEMPERATURE,
-                )
+        prompt = self.prompt_builder.build(user_message, conversation_context, summary, memories)
+        
+        cache_key = self._get_cache_key(user_message, prompt.context, conversation_context)
+        if cache_key and not hedge:
+            cached_response = response_cache.get(cache_key)
+            if cached_response:
+                logger.info("Serving Gemini response from cache")
+                return cached_response
+        
+        full_prompt = prompt.text
+        
+        if settings.GEMINI_COALESCE_REQUESTS and not hedge:
+            text = await self.inflight.do_async(
+                self._prompt_fingerprint(full_prompt),
+                lambda: self._call_model_async(full_prompt, deadline)
             )
+        else:
+            text = await self._call_model_async(full_prompt, deadline)
+        
+        if text and cache_key:
+            response_cache.set(cache_key, text)
+        return text
+    
+    async def stream_response_async(
+        self,
+        user_message: str,
+        conversation_context: List[ConversationTurn] = None,
+        summary: Optional[str] = None,
+        memories: Optional[List[ConversationTurn]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a response from Gemini AI as partial text chunks
+        
+        Like generate_response_async, errors are not swallowed here: the
+        caller decides how to recover when the stream fails partway.
+        
+        Args:
+            user_message: The user's input message
+            conversation_context: Recent conversation history for context
+            summary: Running summary of the user's earlier conversations
+            memories: Earlier turns relevant to the message
             
-            if response and response.text:
-                logger.info("Successfully generated response using Gemini")
-                return response.text.strip()
-            else:
-                logger.warning("Gemini returned empty response")
-                return None
+        Yields:
+            Partial response text chunks in generation order
+        """
+        if not self.is_available():
+            raise RuntimeError("Gemini service is not available")
+        
+        prompt = self.prompt_builder.build(user_message, conversation_context, summary, memories)
+        
+        # A cached response is replayed as a single chunk
+        cache_key = self._get_cache_key(user_message, prompt.context, conversation_context)
+        if cache_key:
+            cached_response = response_cache.get(cache_key)
+            if cached_response:
+                logger.info("Serving Gemini response from cache")
+                yield cached_response
+                return
+        
+        full_prompt = prompt.text
+        
+        # The scheduler slot is held until the stream is fully consumed
+        estimated_tokens = self._estimate_tokens(full_prompt)
+        async with model_scheduler.slot(estimated_tokens):
+            started = time.perf_counter()
+            chunks = []
+            try:
+                response = await self.model.generate_content_async(
+                    full_prompt,
+                    generation_config=self._build_generation_config(),
+                    stream=True
+                )
                 
+                async for chunk in response:
+                    if chunk.parts and chunk.text:
+                        chunks.append(chunk.text)
+                        yield chunk.text
+            except Exception:
+                self._record_call("stream", "error", started)
+                raise
+            
+            text = "".join(chunks).strip()
+            self._record_call("stream", "success" if text else "empty", started)
+            model_scheduler.settle_tokens(estimated_tokens, self._usage_tokens(response))
+        if text and cache_key:
+            response_cache.set(cache_key, text)
+    
+    async def generate_text_async(self, prompt: str) -> Optional[str]:
+        """
+        Run a raw prompt (no system prompt, context or response cache)
+        
+        Used for internal tasks such as summarizing conversations; the call
+        still goes through the model scheduler.
+        
+        Args:
+            prompt: The complete prompt
+            
+        Returns:
+            Generated text or None if the service is unavailable or the call failed
+        """
+        if not self.is_available():
+            return None
+        try:
+            return await self._call_model_async(prompt)
         except Exception as e:
-            logger.error(f"Error generating Gemini response: {str(e)}")
+            logger.error(f"Error generating Gemini text: {str(e)}")
             return None
     
-    def _build_system_prompt(self) -> str:
-        """Build the system prompt for mental health support"""
-        return """You are Mellow, a compassionate AI assistant designed to provide mental health support and emotional guidance. Your role is to:
-
-1. Listen empathetically and without judgment
-2. Provide emotional support and validation
-3. Help users explore their thoughts and feelings
-4. Offer gentle guidance and coping strategies
-5. Encourage professional help when appropriate
-
-Guidelines:
-- Always be warm, understanding, and non-judgmental
-- Always be professional and make the conversation as real as possible. And make sure to keep it flowing and natural.
-- Validate the user's feelings and experiences
-- Ask thoughtful follow-up questions to help users reflect
-- Provide practical coping strategies when appropriate
-- Recognize when someone may need professional help and gently suggest it
-- Maintain appropriate boundaries - you're supportive but not a replacement for therapy
-- Keep responses conversational and not overly clinical
-- Focus on the user's emotional well-being and mental health
-
-Remember: You are here to support, listen, diagnose, and guide and to provide medical advice. With medical advice you will ask to consult doctor on `azfer@mellow.com`"""
+    async def _call_model_async(self, full_prompt: str, deadline: Optional[float] = None) -> Optional[str]:
+        """
+        Make one upstream generate call on the SDK's asyncio transport
+        
+        The call goes through the model scheduler, which caps concurrency,
+        keeps within the request/token quota and retries rate-limit errors.
+        
+        Args:
+            full_prompt: The full prompt text from the prompt builder
+            deadline: time.monotonic() value by which the call must start
+            
+        Returns:
+            Stripped response text or None if the response was empty
+        """
+        estimated_tokens = self._estimate_tokens(full_prompt)
+        
+        async def request() -> Optional[str]:
+            started = time.perf_counter()
+            try:
+                response = await self.model.generate_content_async(
+                    full_prompt,
+                    generation_config=self._build_generation_config()
+                )
+                text = self._extract_text(response)
+            except Exception:
+                self._record_call("generate", "error", started)
+                raise
+            self._record_call("generate", "success" if text else "empty", started)
+            model_scheduler.settle_tokens(estimated_tokens, self._usage_tokens(response))
+            return text
+        
+        return await model_scheduler.run(request, estimated_tokens, deadline)
     
-    def _build_context_string(self, conversation_context: List[Conversation]) -> str:
+    def _estimate_tokens(self, full_prompt: str) -> int:
         """
-        Build context string from recent conversations
+        Estimate the tokens a call will use, for the scheduler's quota budget
         
         Args:
-            conversation_context: List of recent conversations
+            full_prompt: The full prompt text from the prompt builder
             
         Returns:
-            Formatted context string
+            Estimated input tokens plus expected output tokens
+        """
+        return estimate_tokens(full_prompt) + settings.GEMINI_EXPECTED_OUTPUT_TOKENS
+    
+    def _usage_tokens(self, response) -> Optional[int]:
         """
-        if not conversation_context:
-            return "This is the beginning of a new conversation."
+        Get the total tokens a response reports it used
         
-        context_parts = ["Recent conversation history:"]
+        Args:
+            response: The Gemini response object
+            
+        Returns:
+            Total token count, or None if the response has no usage metadata
+        """
+        usage = getattr(response, "usage_metadata", None)
+        total = getattr(usage, "total_token_count", None)
+        return total or None
+    
+    def _prompt_fingerprint(self, full_prompt: str) -> str:
+        """
+        Fingerprint a prompt together with the settings that shape its response
+        
+        Args:
+            full_prompt: The full prompt text from the prompt builder
+            
+        Returns:
+            Hex digest identifying identical model calls
+        """
+        fingerprint = hashlib.sha256()
+        for part in (settings.GEMINI_MODEL, settings.GEMINI_MAX_TOKENS, settings.GEMINI_TEMPERATURE, full_prompt):
+            fingerprint.update(str(part).encode("utf-8"))
+            fingerprint.update(b"\0")
+        return fingerprint.hexdigest()
+    
+    def _record_call(self, mode: str, outcome: str, started: float) -> None:
+        """
+        Record latency and outcome of one upstream Gemini call
+        
+        Args:
+            mode: "generate" or "stream"
+            outcome: "success", "empty" or "error"
+            started: time.perf_counter() value taken before the call
+        """
+        GEMINI_CALL_DURATION.labels(mode=mode).observe(time.perf_counter() - started)
+        GEMINI_CALLS.labels(mode=mode, outcome=outcome).inc()
+    
+    def _get_cache_key(self, user_message: str, context_string: str, conversation_context: List[ConversationTurn] = None) -> Optional[str]:
+        """
+        Get the response cache key for a prompt, if the prompt is cacheable
         
-        # Add recent conversations (newest first, but we want to show oldest first in context)
-        for conversation in reversed(conversation_context[-3:]):  # Last 3 conversations
-            context_parts.append(f"User: {conversation.user_message}")
-            context_parts.append(f"Assistant: {conversation.ai_response}")
+        Args:
+            user_message: The user's input message
+            context_string: History section of the built prompt
+            conversation_context: Recent conversation history for context
+            
+        Returns:
+            Cache key, or None when caching is disabled for this turn
+        """
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return None
+        if conversation_context and not settings.RESPONSE_CACHE_CONTEXT_TURNS:
+            return None
+        return response_cache.make_key(user_message, context_string)
+    
+    def _build_generation_config(self):
+        """Build the generation config from settings"""
+        return genai.types.GenerationConfig(
+            max_output_tokens=settings.GEMINI_MAX_TOKENS,
+            temperature=settings.GEMINI_TEMPERATURE,
+        )
+    
+    def _extract_text(self, response) -> Optional[str]:
+        """
+        Extract the response text from a Gemini response
         
-        context_parts.append("\nContinuing the conversation:")
+        Args:
+            response: The Gemini response object
+            
+        Returns:
+            Stripped response text or None if the response was empty
+        """
+        if response and response.text:
+            logger.info("Successfully generated response using Gemini")
+            return response.text.strip()
         
-        return "\n".join(context_parts)
+        logger.warning("Gemini returned empty response")
+        return None
 
 # Global instance
 gemini_service = GeminiService() 
\ No newline at end of file
@@ -0,0 +1,305 @@
+"""
+Retrieval of relevant past conversation turns for Mellow AI Service
+
+Every turn of a user is embedded with the local hashing embedder and kept
+in a per-user vector index, so the prompt can carry the few past turns
+most similar to the new message on top of the most recent ones.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import MEMORY_SEARCH_DURATION
+from app.models.database import Conversation
+from app.services.context_store import TURN_COLUMNS, ConversationTurn
+from app.services.single_flight import SingleFlight
+from app.utils.embedding import HashingEmbedder
+from app.utils.vector_index import IVFIndex
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class ConversationMemory:
+    """
+    Per-user vector indexes of past turns
+
+    A user's index is loaded from the database on their first recall (the
+    newest `max_turns_per_user` turns) and then kept current by saves and
+    deletes. Indexes are evicted least-recently-used once together they
+    exceed `max_bytes`. Only users are indexed: anonymous sessions have no
+    stored history beyond their recent turns.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        top_k: int,
+        min_score: float,
+        dim: int,
+        max_turns_per_user: int,
+        max_bytes: int,
+        train_threshold: int,
+        nprobe: int
+    ):
+        """
+        Initialize the memory
+
+        Args:
+            enabled: Retrieve relevant turns at all
+            top_k: Turns returned per recall
+            min_score: Minimum cosine similarity of a returned turn
+            dim: Embedding size
+            max_turns_per_user: Newest turns indexed per user
+            max_bytes: Approximate cap on the total size of all indexes
+            train_threshold: Turns a user needs before their index is clustered
+            nprobe: Clusters searched per recall once clustered
+        """
+        self.enabled = enabled
+        self.top_k = top_k
+        self.min_score = min_score
+        self.max_turns_per_user = max_turns_per_user
+        self.max_bytes = max_bytes
+        self.train_threshold = train_threshold
+        self.nprobe = nprobe
+        self.embedder = HashingEmbedder(dim)
+        self.loader = SingleFlight("memory")
+        self._indexes: "OrderedDict[int, IVFIndex]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.recalls = 0
+        self.recalled_turns = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def add(self, user_id: Optional[int], conversation_id: Optional[int], user_message: str, ai_response: str) -> None:
+        """
+        Index a newly saved turn, if the user's index is loaded
+
+        Unloaded users are left alone: their index is built from the
+        database, which already contains this turn.
+
+        Args:
+            user_id: Owner of the turn
+            conversation_id: ID of the saved conversation
+            user_message: The user's message
+            ai_response: The AI's response
+        """
+        if not self.enabled or user_id is None or conversation_id is None:
+            return
+        with self._lock:
+            index = self._indexes.get(user_id)
+        if index is None:
+            return
+
+        before = index.nbytes
+        index.add(conversation_id, self.embedder.embed(self._turn_text(user_message, ai_response)))
+        # Trim in steps rather than on every save past the cap
+        if len(index) > self.max_turns_per_user + self.max_turns_per_user // 4:
+            index.trim(self.max_turns_per_user)
+        with self._lock:
+            if self._indexes.get(user_id) is index:
+                self._bytes += index.nbytes - before
+                self._evict()
+
+    def remove(self, user_id: Optional[int], conversation_id: int) -> None:
+        """
+        Forget a deleted turn
+
+        Args:
+            user_id: Owner of the deleted conversation
+            conversation_id: ID of the deleted conversation
+        """
+        if user_id is None:
+            return
+        with self._lock:
+            index = self._indexes.get(user_id)
+        if index is None:
+            return
+
+        before = index.nbytes
+        index.remove(conversation_id)
+        with self._lock:
+            if self._indexes.get(user_id) is index:
+                self._bytes += index.nbytes - before
+
+    async def recall_async(
+        self,
+        db: AsyncSession,
+        user_id: Optional[int],
+        user_message: str,
+        exclude: Iterable[int] = ()
+    ) -> List[ConversationTurn]:
+        """
+        Find the user's past turns most relevant to a new message
+
+        Args:
+            db: Async database session
+            user_id: The user, if known
+            user_message: The new message
+            exclude: Conversation IDs already in the prompt (the recent turns)
+
+        Returns:
+            Up to top_k turns, most relevant first (empty if retrieval is off,
+            nothing is similar enough or the lookup fails)
+        """
+        if not self.enabled or user_id is None or self.top_k <= 0:
+            return []
+        query = self.embedder.embed(user_message)
+        if not query.any():
+            return []
+
+        try:
+            index = await self._get_index(user_id)
+            started = time.perf_counter()
+            matches = [
+                (score, conversation_id)
+                for score, conversation_id in index.search(query, self.top_k, exclude)
+                if score >= self.min_score
+            ]
+            MEMORY_SEARCH_DURATION.observe(time.perf_counter() - started)
+            self.recalls += 1
+            if not matches:
+                return []
+
+            result = await db.execute(
+                select(*TURN_COLUMNS).where(
+                    Conversation.id.in_([conversation_id for _, conversation_id in matches]),
+                    Conversation.user_id == user_id
+                )
+            )
+            rows = {row.id: ConversationTurn._make(row) for row in result}
+        except Exception as e:
+            # Never fail a chat turn over its memory
+            logger.warning(f"Could not recall relevant turns for user {user_id}: {str(e)}")
+            await db.rollback()
+            return []
+
+        turns = []
+        for _, conversation_id in matches:
+            turn = rows.get(conversation_id)
+            if turn is None:
+                # Deleted by another process
+                index.remove(conversation_id)
+                continue
+            turns.append(turn)
+        self.recalled_turns += len(turns)
+        return turns
+
+    def clear(self) -> None:
+        """Drop all indexes"""
+        with self._lock:
+            self._indexes.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Get memory counters
+
+        Returns:
+            Dictionary with loaded users, indexed turns, approximate bytes and recall counters
+        """
+        with self._lock:
+            indexes = list(self._indexes.values())
+            stats = {
+                "enabled": self.enabled,
+                "users": len(indexes),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "loads": self.loads,
+                "evictions": self.evictions
+            }
+        stats["turns"] = sum(len(index) for index in indexes)
+        stats["clustered_users"] = sum(index.trained for index in indexes)
+        stats["recalls"] = self.recalls
+        stats["recalled_turns"] = self.recalled_turns
+        return stats
+
+    async def _get_index(self, user_id: int) -> IVFIndex:
+        """Get a user's index, loading it from the database on first use"""
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._indexes.move_to_end(user_id)
+                return index
+        return await self.loader.do_async(str(user_id), lambda: self._load(user_id))
+
+    async def _load(self, user_id: int) -> IVFIndex:
+        """
+        Build a user's index from their newest stored turns
+
+        add() ignores the user until the index is installed, so once it is,
+        turns saved since the first query are read again and indexed too.
+        """
+        turns = self._user_turns(user_id).order_by(Conversation.id.desc()).limit(self.max_turns_per_user)
+        # Own session: a coalesced load may outlive the request that started it
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(turns)).all()
+
+        # Embedding and clustering are CPU-bound, so keep them off the event loop
+        index = await asyncio.to_thread(self._build_index, rows)
+        with self._lock:
+            previous = self._indexes.pop(user_id, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._indexes[user_id] = index
+            self._bytes += index.nbytes
+            self.loads += 1
+            self._evict()
+
+        # Saves from here on reach the installed index through add()
+        newest = rows[0].id if rows else 0
+        async with AsyncSessionLocal() as db:
+            missed = (await db.execute(
+                self._user_turns(user_id).where(Conversation.id > newest).order_by(Conversation.id.desc())
+            )).all()
+        for conversation_id, user_message, ai_response in reversed(missed):
+            if conversation_id not in index:
+                self.add(user_id, conversation_id, user_message, ai_response)
+        return index
+
+    @staticmethod
+    def _user_turns(user_id: int):
+        """Select (id, user_message, ai_response) of a user's turns"""
+        return select(Conversation.id, Conversation.user_message, Conversation.ai_response).where(
+            Conversation.user_id == user_id
+        )
+
+    def _build_index(self, rows: Sequence) -> IVFIndex:
+        """Embed (id, user_message, ai_response) rows into a new index"""
+        index = IVFIndex(self.embedder.dim, nprobe=self.nprobe, train_threshold=self.train_threshold)
+        for conversation_id, user_message, ai_response in reversed(rows):
+            index.add(conversation_id, self.embedder.embed(self._turn_text(user_message, ai_response)))
+        return index
+
+    @staticmethod
+    def _turn_text(user_message: str, ai_response: str) -> str:
+        """Text embedded for a turn"""
+        return f"{user_message}\n{ai_response}"
+
+    def _evict(self) -> None:
+        """Evict least recently used indexes until within max_bytes (caller holds the lock)"""
+        while len(self._indexes) > 1 and self._bytes > self.max_bytes:
+            _, index = self._indexes.popitem(last=False)
+            self._bytes -= index.nbytes
+            self.evictions += 1
+
+# Global instance
+conversation_memory = ConversationMemory(
+    enabled=settings.RAG_ENABLED,
+    top_k=settings.RAG_TOP_K,
+    min_score=settings.RAG_MIN_SCORE,
+    dim=settings.RAG_EMBEDDING_DIM,
+    max_turns_per_user=settings.RAG_MAX_TURNS_PER_USER,
+    max_bytes=settings.RAG_MAX_BYTES,
+    train_threshold=settings.RAG_IVF_TRAIN_THRESHOLD,
+    nprobe=settings.RAG_IVF_NPROBE
+)
@@ -0,0 +1,379 @@
+"""
+Model call scheduler for Mellow AI Service
+
+Sits in front of every upstream Gemini call and smooths bursts into the
+quota: a concurrency cap, token buckets for requests-per-minute and
+tokens-per-minute, and a bounded FIFO wait queue where every request has
+a deadline. Rate-limit errors pause the scheduler for as long as the
+upstream retry hint asks.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+from app.core.config import settings
+from app.core.metrics import SCHEDULER_REJECTIONS, SCHEDULER_RETRIES, SCHEDULER_WAIT
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Retry hints as they appear in Gemini error messages
+_RETRY_IN = re.compile(r"retry in\s+([\d.]+)\s*(ms|s)\b", re.IGNORECASE)
+_RETRY_DELAY = re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)(?:\s*nanos:\s*(\d+))?", re.IGNORECASE)
+
+class SchedulerError(Exception):
+    """A model call was not started by the scheduler"""
+
+class QueueFullError(SchedulerError):
+    """The wait queue is full"""
+
+class DeadlineExceededError(SchedulerError):
+    """The request's deadline passed (or would pass) before it could start"""
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a per-minute rate
+
+    Takes may overdraw the bucket (e.g. when actual usage exceeds the
+    estimate), which simply delays the following requests.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        """
+        Initialize a full bucket
+
+        Args:
+            per_minute: Refill rate (0 disables the bucket)
+            capacity: Maximum burst, defaults to one minute of quota
+        """
+        self.rate = per_minute / 60
+        self.capacity = capacity if capacity is not None else per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the bucket limits anything"""
+        return self.rate > 0
+
+    def _refill(self) -> None:
+        """Add the tokens accrued since the last update"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount: float) -> float:
+        """
+        Seconds until `amount` tokens are available (0 if they are now)
+
+        Requests larger than the capacity only wait for a full bucket.
+        """
+        if not self.enabled:
+            return 0.0
+        self._refill()
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        """Remove tokens (may go negative)"""
+        if self.enabled:
+            self._refill()
+            self.tokens -= amount
+
+    def give_back(self, amount: float) -> None:
+        """Return tokens that were reserved but not used"""
+        if self.enabled:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Whether an upstream error is a quota/rate-limit (HTTP 429) error"""
+    code = getattr(error, "code", None)
+    if code == 429 or getattr(code, "value", None) == 429:
+        return True
+    return type(error).__name__ in ("ResourceExhausted", "TooManyRequests")
+
+def parse_retry_after(error: BaseException) -> Optional[float]:
+    """
+    Extract the retry delay an upstream error asks for
+
+    Looks at structured RetryInfo details, a Retry-After response header and
+    the "retry in 12.3s" / "retry_delay { seconds: 12 }" forms found in
+    Gemini error messages.
+
+    Args:
+        error: The upstream exception
+
+    Returns:
+        Delay in seconds, or None if the error carries no hint
+    """
+    for detail in getattr(error, "details", None) or ():
+        retry_delay = getattr(detail, "retry_delay", None)
+        if retry_delay is not None and hasattr(retry_delay, "seconds"):
+            return retry_delay.seconds + getattr(retry_delay, "nanos", 0) / 1e9
+
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        retry_after = headers.get("Retry-After")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+
+    message = str(error)
+    match = _RETRY_IN.search(message)
+    if match:
+        value = float(match.group(1))
+        return value / 1000 if match.group(2).lower() == "ms" else value
+    match = _RETRY_DELAY.search(message)
+    if match:
+        return int(match.group(1)) + int(match.group(2) or 0) / 1e9
+    return None
+
+class ModelScheduler:
+    """
+    Admission control for upstream model calls
+
+    Requests wait in FIFO order for a concurrency slot and for request and
+    token budget. A request that cannot start before its deadline, or that
+    arrives while `max_queue` others are already waiting, is rejected with a
+    SchedulerError instead of piling onto the upstream quota.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_queue: int,
+        queue_timeout_seconds: float,
+        max_retries: int
+    ):
+        """
+        Initialize the scheduler
+
+        Args:
+            max_concurrency: Maximum model calls in flight
+            requests_per_minute: Request quota (0 for no limit)
+            tokens_per_minute: Token quota, input plus output (0 for no limit)
+            max_queue: Maximum requests waiting to start
+            queue_timeout_seconds: Default deadline for a request to start
+            max_retries: Retries of a rate-limited call while its deadline allows
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.max_retries = max_retries
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        # Set from upstream retry hints; nothing starts before this time
+        self.paused_until = 0.0
+        self.waiting = 0
+        self.in_flight = 0
+        self.started = 0
+        self.rejected = 0
+        self.rate_limited = 0
+        self._consecutive_rate_limits = 0
+        # asyncio primitives belong to one event loop, so they are created lazily
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._gate: Optional[asyncio.Lock] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _primitives(self):
+        """Get the FIFO gate and slot semaphore for the running loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._gate = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        return self._gate, self._slots
+
+    @asynccontextmanager
+    async def slot(self, tokens: float, deadline: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Hold one model-call slot for the duration of the block
+
+        Args:
+            tokens: Estimated tokens (input plus output) the call will use
+            deadline: time.monotonic() value by which the call must start
+                (defaults to now + queue_timeout_seconds)
+
+        Raises:
+            QueueFullError: Too many requests are already waiting
+            DeadlineExceededError: The call could not start before its deadline
+        """
+        if deadline is None:
+            deadline = time.monotonic() + self.queue_timeout_seconds
+        _, slots = self._primitives()
+        await self._acquire(tokens, deadline)
+        self.in_flight += 1
+        try:
+            yield
+            self._consecutive_rate_limits = 0
+        except Exception as e:
+            self._on_error(e)
+            raise
+        finally:
+            self.in_flight -= 1
+            slots.release()
+
+    async def run(self, func: Callable[[], Awaitable[T]], tokens: float, deadline: Optional[float] = None) -> T:
+        """
+        Run a model call through the scheduler, retrying rate-limit errors
+
+        A rate-limited call is retried after the upstream retry hint (or an
+        exponential back-off) only if it can still start before its deadline.
+
+        Args:
+            func: Coroutine function making the call
+            tokens: Estimated tokens (input plus output) the call will use
+            deadline: time.monotonic() value by which the call must start
+
+        Returns:
+            The call's result
+        """
+        if deadline is None:
+            deadline = time.monotonic() + self.queue_timeout_seconds
+        attempt = 0
+        while True:
+            try:
+                async with self.slot(tokens, deadline):
+                    return await func()
+            except SchedulerError:
+                raise
+            except Exception as e:
+                if (
+                    not is_rate_limit_error(e)
+                    or attempt >= self.max_retries
+                    or self.paused_until >= deadline
+                ):
+                    raise
+                attempt += 1
+                SCHEDULER_RETRIES.inc()
+                logger.warning(f"Gemini call rate limited, retry {attempt} of {self.max_retries}")
+
+    def settle_tokens(self, estimated: float, actual: Optional[float]) -> None:
+        """
+        Correct the token bucket once the call reports its real usage
+
+        Args:
+            estimated: Tokens reserved when the call was admitted
+            actual: Tokens the upstream reports were used (None if unknown)
+        """
+        if actual is None:
+            return
+        if actual > estimated:
+            self.tokens.take(actual - estimated)
+        else:
+            self.tokens.give_back(estimated - actual)
+
+    def stats(self) -> dict:
+        """
+        Get scheduler state and counters
+
+        Returns:
+            Dictionary of scheduler statistics
+        """
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "started": self.started,
+            "rejected": self.rejected,
+            "rate_limited": self.rate_limited,
+            "paused_for_seconds": round(max(self.paused_until - time.monotonic(), 0.0), 3),
+            "request_tokens": round(self.requests.tokens, 1) if self.requests.enabled else None,
+            "tpm_tokens": round(self.tokens.tokens, 1) if self.tokens.enabled else None
+        }
+
+    async def _acquire(self, tokens: float, deadline: float) -> None:
+        """Wait in line for a slot and for budget, then take both"""
+        if self.waiting >= self.max_queue:
+            self._reject("queue_full")
+            raise QueueFullError(f"Model call queue is full ({self.max_queue} waiting)")
+
+        gate, slots = self._primitives()
+        queued_at = time.monotonic()
+        self.waiting += 1
+        try:
+            # The gate keeps arrival order: only its holder may take budget
+            await self._wait_until(gate.acquire(), deadline)
+            try:
+                await self._wait_until(slots.acquire(), deadline)
+                try:
+                    await self._wait_for_budget(tokens, deadline)
+                except BaseException:
+                    slots.release()
+                    raise
+            finally:
+                gate.release()
+        finally:
+            self.waiting -= 1
+
+        self.requests.take(1)
+        self.tokens.take(tokens)
+        self.started += 1
+        SCHEDULER_WAIT.observe(time.monotonic() - queued_at)
+
+    async def _wait_for_budget(self, tokens: float, deadline: float) -> None:
+        """Sleep until the pause has ended and both buckets can cover the call"""
+        while True:
+            now = time.monotonic()
+            delay = max(
+                self.paused_until - now,
+                self.requests.delay_for(1),
+                self.tokens.delay_for(tokens)
+            )
+            if delay <= 0:
+                return
+            if now + delay > deadline:
+                self._reject("deadline")
+                raise DeadlineExceededError(f"Model call could not start within its deadline (needs {delay:.2f}s)")
+            await asyncio.sleep(delay)
+
+    async def _wait_until(self, awaitable: Awaitable, deadline: float) -> None:
+        """Await a lock/semaphore acquire, giving up at the deadline"""
+        try:
+            await asyncio.wait_for(awaitable, max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            self._reject("deadline")
+            raise DeadlineExceededError("Model call could not start within its deadline")
+
+    def _reject(self, reason: str) -> None:
+        """Count one rejected request"""
+        self.rejected += 1
+        SCHEDULER_REJECTIONS.labels(reason=reason).inc()
+
+    def _on_error(self, error: Exception) -> None:
+        """Pause admissions when the upstream reports a rate limit"""
+        if not is_rate_limit_error(error):
+            return
+        self.rate_limited += 1
+        self._consecutive_rate_limits += 1
+        delay = parse_retry_after(error)
+        if delay is None:
+            # No hint: back off exponentially with consecutive rate limits
+            delay = min(2 ** self._consecutive_rate_limits, 60)
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        logger.warning(f"Gemini rate limit hit, pausing model calls for {delay:.1f}s")
+
+# Global instance
+model_scheduler = ModelScheduler(
+    max_concurrency=settings.GEMINI_MAX_CONCURRENCY,
+    requests_per_minute=settings.GEMINI_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.GEMINI_TOKENS_PER_MINUTE,
+    max_queue=settings.GEMINI_QUEUE_MAX,
+    queue_timeout_seconds=settings.GEMINI_QUEUE_TIMEOUT_SECONDS,
+    max_retries=settings.GEMINI_RATE_LIMIT_RETRIES
+)
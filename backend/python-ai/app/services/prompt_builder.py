@@ -0,0 +1,230 @@
+"""
+Token-budgeted prompt builder for Mellow AI Service
+
+Assembles the system prompt, conversation history and user message into a
+single prompt that stays within an input-token budget, and reports how
+many tokens each segment used.
+"""
+
+import logging
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from app.core.metrics import PROMPT_TOKENS
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Rough characters per token for English text with Gemini's tokenizer
+CHARS_PER_TOKEN = 4
+
+# Marker left where an oversize message was cut
+TRUNCATION_MARKER = " [...] "
+
+# Context used when there is no history to include
+NEW_CONVERSATION_CONTEXT = "This is the beginning of a new conversation."
+
+# Lines framing the history section
+HISTORY_HEADER = "Recent conversation history:"
+HISTORY_FOOTER = "\nContinuing the conversation:"
+SUMMARY_HEADER = "Summary of earlier conversations:"
+MEMORY_HEADER = "Relevant earlier conversations:"
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text without calling the API
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Approximate token count (rounded up)
+    """
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Shorten a text to about max_tokens, keeping its beginning and end
+
+    Args:
+        text: Text to shorten
+        max_tokens: Token limit
+
+    Returns:
+        The text unchanged if it fits, otherwise its head and tail joined by a marker
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    keep = max(max_chars - len(TRUNCATION_MARKER), 0)
+    head = keep * 2 // 3
+    tail = keep - head
+    return text[:head].rstrip() + TRUNCATION_MARKER + (text[-tail:].lstrip() if tail else "")
+
+class PromptUsage(NamedTuple):
+    """Token usage of one built prompt, per segment"""
+    system_tokens: int
+    summary_tokens: int
+    memory_tokens: int
+    history_tokens: int
+    message_tokens: int
+    total_tokens: int
+    turns_included: int
+    turns_trimmed: int
+    turns_dropped: int
+    memories_included: int
+    message_trimmed: bool
+
+class BuiltPrompt(NamedTuple):
+    """A prompt ready to send, with its history section and token usage"""
+    text: str
+    context: str
+    usage: PromptUsage
+
+class PromptBuilder:
+    """
+    Builds prompts that fit an input-token budget
+
+    The system prompt is fixed, so it is measured once. The user message is
+    trimmed to `max_message_tokens` and the running summary, if any, to
+    `max_summary_tokens`; history then fills what is left of the budget
+    newest turn first, each turn trimmed to `max_turn_tokens`, and is
+    rendered oldest first. Retrieved relevant turns get whatever is left
+    after that, up to `max_memory_tokens`.
+    """
+
+    def __init__(
+        self,
+        system_prompt: str,
+        input_token_budget: int,
+        max_message_tokens: int,
+        max_turn_tokens: int,
+        max_history_turns: int,
+        max_summary_tokens: int = 0,
+        max_memory_tokens: int = 0
+    ):
+        """
+        Initialize the builder
+
+        Args:
+            system_prompt: Static instructions placed at the top of every prompt
+            input_token_budget: Maximum estimated input tokens per prompt
+            max_message_tokens: Maximum tokens kept from the user's message
+            max_turn_tokens: Maximum tokens kept from each side of a history turn
+            max_history_turns: Maximum history turns included
+            max_summary_tokens: Maximum tokens kept from the running summary
+            max_memory_tokens: Maximum tokens spent on retrieved relevant turns
+        """
+        self.system_prompt = system_prompt
+        self.system_tokens = estimate_tokens(system_prompt)
+        self.input_token_budget = input_token_budget
+        self.max_message_tokens = max_message_tokens
+        self.max_turn_tokens = max_turn_tokens
+        self.max_history_turns = max_history_turns
+        self.max_summary_tokens = max_summary_tokens
+        self.max_memory_tokens = max_memory_tokens
+        # Header, footer and the blank lines around the history section
+        self._frame_tokens = estimate_tokens(f"{HISTORY_HEADER}\n{HISTORY_FOOTER}\n\n\n\n")
+
+    def build(
+        self,
+        user_message: str,
+        history: Optional[Sequence] = None,
+        summary: Optional[str] = None,
+        memories: Optional[Sequence] = None
+    ) -> BuiltPrompt:
+        """
+        Build the prompt for one user message
+
+        Args:
+            user_message: The user's input message
+            history: Recent turns (objects with user_message and ai_response), newest first
+            summary: Running summary of the conversations before `history`
+            memories: Earlier turns relevant to the message, most relevant first
+
+        Returns:
+            The prompt text, its history section and per-segment token usage
+        """
+        message = trim_to_tokens(user_message, self.max_message_tokens)
+        message_section = f"User: {message}\n\nAssistant:"
+        message_tokens = estimate_tokens(message_section)
+
+        summary_section = ""
+        if summary:
+            summary_section = f"{SUMMARY_HEADER}\n{trim_to_tokens(summary, self.max_summary_tokens)}\n\n"
+        summary_tokens = estimate_tokens(summary_section)
+
+        remaining = self.input_token_budget - self.system_tokens - message_tokens - summary_tokens - self._frame_tokens
+        turns: List[str] = []
+        turns_trimmed = 0
+        history = list(history or [])[:self.max_history_turns]
+        for turn in history:
+            rendered, trimmed = self._render_turn(turn)
+            tokens = estimate_tokens(rendered)
+            if tokens > remaining:
+                break
+            # One more token for the newline joining it to the next turn
+            remaining -= tokens + 1
+            turns.append(rendered)
+            turns_trimmed += int(trimmed)
+
+        # Relevant turns only get what recent history left over
+        recalled: List[str] = []
+        memory_budget = min(remaining, self.max_memory_tokens) - estimate_tokens(f"{MEMORY_HEADER}\n\n")
+        for turn in memories or []:
+            rendered, _ = self._render_turn(turn)
+            tokens = estimate_tokens(rendered)
+            if tokens > memory_budget:
+                continue
+            memory_budget -= tokens + 1
+            recalled.append(rendered)
+        memory_section = "\n".join([MEMORY_HEADER, *recalled]) + "\n\n" if recalled else ""
+        memory_tokens = estimate_tokens(memory_section)
+
+        if turns:
+            history_section = "\n".join([HISTORY_HEADER, *reversed(turns), HISTORY_FOOTER])
+        elif summary_section or memory_section:
+            history_section = HISTORY_FOOTER.lstrip()
+        else:
+            history_section = NEW_CONVERSATION_CONTEXT
+        history_tokens = estimate_tokens(history_section)
+        context = summary_section + memory_section + history_section
+
+        text = f"{self.system_prompt}\n\n{context}\n\n{message_section}"
+        usage = PromptUsage(
+            system_tokens=self.system_tokens,
+            summary_tokens=summary_tokens,
+            memory_tokens=memory_tokens,
+            history_tokens=history_tokens,
+            message_tokens=message_tokens,
+            total_tokens=estimate_tokens(text),
+            turns_included=len(turns),
+            turns_trimmed=turns_trimmed,
+            turns_dropped=len(history) - len(turns),
+            memories_included=len(recalled),
+            message_trimmed=message is not user_message
+        )
+        self._report(usage)
+        return BuiltPrompt(text=text, context=context, usage=usage)
+
+    def _render_turn(self, turn) -> Tuple[str, bool]:
+        """Render one turn, each side trimmed to max_turn_tokens; also reports whether it was trimmed"""
+        user_text = trim_to_tokens(turn.user_message, self.max_turn_tokens)
+        ai_text = trim_to_tokens(turn.ai_response, self.max_turn_tokens)
+        trimmed = user_text is not turn.user_message or ai_text is not turn.ai_response
+        return f"User: {user_text}\nAssistant: {ai_text}", trimmed
+
+    def _report(self, usage: PromptUsage) -> None:
+        """Record the token usage of a built prompt"""
+        PROMPT_TOKENS.labels(segment="system").observe(usage.system_tokens)
+        PROMPT_TOKENS.labels(segment="summary").observe(usage.summary_tokens)
+        PROMPT_TOKENS.labels(segment="memory").observe(usage.memory_tokens)
+        PROMPT_TOKENS.labels(segment="history").observe(usage.history_tokens)
+        PROMPT_TOKENS.labels(segment="message").observe(usage.message_tokens)
+        PROMPT_TOKENS.labels(segment="total").observe(usage.total_tokens)
+        logger.debug(
+            f"Built prompt: {usage.total_tokens} tokens (system {usage.system_tokens}, summary {usage.summary_tokens}, "
+            f"memory {usage.memory_tokens} from {usage.memories_included} relevant turns, "
+            f"history {usage.history_tokens} from {usage.turns_included} turns, "
+            f"message {usage.message_tokens}); {usage.turns_dropped} turns dropped, "
+            f"{usage.turns_trimmed} trimmed, message trimmed: {usage.message_trimmed}"
+        )
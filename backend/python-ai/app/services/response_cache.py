@@ -0,0 +1,128 @@
+"""
+Bounded response cache for Mellow AI Service
+
+Keeps recent model responses in memory so repeated prompts (common
+openers such as "hi" or "i feel anxious") skip the upstream model call.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config import settings
+
+class ResponseCache:
+    """In-process LRU cache with per-entry TTL and hit/miss/eviction counters"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        """
+        Initialize the cache
+
+        Args:
+            max_size: Maximum number of cached responses (LRU evicted beyond this)
+            ttl_seconds: Seconds a cached response stays valid
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(user_message: str, context_string: str) -> str:
+        """
+        Build a cache key from the normalized message and a hash of the context
+
+        Args:
+            user_message: The user's input message
+            context_string: The context string that goes into the prompt
+
+        Returns:
+            Cache key string
+        """
+        normalized_message = " ".join(user_message.lower().split())
+        context_hash = hashlib.sha256(context_string.encode("utf-8")).hexdigest()
+        return f"{context_hash}:{normalized_message}"
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            The cached response, or None on a miss or expired entry
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        """
+        Store a response, evicting the least recently used entries when full
+
+        Args:
+            key: Cache key from make_key
+            value: The response text to cache
+        """
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all cached responses (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Get cache counters
+
+        Returns:
+            Dictionary with size, capacity, hits, misses, evictions, expirations and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": settings.RESPONSE_CACHE_ENABLED,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+# Global instance
+response_cache = ResponseCache(
+    max_size=settings.RESPONSE_CACHE_SIZE,
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,125 @@
+"""
+Latency budget for chat responses
+
+Tracks recent Gemini latencies and decides when a response counts as slow
+(a fixed threshold, or the rolling p95) and when it is too late to wait
+any longer.
+"""
+
+import math
+import threading
+from collections import deque
+from typing import Deque, Optional
+
+from app.core.config import settings
+
+class LatencyTracker:
+    """Rolling window of recent latencies with percentile queries"""
+
+    def __init__(self, window: int, min_samples: int):
+        """
+        Initialize the tracker
+
+        Args:
+            window: Number of most recent latencies kept
+            min_samples: Samples needed before percentiles are reported
+        """
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        """Record one latency"""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Get a percentile of the recorded latencies
+
+        Args:
+            q: Percentile between 0 and 100
+
+        Returns:
+            Latency in seconds (nearest rank), or None with too few samples
+        """
+        with self._lock:
+            if len(self._samples) < max(self.min_samples, 1):
+                return None
+            ordered = sorted(self._samples)
+        rank = max(math.ceil(q / 100 * len(ordered)) - 1, 0)
+        return ordered[rank]
+
+class ResponseDeadline:
+    """
+    When to give up on, or hedge, a slow Gemini call
+
+    A call is "slow" after `slow_after_seconds`, or after the rolling p95
+    latency when that is 0. What happens then is `slow_action`: "hedge"
+    sends a second request and takes whichever answers first, "fallback"
+    returns the static response, "none" keeps waiting. Nothing waits past
+    `deadline_seconds` (0 for no deadline).
+    """
+
+    # Actions for slow calls
+    ACTIONS = ("hedge", "fallback", "none")
+
+    def __init__(self, deadline_seconds: float, slow_after_seconds: float, slow_action: str, tracker: LatencyTracker):
+        """
+        Initialize the policy
+
+        Args:
+            deadline_seconds: Hard limit on waiting for Gemini (0 disables it)
+            slow_after_seconds: Fixed slow threshold (0 uses the adaptive p95)
+            slow_action: "hedge", "fallback" or "none"
+            tracker: Latencies of recent successful Gemini responses
+        """
+        if slow_action not in self.ACTIONS:
+            raise ValueError(f"slow_action must be one of {', '.join(self.ACTIONS)}, got {slow_action!r}")
+        self.deadline_seconds = deadline_seconds
+        self.slow_after_seconds = slow_after_seconds
+        self.slow_action = slow_action
+        self.tracker = tracker
+
+    def deadline(self) -> Optional[float]:
+        """Seconds to wait in total, or None for no limit"""
+        return self.deadline_seconds or None
+
+    def slow_after(self) -> Optional[float]:
+        """
+        Seconds after which a call counts as slow
+
+        Returns:
+            The threshold, or None when slow calls are not acted on (or the
+            adaptive threshold has too few samples yet)
+        """
+        if self.slow_action == "none":
+            return None
+        threshold = self.slow_after_seconds or self.tracker.percentile(95)
+        deadline = self.deadline()
+        if threshold is None or (deadline is not None and threshold >= deadline):
+            return None
+        return threshold
+
+    def stats(self) -> dict:
+        """
+        Get the current thresholds
+
+        Returns:
+            Dictionary with the deadline, slow threshold and latency percentiles
+        """
+        return {
+            "deadline_seconds": self.deadline(),
+            "slow_after_seconds": self.slow_after(),
+            "slow_action": self.slow_action,
+            "p50_seconds": self.tracker.percentile(50),
+            "p95_seconds": self.tracker.percentile(95)
+        }
+
+# Global instance
+response_deadline = ResponseDeadline(
+    deadline_seconds=settings.CHAT_DEADLINE_SECONDS,
+    slow_after_seconds=settings.CHAT_SLOW_AFTER_SECONDS,
+    slow_action=settings.CHAT_SLOW_ACTION,
+    tracker=LatencyTracker(settings.CHAT_LATENCY_WINDOW, settings.CHAT_LATENCY_MIN_SAMPLES)
+)
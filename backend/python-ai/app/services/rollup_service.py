@@ -0,0 +1,320 @@
+"""
+Conversation rollup service for Mellow AI Service
+
+Maintains pre-aggregated conversation counts so analytics reads never
+scan the conversations table, no matter how many conversations are stored.
+"""
+
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.database import Conversation, ConversationRollup
+from app.services.analytics_cache import analytics_cache
+from app.services.archive_service import ConversationArchiver
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Rollup granularities (rows of the former "total" granularity are ignored:
+# the total is the sum of the day rows, so writers share no single hot row)
+GRANULARITY_DAY = "day"
+GRANULARITY_HOUR = "hour"
+
+RollupKey = Tuple[str, datetime]
+
+class RollupService:
+    """Service for maintaining and reading conversation count rollups"""
+
+    @staticmethod
+    def _as_utc(timestamp: datetime) -> datetime:
+        """Normalize a timestamp to an aware UTC datetime (naive values are treated as UTC)"""
+        if timestamp.tzinfo is None:
+            return timestamp.replace(tzinfo=timezone.utc)
+        return timestamp.astimezone(timezone.utc)
+
+    @staticmethod
+    def hour_bucket(timestamp: datetime) -> datetime:
+        """Get the UTC hour bucket for a timestamp"""
+        return RollupService._as_utc(timestamp).replace(minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def day_bucket(timestamp: datetime) -> datetime:
+        """Get the UTC day bucket for a timestamp"""
+        return RollupService._as_utc(timestamp).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def compute_deltas(timestamps: Iterable[datetime], delta: int = 1) -> Dict[RollupKey, int]:
+        """
+        Compute rollup row deltas for a set of conversation timestamps
+
+        Args:
+            timestamps: Timestamps of the conversations being added or removed
+            delta: +1 for inserts, -1 for deletes
+
+        Returns:
+            Mapping of (granularity, bucket) to count delta
+        """
+        deltas: Counter = Counter()
+        for timestamp in timestamps:
+            deltas[(GRANULARITY_HOUR, RollupService.hour_bucket(timestamp))] += delta
+            deltas[(GRANULARITY_DAY, RollupService.day_bucket(timestamp))] += delta
+        return dict(deltas)
+
+    @staticmethod
+    def _build_upsert(dialect_name: str, deltas: Dict[RollupKey, int]):
+        """
+        Build a single INSERT ... ON CONFLICT DO UPDATE adding the deltas
+
+        Args:
+            dialect_name: SQLAlchemy dialect name of the target database
+            deltas: Mapping of (granularity, bucket) to count delta
+
+        Returns:
+            Executable upsert statement
+        """
+        insert = sqlite.insert if dialect_name == "sqlite" else postgresql.insert
+        rows = [
+            {"granularity": granularity, "bucket": bucket, "conversation_count": count}
+            for (granularity, bucket), count in sorted(deltas.items())
+        ]
+        stmt = insert(ConversationRollup).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[ConversationRollup.granularity, ConversationRollup.bucket],
+            set_={"conversation_count": ConversationRollup.conversation_count + stmt.excluded.conversation_count}
+        )
+
+    @staticmethod
+    def record_conversations(db: Session, timestamps: Iterable[datetime], delta: int = 1) -> None:
+        """
+        Add conversation count deltas inside the caller's transaction
+
+        Args:
+            db: Database session (the caller commits)
+            timestamps: Timestamps of the conversations being added or removed
+            delta: +1 for inserts, -1 for deletes
+        """
+        deltas = RollupService.compute_deltas(timestamps, delta)
+        if deltas:
+            db.execute(RollupService._build_upsert(db.get_bind().dialect.name, deltas))
+
+    @staticmethod
+    async def record_conversations_async(db: AsyncSession, timestamps: Iterable[datetime], delta: int = 1) -> None:
+        """
+        Add conversation count deltas inside the caller's transaction without blocking the event loop
+
+        Args:
+            db: Async database session (the caller commits)
+            timestamps: Timestamps of the conversations being added or removed
+            delta: +1 for inserts, -1 for deletes
+        """
+        deltas = RollupService.compute_deltas(timestamps, delta)
+        if deltas:
+            await db.execute(RollupService._build_upsert(db.get_bind().dialect.name, deltas))
+
+    @staticmethod
+    def get_total(db: Session) -> int:
+        """
+        Get the total number of conversations
+
+        Sums the day rows (one per UTC day with conversations, archived
+        months included), an index range read on the rollup key.
+
+        Args:
+            db: Database session
+
+        Returns:
+            Total conversation count
+        """
+        count = db.execute(
+            select(func.sum(ConversationRollup.conversation_count)).where(
+                ConversationRollup.granularity == GRANULARITY_DAY
+            )
+        ).scalar()
+        return int(count or 0)
+
+    @staticmethod
+    def get_count_since(db: Session, since: datetime) -> int:
+        """
+        Get the number of conversations since a point in time
+
+        Whole hours are read from the hourly rollup. The part of the first
+        hour before `since` is counted from the conversations table (an
+        index range of under an hour) and subtracted, so the window is exact.
+
+        Args:
+            db: Database session
+            since: Start of the window
+
+        Returns:
+            Conversation count in the window
+        """
+        first_hour = RollupService.hour_bucket(since)
+        count = db.execute(
+            select(func.sum(ConversationRollup.conversation_count)).where(
+                ConversationRollup.granularity == GRANULARITY_HOUR,
+                ConversationRollup.bucket >= first_hour
+            )
+        ).scalar()
+        before_since = 0
+        if RollupService._as_utc(since) > first_hour:
+            before_since = db.execute(
+                select(func.count(Conversation.id)).where(
+                    Conversation.timestamp >= first_hour,
+                    Conversation.timestamp < since
+                )
+            ).scalar()
+        return max(int(count or 0) - int(before_since or 0), 0)
+
+    @staticmethod
+    def get_daily_counts(db: Session, since: datetime) -> List[Tuple[datetime, int]]:
+        """
+        Get per-day conversation counts since a point in time
+
+        Args:
+            db: Database session
+            since: Start of the window (the UTC day containing it is included)
+
+        Returns:
+            List of (UTC day bucket, count) tuples in date order
+        """
+        rows = db.execute(
+            select(ConversationRollup.bucket, ConversationRollup.conversation_count).where(
+                ConversationRollup.granularity == GRANULARITY_DAY,
+                ConversationRollup.bucket >= RollupService.day_bucket(since)
+            ).order_by(ConversationRollup.bucket)
+        ).all()
+        return [(RollupService._as_utc(row.bucket), int(row.conversation_count)) for row in rows]
+
+    @staticmethod
+    def get_hourly_counts(db: Session, since: datetime) -> List[Tuple[datetime, int]]:
+        """
+        Get per-hour conversation counts since a point in time
+
+        Args:
+            db: Database session
+            since: Start of the window (the UTC hour containing it is included)
+
+        Returns:
+            List of (UTC hour bucket, count) tuples in time order
+        """
+        rows = db.execute(
+            select(ConversationRollup.bucket, ConversationRollup.conversation_count).where(
+                ConversationRollup.granularity == GRANULARITY_HOUR,
+                ConversationRollup.bucket >= RollupService.hour_bucket(since)
+            ).order_by(ConversationRollup.bucket)
+        ).all()
+        return [(RollupService._as_utc(row.bucket), int(row.conversation_count)) for row in rows]
+
+    @staticmethod
+    def _count_hours(db: Session, since: Optional[datetime] = None) -> Dict[datetime, int]:
+        """Count conversations per UTC hour straight from the conversations table"""
+        window = [Conversation.timestamp >= since] if since is not None else []
+        if db.get_bind().dialect.name == "postgresql":
+            hour = func.date_trunc("hour", Conversation.timestamp, "UTC")
+            rows = db.execute(
+                select(hour.label("bucket"), func.count(Conversation.id)).where(*window).group_by(hour)
+            ).all()
+            return {RollupService._as_utc(bucket): count for bucket, count in rows if bucket is not None}
+
+        # Portable fallback: stream the timestamps and bucket them here
+        counts: Counter = Counter()
+        result = db.execute(
+            select(Conversation.timestamp).where(*window).execution_options(yield_per=5000)
+        )
+        for (timestamp,) in result:
+            if timestamp is not None:
+                counts[RollupService.hour_bucket(timestamp)] += 1
+        return dict(counts)
+
+    @staticmethod
+    def _stored_counts(db: Session, since: Optional[datetime] = None) -> Dict[RollupKey, int]:
+        """Read the hour and day rollup rows, optionally from a bucket on"""
+        window = [ConversationRollup.bucket >= since] if since is not None else []
+        rows = db.execute(
+            select(ConversationRollup.granularity, ConversationRollup.bucket, ConversationRollup.conversation_count).where(
+                ConversationRollup.granularity.in_((GRANULARITY_HOUR, GRANULARITY_DAY)),
+                *window
+            )
+        ).all()
+        return {(granularity, RollupService._as_utc(bucket)): int(count) for granularity, bucket, count in rows}
+
+    @staticmethod
+    def reconcile(db: Session, days: Optional[int] = None) -> dict:
+        """
+        Correct rollup rows that drifted from the conversations table
+
+        Corrects drift from writes that bypassed this service (e.g. the Node
+        backend inserting directly). Only the last `days` UTC days (today
+        included) are checked, an index range of the conversations table;
+        None checks the full history. Buckets of archived months are never
+        touched (their rows are no longer in the table, and can no longer
+        change).
+
+        The table and the rollups are first read in one snapshot without
+        locking anything: every service write changes both in the same
+        transaction, so within a snapshot they only differ by drift. The
+        differences are then added as deltas, the same upserts writers use,
+        so they commute with writes that committed since the snapshot and
+        no writer ever waits for the reconcile.
+
+        Args:
+            db: Database session
+            days: UTC days to check, or None for everything
+
+        Returns:
+            Dictionary with the buckets checked and corrected
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            # One snapshot for every read below
+            db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        since = None
+        if days is not None:
+            since = RollupService.day_bucket(datetime.now(timezone.utc)) - timedelta(days=max(days, 1) - 1)
+        archived_until, _ = ConversationArchiver.archived_totals(db)
+        if archived_until is not None:
+            archived_until = RollupService._as_utc(archived_until)
+            since = max(since, archived_until) if since is not None else archived_until
+
+        expected: Counter = Counter()
+        for bucket, count in RollupService._count_hours(db, since).items():
+            expected[(GRANULARITY_HOUR, bucket)] += count
+            expected[(GRANULARITY_DAY, bucket.replace(hour=0))] += count
+        stored = RollupService._stored_counts(db, since)
+        db.commit()
+
+        corrections = {
+            key: expected.get(key, 0) - stored.get(key, 0)
+            for key in set(expected) | set(stored)
+            if expected.get(key, 0) != stored.get(key, 0)
+        }
+        if corrections:
+            db.execute(RollupService._build_upsert(db.get_bind().dialect.name, corrections))
+            db.commit()
+
+        checked = len(set(expected) | set(stored))
+        logger.info(f"Reconciled conversation rollups: buckets={checked}, corrected={len(corrections)}")
+        return {"buckets_checked": checked, "buckets_corrected": len(corrections)}
+
+def reconcile_rollups() -> dict:
+    """Reconcile recent rollups in a fresh session (entry point for the periodic job)"""
+    db = SessionLocal()
+    try:
+        result = RollupService.reconcile(db, days=settings.ROLLUP_RECONCILE_DAYS or None)
+        if result["buckets_corrected"]:
+            # Corrected counts must not be hidden behind cached analytics
+            analytics_cache.invalidate()
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,177 @@
+"""
+Conversation search service for Mellow AI Service
+
+On Postgres, searches use the search_vector tsvector column and its GIN
+index (database/init/06-conversation-search.sql), ranked with ts_rank_cd.
+Other databases (SQLite in development and tests) use an in-process
+inverted index that catches up with new conversations on every search.
+"""
+
+import base64
+import json
+from typing import List, Optional, Tuple
+
+from sqlalchemy import REAL, and_, cast, func, literal, literal_column, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.database import Conversation
+from app.utils.inverted_index import InvertedIndex
+
+# Text search configuration used to build search_vector
+SEARCH_CONFIG = "english"
+
+# Rows indexed per round trip when the fallback index catches up
+INDEX_CATCH_UP_CHUNK_SIZE = 1000
+
+# Fallback index for databases without full-text search
+search_index = InvertedIndex()
+
+class SearchService:
+    """Service for ranked full-text search over conversations"""
+
+    @staticmethod
+    def encode_cursor(rank: float, conversation_id: int) -> str:
+        """
+        Encode a keyset cursor pointing just after a search result
+
+        Args:
+            rank: Rank of the last result on the current page
+            conversation_id: ID of the last result on the current page
+
+        Returns:
+            Opaque URL-safe cursor string
+        """
+        payload = json.dumps([rank, conversation_id])
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[float, int]:
+        """
+        Decode a search cursor
+
+        Args:
+            cursor: Cursor produced by encode_cursor
+
+        Returns:
+            Tuple of (rank, id) of the last result already returned
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            rank, conversation_id = json.loads(base64.urlsafe_b64decode(padded))
+            return float(rank), int(conversation_id)
+        except Exception as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    @staticmethod
+    def search(
+        db: Session,
+        query: str,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        user_id: Optional[int] = None
+    ) -> Tuple[List[Tuple[Conversation, float]], Optional[str]]:
+        """
+        Search conversations, best match first, with keyset pagination
+
+        Args:
+            db: Database session
+            query: Search text (Postgres accepts web-search syntax: "quoted phrases", OR, -exclusions)
+            limit: Maximum number of results to return
+            cursor: Cursor returned with the previous page, or None for the first page
+            user_id: Only search this user's conversations
+
+        Returns:
+            Tuple of ((conversation, rank) pairs, cursor for the next page or None)
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        after = SearchService.decode_cursor(cursor) if cursor else None
+        if db.get_bind().dialect.name == "postgresql":
+            results = SearchService._search_postgres(db, query, limit + 1, after, user_id)
+        else:
+            results = SearchService._search_index(db, query, limit + 1, after, user_id)
+
+        if len(results) > limit:
+            results = results[:limit]
+            conversation, rank = results[-1]
+            return results, SearchService.encode_cursor(rank, conversation.id)
+        return results, None
+
+    @staticmethod
+    def _search_postgres(
+        db: Session,
+        query: str,
+        limit: int,
+        after: Optional[Tuple[float, int]],
+        user_id: Optional[int]
+    ) -> List[Tuple[Conversation, float]]:
+        """Rank matches of the GIN-indexed search_vector column"""
+        tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+        search_vector = literal_column("conversations.search_vector")
+        rank = func.ts_rank_cd(search_vector, tsquery)
+
+        stmt = select(Conversation, rank.label("rank")).where(search_vector.op("@@")(tsquery))
+        if user_id is not None:
+            stmt = stmt.where(Conversation.user_id == user_id)
+        if after is not None:
+            # ts_rank_cd returns real, so the cursor rank is compared as real too
+            after_rank = cast(literal(after[0]), REAL)
+            stmt = stmt.where(or_(rank < after_rank, and_(rank == after_rank, Conversation.id < after[1])))
+
+        stmt = stmt.order_by(rank.desc(), Conversation.id.desc()).limit(limit)
+        return [(conversation, float(rank)) for conversation, rank in db.execute(stmt)]
+
+    @staticmethod
+    def _search_index(
+        db: Session,
+        query: str,
+        limit: int,
+        after: Optional[Tuple[float, int]],
+        user_id: Optional[int]
+    ) -> List[Tuple[Conversation, float]]:
+        """
+        Rank matches from the in-process index
+
+        BM25 scores depend on the whole collection, so pages can shift
+        slightly when conversations are added between requests.
+        """
+        SearchService._catch_up(db)
+
+        matches = search_index.search(query, owner=user_id)
+        if after is not None:
+            matches = [(score, doc_id) for score, doc_id in matches if (score, doc_id) < after]
+
+        # Fetch rows in ranked order, dropping any deleted by another process
+        results: List[Tuple[Conversation, float]] = []
+        for start in range(0, len(matches), limit):
+            chunk = matches[start:start + limit]
+            rows = {
+                conversation.id: conversation
+                for conversation in db.execute(
+                    select(Conversation).where(Conversation.id.in_([doc_id for _, doc_id in chunk]))
+                ).scalars()
+            }
+            for score, doc_id in chunk:
+                if doc_id in rows:
+                    results.append((rows[doc_id], score))
+                else:
+                    search_index.remove(doc_id)
+            if len(results) >= limit:
+                break
+        return results[:limit]
+
+    @staticmethod
+    def _catch_up(db: Session) -> None:
+        """Index conversations added since the last search"""
+        stmt = (
+            select(Conversation.id, Conversation.user_message, Conversation.ai_response, Conversation.user_id)
+            .where(Conversation.id > search_index.last_id)
+            .order_by(Conversation.id)
+            .execution_options(yield_per=INDEX_CATCH_UP_CHUNK_SIZE)
+        )
+        for conversation_id, user_message, ai_response, user_id in db.execute(stmt):
+            search_index.add(conversation_id, f"{user_message}\n{ai_response}", owner=user_id)
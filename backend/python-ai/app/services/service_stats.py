@@ -0,0 +1,43 @@
+"""
+Registry of in-process service statistics for Mellow AI Service
+
+Every cache, queue and background worker reports its counters through a
+stats() method. They are listed here once, so GET /health/components and
+the Prometheus collector read the same providers.
+"""
+
+from typing import Callable, Dict
+
+from app.services.analytics_cache import analytics_cache
+from app.services.analytics_jobs import analytics_worker
+from app.services.archive_service import conversation_archiver
+from app.services.context_store import context_store
+from app.services.memory_service import conversation_memory
+from app.services.model_scheduler import model_scheduler
+from app.services.response_cache import response_cache
+from app.services.response_deadline import response_deadline
+from app.services.summary_service import conversation_summarizer
+from app.services.write_behind import write_behind
+
+# Component name -> function returning its counters
+SERVICE_STATS: Dict[str, Callable[[], dict]] = {
+    "response_cache": response_cache.stats,
+    "analytics_cache": analytics_cache.stats,
+    "analytics_jobs": analytics_worker.stats,
+    "archive": conversation_archiver.stats,
+    "context_store": context_store.stats,
+    "write_behind": write_behind.stats,
+    "scheduler": model_scheduler.stats,
+    "summarizer": conversation_summarizer.stats,
+    "memory": conversation_memory.stats,
+    "latency": response_deadline.stats,
+}
+
+def collect_service_stats() -> Dict[str, dict]:
+    """
+    Read every registered component's counters
+
+    Returns:
+        Dictionary of component name to its stats
+    """
+    return {name: stats() for name, stats in SERVICE_STATS.items()}
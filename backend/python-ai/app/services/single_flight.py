@@ -0,0 +1,92 @@
+"""
+Request coalescing ("single flight") for Mellow AI Service
+
+Concurrent callers asking for the same key share one in-flight call and
+all receive its result (or its exception), so a burst of identical
+prompts costs a single upstream request.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict
+
+from app.core.metrics import COALESCED_CALLS
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key on the event loop"""
+
+    def __init__(self, name: str):
+        """
+        Initialize the group
+
+        Args:
+            name: Label used for the merged-calls metric
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Callers awaiting each shared task
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self.calls = 0
+        self.merged = 0
+
+    async def do_async(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await func(), or join the identical call already in flight on this loop
+
+        The shared call runs as its own task, so a caller that is cancelled
+        (e.g. a client disconnect) does not cancel it for the others; it is
+        only cancelled when every caller waiting on it has been.
+
+        Args:
+            key: Fingerprint of the call
+            func: Coroutine function making the call
+
+        Returns:
+            The result of the shared call (its exception is raised in every caller)
+        """
+        task = self._tasks.get(key)
+        leader = task is None or task.get_loop() is not asyncio.get_running_loop()
+        if leader:
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        with self._lock:
+            self._count(leader)
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1:
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    def stats(self) -> dict:
+        """
+        Get coalescing counters
+
+        Returns:
+            Dictionary with calls, merged calls and calls currently in flight
+        """
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "merged": self.merged,
+                "in_flight": len(self._tasks)
+            }
+
+    def _count(self, leader: bool) -> None:
+        """Count one call (caller holds the lock)"""
+        self.calls += 1
+        if not leader:
+            self.merged += 1
+            COALESCED_CALLS.labels(name=self.name).inc()
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        """Remove a finished task unless a newer call has replaced it"""
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
@@ -0,0 +1,316 @@
+"""
+Background rolling summarization of conversation histories
+
+Older turns of each user are folded into a stored running summary by a
+background worker, so the prompt carries the summary plus the last few
+raw turns and stays the same size however long the history grows.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.database import Conversation, ConversationSummary
+from app.services.context_store import TURN_COLUMNS, ConversationTurn
+from app.services.gemini_service import gemini_service
+from app.utils.summarization import ExtractiveSummarizer
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Instructions for the Gemini summarizer backend
+SUMMARY_PROMPT = """Update the running summary of a supportive conversation between a user and Mellow, a mental health assistant.
+Keep what matters for continuing the conversation: recurring topics, feelings, important life events and anything the user asked to be remembered.
+Write plain text, at most {max_chars} characters, in the third person ("The user ...").
+
+Current summary:
+{previous}
+
+New conversation turns:
+{turns}
+
+Updated summary:"""
+
+class ConversationSummarizer:
+    """
+    Maintains per-user running summaries off the request path
+
+    Saves call note_turns(); once a user has `trigger_turns` new turns a
+    job is queued, and the worker folds every turn older than the newest
+    `keep_recent_turns` into that user's summary. Only users are summarized:
+    anonymous sessions have no stored history to summarize.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        trigger_turns: int,
+        keep_recent_turns: int,
+        max_turns_per_run: int,
+        max_chars: int,
+        backend: str,
+        cache_size: int
+    ):
+        """
+        Initialize the summarizer
+
+        Args:
+            enabled: Use and maintain summaries at all
+            trigger_turns: New turns of a user that trigger a summarization run
+            keep_recent_turns: Newest turns left out of the summary (sent verbatim)
+            max_turns_per_run: Turns folded in per database round trip
+            max_chars: Maximum summary length
+            backend: "local" (deterministic extractive) or "gemini"
+            cache_size: Summaries kept in memory
+        """
+        self.enabled = enabled
+        self.trigger_turns = trigger_turns
+        self.keep_recent_turns = keep_recent_turns
+        self.max_turns_per_run = max_turns_per_run
+        self.max_chars = max_chars
+        self.backend = backend
+        self.cache_size = cache_size
+        self.local = ExtractiveSummarizer(max_chars=max_chars)
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._new_turns: Dict[int, int] = {}
+        self._queued: Set[int] = set()
+        # user_id -> summary (None: the user has no summary yet)
+        self._cache: "OrderedDict[int, Optional[str]]" = OrderedDict()
+        self.runs = 0
+        self.turns_summarized = 0
+        self.failures = 0
+
+    @property
+    def running(self) -> bool:
+        """Whether the worker task is running"""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the worker task on the running event loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._queued.clear()
+        self._task = asyncio.create_task(self._run(), name="conversation-summarizer")
+
+    async def stop(self) -> None:
+        """Stop the worker task (queued jobs are re-triggered by later turns)"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def note_turns(self, user_id: Optional[int], count: int = 1) -> None:
+        """
+        Count new turns of a user, queueing a summarization run when due
+
+        Args:
+            user_id: Owner of the new turns
+            count: Number of new turns
+        """
+        if user_id is None or not self.running:
+            return
+        pending = self._new_turns.get(user_id, 0) + count
+        if pending < self.trigger_turns or user_id in self._queued:
+            self._new_turns[user_id] = pending
+            return
+        self._new_turns.pop(user_id, None)
+        self._queued.add(user_id)
+        self._queue.put_nowait(user_id)
+
+    async def get_summary_async(self, db: AsyncSession, user_id: Optional[int]) -> Optional[str]:
+        """
+        Get a user's running summary for the prompt
+
+        Args:
+            db: Async database session
+            user_id: The user, if known
+
+        Returns:
+            The summary, or None if the user has none (or it cannot be read)
+        """
+        if not self.enabled or user_id is None:
+            return None
+        if user_id in self._cache:
+            self._cache.move_to_end(user_id)
+            return self._cache[user_id]
+        try:
+            row = await db.get(ConversationSummary, user_id)
+        except Exception as e:
+            # Never fail a chat turn over its summary
+            logger.warning(f"Could not load conversation summary for user {user_id}: {str(e)}")
+            await db.rollback()
+            return None
+        summary = row.summary if row else None
+        self._remember(user_id, summary)
+        return summary
+
+    def invalidate(self, db: Session, user_id: Optional[int], conversation_id: int) -> None:
+        """
+        Drop a user's summary if it includes a conversation being deleted
+
+        Runs inside the caller's transaction; the summary is rebuilt from the
+        remaining turns by the next run.
+
+        Args:
+            db: Database session
+            user_id: Owner of the deleted conversation
+            conversation_id: ID of the deleted conversation
+        """
+        if not self.enabled or user_id is None:
+            return
+        db.execute(self._invalidate_statement(user_id, conversation_id))
+        self._cache.pop(user_id, None)
+
+    async def invalidate_async(self, db: AsyncSession, user_id: Optional[int], conversation_id: int) -> None:
+        """Async twin of invalidate"""
+        if not self.enabled or user_id is None:
+            return
+        await db.execute(self._invalidate_statement(user_id, conversation_id))
+        self._cache.pop(user_id, None)
+
+    async def summarize_user(self, user_id: int) -> int:
+        """
+        Fold a user's older unsummarized turns into their summary
+
+        Args:
+            user_id: The user to summarize
+
+        Returns:
+            Number of turns folded in
+        """
+        folded = 0
+        async with AsyncSessionLocal() as db:
+            row = await db.get(ConversationSummary, user_id)
+            summary = row.summary if row else None
+            last_id = row.last_conversation_id if row else 0
+
+            cutoff = await self._recent_cutoff(db, user_id)
+            while cutoff is not None:
+                result = await db.execute(
+                    select(*TURN_COLUMNS)
+                    .where(
+                        Conversation.user_id == user_id,
+                        Conversation.id > last_id,
+                        Conversation.id < cutoff
+                    )
+                    .order_by(Conversation.id)
+                    .limit(self.max_turns_per_run)
+                )
+                turns = [ConversationTurn._make(row) for row in result]
+                if not turns:
+                    break
+
+                summary = await self._summarize(summary, turns)
+                last_id = turns[-1].id
+                folded += len(turns)
+
+                if row is None:
+                    row = ConversationSummary(user_id=user_id, summary=summary, last_conversation_id=last_id, turns_summarized=0)
+                    db.add(row)
+                row.summary = summary
+                row.last_conversation_id = last_id
+                row.turns_summarized = (row.turns_summarized or 0) + len(turns)
+                await db.commit()
+
+                if len(turns) < self.max_turns_per_run:
+                    break
+
+        if folded:
+            self._remember(user_id, summary)
+        self.runs += 1
+        self.turns_summarized += folded
+        return folded
+
+    def stats(self) -> dict:
+        """
+        Get summarizer counters
+
+        Returns:
+            Dictionary of summarizer statistics
+        """
+        return {
+            "enabled": self.enabled,
+            "running": self.running,
+            "backend": self.backend,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "cached_summaries": len(self._cache),
+            "runs": self.runs,
+            "turns_summarized": self.turns_summarized,
+            "failures": self.failures
+        }
+
+    async def _run(self) -> None:
+        """Worker loop: summarize queued users one at a time"""
+        while True:
+            user_id = await self._queue.get()
+            try:
+                folded = await self.summarize_user(user_id)
+                logger.debug(f"Summarized {folded} turns for user {user_id}")
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Summarizing conversations of user {user_id} failed: {str(e)}")
+            finally:
+                self._queued.discard(user_id)
+
+    async def _recent_cutoff(self, db: AsyncSession, user_id: int) -> Optional[int]:
+        """ID of the oldest turn kept verbatim; turns before it may be summarized"""
+        result = await db.execute(
+            select(Conversation.id)
+            .where(Conversation.user_id == user_id)
+            .order_by(Conversation.id.desc())
+            .offset(max(self.keep_recent_turns - 1, 0))
+            .limit(1)
+        )
+        return result.scalar()
+
+    async def _summarize(self, previous: Optional[str], turns: List[ConversationTurn]) -> str:
+        """Run the configured backend, falling back to the local summarizer"""
+        if self.backend == "gemini" and gemini_service.is_available():
+            prompt = SUMMARY_PROMPT.format(
+                max_chars=self.max_chars,
+                previous=previous or "(none yet)",
+                turns="\n".join(f"User: {turn.user_message}\nAssistant: {turn.ai_response}" for turn in turns)
+            )
+            summary = await gemini_service.generate_text_async(prompt)
+            if summary:
+                return summary[:self.max_chars]
+        return self.local.summarize(previous, turns)
+
+    def _remember(self, user_id: int, summary: Optional[str]) -> None:
+        """Cache a user's summary, evicting the least recently used"""
+        self._cache[user_id] = summary
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _invalidate_statement(user_id: int, conversation_id: int):
+        """DELETE of a summary that covers a conversation"""
+        return delete(ConversationSummary).where(
+            ConversationSummary.user_id == user_id,
+            ConversationSummary.last_conversation_id >= conversation_id
+        )
+
+# Global instance
+conversation_summarizer = ConversationSummarizer(
+    enabled=settings.SUMMARY_ENABLED,
+    trigger_turns=settings.SUMMARY_TRIGGER_TURNS,
+    keep_recent_turns=settings.SUMMARY_KEEP_RECENT_TURNS,
+    max_turns_per_run=settings.SUMMARY_MAX_TURNS_PER_RUN,
+    max_chars=settings.SUMMARY_MAX_CHARS,
+    backend=settings.SUMMARY_BACKEND,
+    cache_size=settings.SUMMARY_CACHE_SIZE
+)
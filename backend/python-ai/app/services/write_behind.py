@@ -0,0 +1,267 @@
+"""
+Write-behind persistence for conversation turns
+
+Chat turns are queued in process and flushed to the database in bulk by a
+background task, so the response does not wait for the commit.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.services.context_store import ConversationTurn, context_key, context_store
+from app.services.conversation_service import ConversationService
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class PendingConversation(NamedTuple):
+    """A conversation turn waiting to be written"""
+    user_message: str
+    ai_response: str
+    user_id: Optional[int]
+    timestamp: datetime
+    # The turn as added to the context store, and the keys it was added under
+    turn: Optional[ConversationTurn] = None
+    context_keys: Tuple[str, ...] = ()
+    attempts: int = 0
+
+class ConversationWriteBehind:
+    """
+    Bounded queue of conversation turns flushed in multi-row batches
+
+    A batch is written when `batch_size` turns are waiting or
+    `flush_interval_seconds` has passed since the first of them arrived,
+    whichever comes first. The queue is drained on shutdown.
+    """
+
+    # Attempts before a batch that keeps failing is dropped
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, batch_size: int, flush_interval_seconds: float, max_queue: int):
+        """
+        Initialize the writer
+
+        Args:
+            batch_size: Maximum turns written per INSERT
+            flush_interval_seconds: Maximum time a turn waits before being written
+            max_queue: Maximum queued turns; enqueue() refuses beyond this
+        """
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Turns taken off the queue but not yet handed to a flush
+        self._batch: List[PendingConversation] = []
+        # Flush in progress, shielded from cancellation so stop() can await it
+        self._inflight: Optional[asyncio.Future] = None
+        self.enqueued = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+        self.last_flush_size = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        """Whether the flusher task is running"""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the flusher task on the running event loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run(), name="conversation-write-behind")
+
+    async def stop(self) -> None:
+        """Stop the flusher task and write everything still queued"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        if self._inflight is not None:
+            await self._inflight
+            self._inflight = None
+
+        remaining, self._batch = self._batch, []
+        while not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        for start in range(0, len(remaining), self.batch_size):
+            await self._flush(remaining[start:start + self.batch_size], requeue=False)
+
+    def enqueue(
+        self,
+        user_message: str,
+        ai_response: str,
+        user_id: Optional[int] = None,
+        session_id: Optional[str] = None
+    ) -> bool:
+        """
+        Queue a conversation turn for writing
+
+        The turn is added to the context store right away, so the next
+        message from the same user sees it before it reaches the database.
+
+        Args:
+            user_message: The user's message
+            ai_response: The AI's response
+            user_id: ID of the user the conversation belongs to
+            session_id: Client session ID for anonymous users
+
+        Returns:
+            True if queued, False if the writer is not running or the queue
+            is full (the caller should then save synchronously)
+        """
+        if not self.running:
+            return False
+
+        # The ID is filled in once the flush has written the turn
+        turn = ConversationTurn(
+            id=None,
+            user_message=user_message,
+            ai_response=ai_response,
+            timestamp=datetime.now(timezone.utc),
+            user_id=user_id
+        )
+        keys = tuple(dict.fromkeys((context_key(user_id, session_id), context_key())))
+        pending = PendingConversation(
+            user_message=user_message,
+            ai_response=ai_response,
+            user_id=user_id,
+            timestamp=turn.timestamp,
+            turn=turn,
+            context_keys=keys
+        )
+        try:
+            self._queue.put_nowait(pending)
+        except asyncio.QueueFull:
+            return False
+
+        self.enqueued += 1
+        for key in keys:
+            context_store.append(key, turn)
+        return True
+
+    def stats(self) -> dict:
+        """
+        Get queue depth and flush counters
+
+        Returns:
+            Dictionary of write-behind statistics
+        """
+        return {
+            "enabled": settings.WRITE_BEHIND_ENABLED,
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "dropped": self.dropped,
+            "last_flush_size": self.last_flush_size,
+            "last_flush_seconds": round(self.last_flush_seconds, 4),
+            "max_flush_seconds": round(self.max_flush_seconds, 4)
+        }
+
+    async def _run(self) -> None:
+        """Flusher loop: collect a batch, then write it"""
+        while True:
+            self._batch.append(await self._queue.get())
+            deadline = time.monotonic() + self.flush_interval_seconds
+
+            while len(self._batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            batch, self._batch = self._batch, []
+            self._inflight = asyncio.ensure_future(self._flush(batch))
+            written = await asyncio.shield(self._inflight)
+            self._inflight = None
+            if not written:
+                # Back off instead of hammering a database that is down
+                await asyncio.sleep(self.flush_interval_seconds)
+
+    async def _flush(self, batch: List[PendingConversation], requeue: bool = True) -> bool:
+        """
+        Write one batch in a single transaction
+
+        Args:
+            batch: Turns to write
+            requeue: Put the batch back on the queue if the write fails
+
+        Returns:
+            True if the batch was written
+        """
+        started = time.perf_counter()
+        try:
+            async with AsyncSessionLocal() as db:
+                conversation_ids = await ConversationService.save_conversations_async(db, [
+                    {
+                        "user_message": pending.user_message,
+                        "ai_response": pending.ai_response,
+                        "user_id": pending.user_id,
+                        "timestamp": pending.timestamp
+                    }
+                    for pending in batch
+                ])
+        except Exception as e:
+            self.failed_flushes += 1
+            logger.error(f"Write-behind flush of {len(batch)} conversations failed: {str(e)}")
+            self._retry(batch, requeue)
+            return False
+
+        # Buffered turns need their IDs so deletes evict them and memory
+        # recall can leave them out while they are in the recent history
+        for pending, conversation_id in zip(batch, conversation_ids):
+            if pending.turn is not None:
+                context_store.assign_id(pending.context_keys, pending.turn, conversation_id)
+
+        elapsed = time.perf_counter() - started
+        self.flushes += 1
+        self.flushed += len(batch)
+        self.last_flush_size = len(batch)
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        return True
+
+    def _retry(self, batch: List[PendingConversation], requeue: bool) -> None:
+        """Requeue a failed batch, dropping turns that have run out of attempts"""
+        dropped = 0
+        for pending in batch:
+            pending = pending._replace(attempts=pending.attempts + 1)
+            if not requeue or pending.attempts >= self.MAX_ATTEMPTS:
+                dropped += 1
+                continue
+            try:
+                self._queue.put_nowait(pending)
+            except asyncio.QueueFull:
+                dropped += 1
+        if dropped:
+            self.dropped += dropped
+            logger.warning(f"Write-behind dropped {dropped} conversations after repeated failures")
+
+# Global instance
+write_behind = ConversationWriteBehind(
+    batch_size=settings.WRITE_BEHIND_BATCH_SIZE,
+    flush_interval_seconds=settings.WRITE_BEHIND_FLUSH_INTERVAL_MS / 1000,
+    max_queue=settings.WRITE_BEHIND_MAX_QUEUE
+)
@@ -0,0 +1,84 @@
+"""
+Local text embedder for Mellow AI Service
+
+Maps text to fixed-size vectors with the hashing trick, so embeddings need
+no model download, no network and no fitted vocabulary: the same text
+always gives the same vector, in any process.
+"""
+
+import math
+import zlib
+from collections import Counter
+from typing import List
+
+import numpy as np
+
+from app.utils.inverted_index import tokenize
+
+# Weight of word pairs relative to single words
+BIGRAM_WEIGHT = 0.5
+
+# Shorter words ("my", "me", "so") say little about what a turn is about
+MIN_WORD_LENGTH = 3
+
+class HashingEmbedder:
+    """
+    Signed feature hashing of words and word pairs into `dim` dimensions
+
+    Each term adds 1 + log(count) to one hashed dimension (word pairs at
+    half weight), with a hashed sign so collisions tend to cancel out.
+    Vectors are L2-normalized, so their dot product is the cosine
+    similarity.
+    """
+
+    def __init__(self, dim: int = 256):
+        """
+        Initialize the embedder
+
+        Args:
+            dim: Vector size (more dimensions means fewer collisions)
+        """
+        self.dim = dim
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed one text
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            float32 vector of length dim (all zeros if the text has no words)
+        """
+        words = [word for word in tokenize(text) if len(word) >= MIN_WORD_LENGTH]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        self._add_terms(vector, Counter(words), 1.0)
+        self._add_terms(vector, Counter(f"{first} {second}" for first, second in zip(words, words[1:])), BIGRAM_WEIGHT)
+
+        norm = float(np.linalg.norm(vector))
+        if norm:
+            vector /= norm
+        return vector
+
+    def _add_terms(self, vector: np.ndarray, terms: Counter, weight: float) -> None:
+        """Add hashed term weights to a vector in place"""
+        for term, count in terms.items():
+            # crc32 rather than hash(): it is not salted per process
+            digest = zlib.crc32(term.encode("utf-8"))
+            sign = weight if digest & 1 else -weight
+            vector[(digest >> 1) % self.dim] += sign * (1.0 + math.log(count))
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed several texts
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            float32 matrix with one row per text
+        """
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            matrix[row] = self.embed(text)
+        return matrix
@@ -0,0 +1,143 @@
+"""
+In-process inverted index for Mellow AI Service
+
+Used for conversation search where Postgres full-text search is not
+available (SQLite in development and tests). Documents are ranked with
+BM25 and every query term must match.
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.topic_extraction import STOP_WORDS
+
+# Words as Postgres' default parser sees them, roughly
+_WORD = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into index terms
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        Lowercased words, without stop words
+    """
+    return [word for word in _WORD.findall(text.lower()) if word not in STOP_WORDS]
+
+class InvertedIndex:
+    """
+    Term -> {document ID: term frequency} postings with BM25 ranking
+
+    Thread-safe. Documents carry an optional owner so searches can be
+    restricted to one user.
+    """
+
+    # BM25 parameters
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        """Initialize an empty index"""
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._lengths: Dict[int, int] = {}
+        # Distinct terms of each document, so removal only touches its postings
+        self._terms: Dict[int, Tuple[str, ...]] = {}
+        self._owners: Dict[int, Optional[int]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+        self.last_id = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, doc_id: int, text: str, owner: Optional[int] = None) -> None:
+        """
+        Index a document (replacing it if already indexed)
+
+        Args:
+            doc_id: Document ID
+            text: Document text
+            owner: Owner ID used to filter searches
+        """
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            for term, frequency in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = frequency
+            length = sum(terms.values())
+            self._lengths[doc_id] = length
+            self._terms[doc_id] = tuple(terms)
+            self._owners[doc_id] = owner
+            self._total_length += length
+            self.last_id = max(self.last_id, doc_id)
+
+    def remove(self, doc_id: int) -> None:
+        """Remove a document if it is indexed"""
+        with self._lock:
+            self._remove(doc_id)
+
+    def clear(self) -> None:
+        """Drop every document"""
+        with self._lock:
+            self._postings.clear()
+            self._lengths.clear()
+            self._terms.clear()
+            self._owners.clear()
+            self._total_length = 0
+            self.last_id = 0
+
+    def search(self, query: str, owner: Optional[int] = None) -> List[Tuple[float, int]]:
+        """
+        Find documents containing every query term
+
+        Args:
+            query: Search text
+            owner: Only match documents of this owner
+
+        Returns:
+            (score, document ID) pairs, best first (ties: highest ID first)
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            postings = [self._postings.get(term, {}) for term in terms]
+            if not all(postings):
+                return []
+            postings.sort(key=len)
+            candidates = [doc_id for doc_id in postings[0] if all(doc_id in other for other in postings[1:])]
+            if owner is not None:
+                candidates = [doc_id for doc_id in candidates if self._owners.get(doc_id) == owner]
+
+            documents = len(self._lengths)
+            average_length = self._total_length / documents if documents else 0.0
+            results = []
+            for doc_id in candidates:
+                length_norm = self.K1 * (1 - self.B + self.B * self._lengths[doc_id] / (average_length or 1))
+                score = 0.0
+                for posting in postings:
+                    frequency = posting[doc_id]
+                    idf = math.log(1 + (documents - len(posting) + 0.5) / (len(posting) + 0.5))
+                    score += idf * frequency * (self.K1 + 1) / (frequency + length_norm)
+                results.append((score, doc_id))
+
+        results.sort(key=lambda result: (-result[0], -result[1]))
+        return results
+
+    def _remove(self, doc_id: int) -> None:
+        """Remove a document (caller holds the lock)"""
+        if doc_id not in self._lengths:
+            return
+        for term in self._terms.pop(doc_id):
+            posting = self._postings[term]
+            del posting[doc_id]
+            if not posting:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(doc_id)
+        self._owners.pop(doc_id, None)
@@ -0,0 +1,87 @@
+"""
+Compiled multi-keyword matcher for Mellow AI Service
+"""
+
+import re
+from typing import Dict, Iterable, List
+
+class KeywordMatcher:
+    """
+    Matches many keyword categories in a single pass over the text
+
+    All keywords are compiled into one alternation with word boundaries,
+    so "this" does not match "hi" and "somehow" does not match "how".
+    Multi-word keywords (e.g. "good morning") match across any whitespace.
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[str]]):
+        """
+        Build the matcher
+
+        Args:
+            categories: Mapping of category name to its keywords
+        """
+        self.categories = {name: list(keywords) for name, keywords in categories.items()}
+        self._keyword_categories: Dict[str, List[str]] = {}
+        for name, keywords in self.categories.items():
+            for keyword in keywords:
+                self._keyword_categories.setdefault(self._normalize(keyword), []).append(name)
+
+        # Longest keywords first so "good morning" wins over a shorter prefix
+        alternatives = sorted(self._keyword_categories, key=len, reverse=True)
+        pattern = "|".join(r"\s+".join(map(re.escape, keyword.split())) for keyword in alternatives)
+        self._pattern = re.compile(rf"\b(?:{pattern})\b", re.IGNORECASE)
+
+    @staticmethod
+    def _normalize(keyword: str) -> str:
+        """Lowercase a keyword and collapse its whitespace"""
+        return " ".join(keyword.lower().split())
+
+    def match(self, text: str) -> Dict[str, List[str]]:
+        """
+        Find every keyword category present in the text
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Mapping of category name to the distinct keywords found, in order of
+            first appearance (every category is present, possibly empty)
+        """
+        found: Dict[str, List[str]] = {name: [] for name in self.categories}
+        for match in self._pattern.finditer(text):
+            keyword = self._normalize(match.group(0))
+            for name in self._keyword_categories[keyword]:
+                if keyword not in found[name]:
+                    found[name].append(keyword)
+        return found
+
+    def match_many(self, texts: Iterable[str]) -> List[Dict[str, List[str]]]:
+        """
+        Match a batch of texts
+
+        Args:
+            texts: Texts to scan
+
+        Returns:
+            One match result per text, in input order
+        """
+        return [self.match(text) for text in texts]
+
+    def count_documents(self, texts: Iterable[str]) -> Dict[str, Dict[str, int]]:
+        """
+        Count, per category and keyword, how many texts contain each keyword
+
+        Args:
+            texts: Texts to scan
+
+        Returns:
+            Mapping of category name to {keyword: number of texts containing it}
+        """
+        counts: Dict[str, Dict[str, int]] = {name: {} for name in self.categories}
+        for text in texts:
+            for name, keywords in self.match(text).items():
+                category_counts = counts[name]
+                for keyword in keywords:
+                    category_counts[keyword] = category_counts.get(keyword, 0) + 1
+        return counts
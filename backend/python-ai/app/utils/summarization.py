@@ -0,0 +1,113 @@
+"""
+Deterministic extractive summarizer for Mellow AI Service
+
+Folds conversation turns into a short running summary without calling a
+model: recurring topics, feelings the user mentioned and the opening
+sentence of their most recent messages. The same input always gives the
+same summary, so it doubles as the summarizer used in tests.
+"""
+
+import re
+from typing import List, Optional, Sequence, Tuple
+
+from app.utils.text_processing import count_emotions
+from app.utils.topic_extraction import count_topics, top_topics
+
+# Line prefixes of the summary format (also used to read a previous summary back)
+TOPICS_PREFIX = "Topics discussed: "
+FEELINGS_PREFIX = "Feelings mentioned: "
+POINTS_HEADER = "Earlier the user said:"
+POINT_PREFIX = "- "
+
+# End of the first sentence of a message
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+class ExtractiveSummarizer:
+    """Builds and updates a running summary from conversation turns"""
+
+    def __init__(self, max_topics: int = 8, max_points: int = 6, max_point_chars: int = 160, max_chars: int = 1500):
+        """
+        Initialize the summarizer
+
+        Args:
+            max_topics: Topics kept in the summary
+            max_points: User statements kept (most recent win)
+            max_point_chars: Maximum length of one statement
+            max_chars: Maximum length of the whole summary
+        """
+        self.max_topics = max_topics
+        self.max_points = max_points
+        self.max_point_chars = max_point_chars
+        self.max_chars = max_chars
+
+    def summarize(self, previous: Optional[str], turns: Sequence) -> str:
+        """
+        Fold turns into the previous summary
+
+        Args:
+            previous: Summary produced by an earlier call, if any
+            turns: Turns to add (objects with user_message), oldest first
+
+        Returns:
+            The updated summary
+        """
+        old_topics, old_feelings, old_points = self._parse(previous)
+        messages = [turn.user_message for turn in turns if turn.user_message]
+
+        unigrams, bigrams = top_topics(count_topics(messages), self.max_topics)
+        # Phrases are more telling than single words, but leave room for both
+        topics = self._merge(bigrams[:self.max_topics // 2] + unigrams, old_topics, self.max_topics)
+        emotion_counts = count_emotions(messages)
+        feelings = self._merge(sorted(emotion_counts, key=lambda emotion: -emotion_counts[emotion]), old_feelings, None)
+        points = (old_points + [self._first_sentence(message) for message in messages])[-self.max_points:]
+
+        while True:
+            summary = self._render(topics, feelings, points)
+            if len(summary) <= self.max_chars or not points:
+                return summary[:self.max_chars]
+            points = points[1:]
+
+    def _first_sentence(self, message: str) -> str:
+        """Opening sentence of a message, cut to max_point_chars"""
+        sentence = _SENTENCE_END.split(" ".join(message.split()), 1)[0]
+        if len(sentence) > self.max_point_chars:
+            sentence = sentence[:self.max_point_chars - 3].rstrip() + "..."
+        return sentence
+
+    @staticmethod
+    def _merge(new: List[str], old: List[str], limit: Optional[int]) -> List[str]:
+        """Newest terms first, without duplicates, up to limit"""
+        merged: List[str] = []
+        for term in new:
+            if term not in merged:
+                merged.append(term)
+        merged.extend(term for term in old if term not in merged)
+        return merged[:limit] if limit is not None else merged
+
+    @staticmethod
+    def _render(topics: List[str], feelings: List[str], points: List[str]) -> str:
+        """Format the summary lines"""
+        lines = []
+        if topics:
+            lines.append(TOPICS_PREFIX + ", ".join(topics))
+        if feelings:
+            lines.append(FEELINGS_PREFIX + ", ".join(feelings))
+        if points:
+            lines.append(POINTS_HEADER)
+            lines.extend(POINT_PREFIX + point for point in points)
+        return "\n".join(lines)
+
+    @staticmethod
+    def _parse(summary: Optional[str]) -> Tuple[List[str], List[str], List[str]]:
+        """Read topics, feelings and statements back from a rendered summary"""
+        topics: List[str] = []
+        feelings: List[str] = []
+        points: List[str] = []
+        for line in (summary or "").splitlines():
+            if line.startswith(TOPICS_PREFIX):
+                topics = [term for term in line[len(TOPICS_PREFIX):].split(", ") if term]
+            elif line.startswith(FEELINGS_PREFIX):
+                feelings = [term for term in line[len(FEELINGS_PREFIX):].split(", ") if term]
+            elif line.startswith(POINT_PREFIX):
+                points.append(line[len(POINT_PREFIX):])
+        return topics, feelings, points
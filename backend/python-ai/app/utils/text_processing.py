@@ -2,42 +2,49 @@
 Text processing utilities for Mellow AI Service
 """
 
-from typing import List
+from typing import Dict, List
+from app.utils.keyword_matcher import KeywordMatcher
 
-def extract_common_topics(messages: List[str]) -> List[str]:
+# Keyword patterns used for intent and emotion detection
+GREETINGS = ["hello", "hi", "hey", "good morning", "good afternoon", "good evening"]
+QUESTIONS = ["how", "what", "when", "where", "why", "who"]
+EMOTIONS = ["sad", "happy", "angry", "frustrated", "excited", "worried", "anxious"]
+
+# Compiled once at import: one pass over the text finds every category
+INTENT_MATCHER = KeywordMatcher({
+    "greetings": GREETINGS,
+    "questions": QUESTIONS,
+    "emotions": EMOTIONS
+})
+
+def message_insights(messages: List[str]) -> dict:
     """
-    Extract common topics from conversation messages
+    Compute length and emotion statistics over a batch of messages
+    
+    Module-level so it can be shipped to worker processes.
     
     Args:
-        messages: List of message strings to analyze
+        messages: The messages to analyze
         
     Returns:
-        List of top 5 most common topics
+        Dictionary with average length in words, number analyzed and emotion distribution
     """
     if not messages:
-        return []
+        return {
+            "average_message_length": 0,
+            "total_analyzed": 0,
+            "emotion_distribution": {}
+        }
     
-    # Simple keyword extraction
-    common_words = {}
-    stop_words = {
-        "the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for", 
-        "of", "with", "by", "i", "you", "we", "they", "he", "she", "it", 
-        "is", "are", "was", "were", "be", "been", "have", "has", "had", 
-        "do", "does", "did", "will", "would", "could", "should", "may", 
-        "might", "can", "am", "this", "that", "these", "those"
-    }
+    # Calculate average message length
+    avg_length = sum(len(msg.split()) for msg in messages) / len(messages)
     
-    for message in messages:
-        words = message.lower().split()
-        for word in words:
-            # Clean word - keep only alphanumeric characters
-            word = ''.join(c for c in word if c.isalnum())
-            if len(word) > 3 and word not in stop_words:
-                common_words[word] = common_words.get(word, 0) + 1
-    
-    # Return top 5 most common topics
-    sorted_topics = sorted(common_words.items(), key=lambda x: x[1], reverse=True)
-    return [topic[0] for topic in sorted_topics[:5]]
+    return {
+        "average_message_length": round(avg_length, 2),
+        "total_analyzed": len(messages),
+        # Single pass per message with the compiled matcher
+        "emotion_distribution": count_emotions(messages)
+    }
 
 def detect_message_intent(message: str) -> dict:
     """
@@ -49,19 +56,55 @@ def detect_message_intent(message: str) -> dict:
     Returns:
         Dictionary containing detected intents and emotions
     """
-    message_lower = message.lower().strip()
+    return _build_intent(message, INTENT_MATCHER.match(message))
+
+def detect_message_intents(messages: List[str]) -> List[dict]:
+    """
+    Analyze a batch of messages to detect intent and emotional content
     
-    # Define keyword patterns
-    greetings = ["hello", "hi", "hey", "good morning", "good afternoon", "good evening"]
-    questions = ["how", "what", "when", "where", "why", "who"]
-    emotions = ["sad", "happy", "angry", "frustrated", "excited", "worried", "anxious"]
+    Args:
+        messages: The user messages to analyze
+        
+    Returns:
+        One intent dictionary per message, in input order
+    """
+    return [
+        _build_intent(message, matches)
+        for message, matches in zip(messages, INTENT_MATCHER.match_many(messages))
+    ]
+
+def count_emotions(messages: List[str]) -> Dict[str, int]:
+    """
+    Count how many messages mention each emotion
+    
+    Args:
+        messages: The messages to analyze
+        
+    Returns:
+        Dictionary of emotion to number of messages mentioning it (only emotions seen)
+    """
+    emotion_counts = INTENT_MATCHER.count_documents(messages)["emotions"]
+    return {emotion: emotion_counts[emotion] for emotion in EMOTIONS if emotion in emotion_counts}
+
+def _build_intent(message: str, matches: Dict[str, List[str]]) -> dict:
+    """
+    Build the intent dictionary from keyword matcher results
+    
+    Args:
+        message: The original message
+        matches: Keyword matches for the message
+        
+    Returns:
+        Dictionary containing detected intents and emotions
+    """
+    word_count = len(message.split())
     
     result = {
-        "is_greeting": any(greeting in message_lower for greeting in greetings),
-        "is_question": any(question in message_lower for question in questions),
-        "detected_emotions": [emotion for emotion in emotions if emotion in message_lower],
-        "message_length": len(message.split()),
-        "is_short_response": len(message.split()) < 5
+        "is_greeting": bool(matches["greetings"]),
+        "is_question": bool(matches["questions"]),
+        "detected_emotions": [emotion for emotion in EMOTIONS if emotion in matches["emotions"]],
+        "message_length": word_count,
+        "is_short_response": word_count < 5
     }
     
-    return result 
\ No newline at end of file
+    return result
\ No newline at end of file
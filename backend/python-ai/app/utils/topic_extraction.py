@@ -0,0 +1,147 @@
+"""
+Topic extraction engine for Mellow AI Service
+
+Tokenizes messages with a compiled regex, counts unigrams and bigrams with
+Counter and selects the top-k with heapq, so it can run over the full
+conversation history rather than a small sample.
+"""
+
+import heapq
+import re
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from operator import itemgetter
+from typing import Iterable, List, Optional, Tuple
+
+# Words that never make useful topics
+STOP_WORDS = frozenset({
+    "the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for",
+    "of", "with", "by", "i", "you", "we", "they", "he", "she", "it",
+    "is", "are", "was", "were", "be", "been", "have", "has", "had",
+    "do", "does", "did", "will", "would", "could", "should", "may",
+    "might", "can", "am", "this", "that", "these", "those"
+})
+
+# Removes everything that is not a letter, digit or whitespace (matches the
+# old per-character isalnum() cleaning, but in a single C-level pass)
+_NON_ALNUM = re.compile(r"[^\w\s]|_")
+
+# Separator used to key bigrams in the shared Counter
+BIGRAM_SEPARATOR = " "
+
+def tokenize(message: str, min_length: int = 4) -> List[Optional[str]]:
+    """
+    Split a message into candidate topic words
+
+    Words that are too short or stop words are kept as None placeholders so
+    bigrams are only formed from words that were actually adjacent.
+
+    Args:
+        message: The message to tokenize
+        min_length: Minimum word length for a topic word
+
+    Returns:
+        List of topic words (or None for filtered positions)
+    """
+    return [
+        word if len(word) >= min_length and word not in STOP_WORDS else None
+        for word in _NON_ALNUM.sub("", message.lower()).split()
+    ]
+
+def count_topics(messages: Iterable[str], include_bigrams: bool = True) -> Counter:
+    """
+    Count topic words (and optionally bigrams) in a batch of messages
+
+    Module-level so it can be shipped to worker processes.
+
+    Args:
+        messages: Messages to count
+        include_bigrams: Also count adjacent topic-word pairs
+
+    Returns:
+        Counter of unigrams and "word word" bigrams
+    """
+    counts: Counter = Counter()
+    for message in messages:
+        if not message:
+            continue
+        tokens = tokenize(message)
+        counts.update(token for token in tokens if token)
+        if include_bigrams:
+            counts.update(
+                f"{first}{BIGRAM_SEPARATOR}{second}"
+                for first, second in zip(tokens, tokens[1:])
+                if first and second
+            )
+    return counts
+
+def top_topics(counts: Counter, limit: int = 5) -> Tuple[List[str], List[str]]:
+    """
+    Select the most common unigrams and bigrams
+
+    Args:
+        counts: Counter produced by count_topics
+        limit: Number of topics of each kind to return
+
+    Returns:
+        Tuple of (top unigrams, top bigrams)
+    """
+    unigrams = ((term, count) for term, count in counts.items() if BIGRAM_SEPARATOR not in term)
+    bigrams = ((term, count) for term, count in counts.items() if BIGRAM_SEPARATOR in term)
+    return (
+        [term for term, _ in heapq.nlargest(limit, unigrams, key=itemgetter(1))],
+        [term for term, _ in heapq.nlargest(limit, bigrams, key=itemgetter(1))]
+    )
+
+class TopicExtractor:
+    """Counts topics over a stream of message chunks, optionally in a process pool"""
+
+    def __init__(self, include_bigrams: bool = True, workers: int = 0, executor: Optional[Executor] = None):
+        """
+        Initialize the extractor
+
+        Args:
+            include_bigrams: Also count adjacent topic-word pairs
+            workers: Number of worker processes (0 counts in the calling thread)
+            executor: Existing pool of `workers` processes to count in, instead
+                of starting one per call
+        """
+        self.include_bigrams = include_bigrams
+        self.workers = workers
+        self.executor = executor
+
+    def count_chunks(self, chunks: Iterable[List[str]]) -> Counter:
+        """
+        Count topics over chunks of messages
+
+        With workers, at most two chunks per worker are in flight at a time,
+        so memory stays flat however large the input stream is.
+
+        Args:
+            chunks: Iterable of message lists (e.g. database result partitions)
+
+        Returns:
+            Merged Counter of unigrams and bigrams
+        """
+        if self.workers <= 0:
+            total: Counter = Counter()
+            for chunk in chunks:
+                total.update(count_topics(chunk, self.include_bigrams))
+            return total
+
+        if self.executor is not None:
+            return self._count_in(self.executor, chunks)
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            return self._count_in(pool, chunks)
+
+    def _count_in(self, pool: Executor, chunks: Iterable[List[str]]) -> Counter:
+        """Count chunks in a pool, keeping at most two chunks per worker in flight"""
+        total: Counter = Counter()
+        pending = []
+        for chunk in chunks:
+            pending.append(pool.submit(count_topics, list(chunk), self.include_bigrams))
+            if len(pending) >= self.workers * 2:
+                total.update(pending.pop(0).result())
+        for future in pending:
+            total.update(future.result())
+        return total
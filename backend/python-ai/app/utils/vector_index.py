@@ -0,0 +1,225 @@
+"""
+In-memory approximate nearest-neighbour index for Mellow AI Service
+
+An IVF (inverted file) index over unit vectors held in NumPy arrays:
+vectors are clustered with spherical k-means and a search only scores the
+clusters whose centroids are closest to the query. Small indexes are
+searched exhaustively, which is exact and already fast at that size.
+"""
+
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Initial number of rows allocated; storage doubles when full
+INITIAL_CAPACITY = 16
+
+# Lloyd iterations per training run
+KMEANS_ITERATIONS = 10
+
+class IVFIndex:
+    """
+    Document ID -> unit vector index with inner-product search
+
+    Exhaustive until it holds `train_threshold` vectors, then clustered
+    into about sqrt(n) lists of which `nprobe` are searched. The clustering
+    is retrained whenever the index has doubled since the last training.
+    Removed vectors are tombstoned and compacted away once they outnumber
+    the live ones. Thread-safe.
+    """
+
+    def __init__(self, dim: int, nprobe: int = 8, train_threshold: int = 1024, seed: int = 0):
+        """
+        Initialize an empty index
+
+        Args:
+            dim: Vector size
+            nprobe: Clusters searched per query once trained
+            train_threshold: Vectors needed before clustering is used
+            seed: Seed for choosing the initial centroids
+        """
+        self.dim = dim
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold
+        self.seed = seed
+        self._vectors = np.zeros((INITIAL_CAPACITY, dim), dtype=np.float32)
+        self._ids = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self._alive = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        # Cluster of each row (-1 until trained)
+        self._lists = np.full(INITIAL_CAPACITY, -1, dtype=np.int32)
+        self._rows: Dict[int, int] = {}
+        self._size = 0
+        self._centroids: Optional[np.ndarray] = None
+        self._trained_size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._rows
+
+    @property
+    def trained(self) -> bool:
+        """Whether searches use the clustering"""
+        return self._centroids is not None
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the vector storage"""
+        return self._vectors.nbytes + self._ids.nbytes + self._alive.nbytes + self._lists.nbytes
+
+    def add(self, doc_id: int, vector: np.ndarray) -> None:
+        """
+        Add a vector (replacing the document's previous vector, if any)
+
+        Args:
+            doc_id: Document ID
+            vector: Unit vector of length dim
+        """
+        with self._lock:
+            self._remove(doc_id)
+            if self._size == len(self._ids):
+                self._resize(2 * len(self._ids))
+            row = self._size
+            self._size += 1
+            self._vectors[row] = vector
+            self._ids[row] = doc_id
+            self._alive[row] = True
+            if self._centroids is not None:
+                self._lists[row] = int(np.argmax(self._centroids @ vector))
+            self._rows[doc_id] = row
+
+            if len(self._rows) >= max(self.train_threshold, 2 * self._trained_size):
+                self._train()
+
+    def remove(self, doc_id: int) -> None:
+        """Remove a document if it is indexed"""
+        with self._lock:
+            self._remove(doc_id)
+            if self._size - len(self._rows) > max(len(self._rows), INITIAL_CAPACITY):
+                self._compact()
+
+    def trim(self, max_size: int) -> None:
+        """
+        Drop the documents with the lowest IDs until at most max_size remain
+
+        Args:
+            max_size: Number of documents to keep
+        """
+        with self._lock:
+            excess = len(self._rows) - max_size
+            if excess <= 0:
+                return
+            for doc_id in sorted(self._rows)[:excess]:
+                self._remove(doc_id)
+            self._compact()
+
+    def search(self, vector: np.ndarray, k: int, exclude: Iterable[int] = ()) -> List[Tuple[float, int]]:
+        """
+        Find the vectors with the largest inner product with a query
+
+        Args:
+            vector: Unit query vector of length dim
+            k: Number of results wanted
+            exclude: Document IDs to leave out
+
+        Returns:
+            Up to k (score, document ID) pairs, best first
+        """
+        with self._lock:
+            if not self._rows or k <= 0:
+                return []
+            mask = self._alive[:self._size]
+            if self._centroids is not None:
+                nprobe = min(self.nprobe, len(self._centroids))
+                probe = np.argpartition(-(self._centroids @ vector), nprobe - 1)[:nprobe]
+                mask = mask & np.isin(self._lists[:self._size], probe)
+            rows = np.flatnonzero(mask)
+            scores = self._vectors[rows] @ vector
+            ids = self._ids[rows]
+
+        exclude = list(exclude)
+        if exclude:
+            keep = ~np.isin(ids, exclude)
+            scores, ids = scores[keep], ids[keep]
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        order = top[np.argsort(-scores[top], kind="stable")]
+        return [(float(scores[i]), int(ids[i])) for i in order]
+
+    def stats(self) -> dict:
+        """
+        Get index counters
+
+        Returns:
+            Dictionary with the vector count, cluster count and storage size
+        """
+        with self._lock:
+            return {
+                "vectors": len(self._rows),
+                "lists": len(self._centroids) if self._centroids is not None else 0,
+                "bytes": self.nbytes
+            }
+
+    def _remove(self, doc_id: int) -> None:
+        """Tombstone a document (caller holds the lock)"""
+        row = self._rows.pop(doc_id, None)
+        if row is not None:
+            self._alive[row] = False
+
+    def _resize(self, capacity: int) -> None:
+        """Reallocate storage for `capacity` rows, keeping the used ones (caller holds the lock)"""
+        used = self._size
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:used] = self._vectors[:used]
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[:used] = self._ids[:used]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:used] = self._alive[:used]
+        lists = np.full(capacity, -1, dtype=np.int32)
+        lists[:used] = self._lists[:used]
+        self._vectors, self._ids, self._alive, self._lists = vectors, ids, alive, lists
+
+    def _compact(self) -> None:
+        """Drop tombstoned rows and shrink storage (caller holds the lock)"""
+        rows = np.flatnonzero(self._alive[:self._size])
+        count = len(rows)
+        self._vectors[:count] = self._vectors[rows]
+        self._ids[:count] = self._ids[rows]
+        self._lists[:count] = self._lists[rows]
+        self._alive[:count] = True
+        self._alive[count:] = False
+        self._size = count
+        self._rows = {int(doc_id): row for row, doc_id in enumerate(self._ids[:count])}
+        capacity = max(INITIAL_CAPACITY, 1 << max(count - 1, 0).bit_length())
+        if capacity < len(self._ids):
+            self._resize(capacity)
+        if count < self.train_threshold:
+            self._centroids = None
+            self._trained_size = 0
+            self._lists[:count] = -1
+
+    def _train(self) -> None:
+        """Cluster the live vectors with spherical k-means (caller holds the lock)"""
+        data = self._vectors[np.flatnonzero(self._alive[:self._size])]
+        n_lists = max(1, round(math.sqrt(len(data))))
+        rng = np.random.default_rng(self.seed)
+        centroids = data[rng.choice(len(data), n_lists, replace=False)].copy()
+
+        for _ in range(KMEANS_ITERATIONS):
+            assignment = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, data)
+            norms = np.linalg.norm(sums, axis=1)
+            # Empty clusters keep their previous centroid
+            filled = norms > 0
+            centroids[filled] = sums[filled] / norms[filled, None]
+
+        self._centroids = centroids
+        self._lists[:self._size] = np.argmax(self._vectors[:self._size] @ centroids.T, axis=1)
+        self._trained_size = len(data)
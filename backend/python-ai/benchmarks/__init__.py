@@ -0,0 +1,3 @@
+"""
+Benchmarks for Mellow AI Service
+"""
@@ -0,0 +1,100 @@
+"""
+Benchmark of the GET /conversations serialization paths
+
+Compares, over an in-memory SQLite database:
+
+- orm: ORM objects -> ConversationResponse per row -> response_model
+  validation -> serialization of the validated models (the old path)
+- rows: column-only row tuples -> dicts -> orjson (the current path)
+
+Run from backend/python-ai:
+
+    python -m benchmarks.conversation_listing [--rows 1000 10000] [--repeat 20]
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.api.responses import FastJSONResponse
+from app.models.database import Base, Conversation
+from app.models.schemas import ConversationResponse
+from app.services.conversation_service import ConversationService
+
+# What FastAPI does with a returned list when response_model=List[ConversationResponse]
+RESPONSE_ADAPTER = TypeAdapter(List[ConversationResponse])
+
+def orm_path(session_factory, limit: int) -> bytes:
+    """The old path: full ORM objects, a model per row, validated and serialized again"""
+    with session_factory() as db:
+        conversations = db.query(Conversation).order_by(Conversation.timestamp.desc(), Conversation.id.desc()).limit(limit).all()
+        models = [
+            ConversationResponse(
+                id=conv.id,
+                user_message=conv.user_message,
+                ai_response=conv.ai_response,
+                timestamp=conv.timestamp.isoformat()
+            )
+            for conv in conversations
+        ]
+    return RESPONSE_ADAPTER.dump_json(RESPONSE_ADAPTER.validate_python(models))
+
+def rows_path(session_factory, limit: int) -> bytes:
+    """The current path: column-only rows straight to orjson"""
+    stmt = select(
+        Conversation.id,
+        Conversation.user_message,
+        Conversation.ai_response,
+        Conversation.timestamp
+    ).order_by(Conversation.timestamp.desc(), Conversation.id.desc()).limit(limit)
+    with session_factory() as db:
+        rows = db.execute(stmt).all()
+    return FastJSONResponse(ConversationService.format_conversation_rows(rows)).body
+
+def best_of(func: Callable, repeat: int) -> float:
+    """Fastest of `repeat` runs, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    db = session_factory()
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    db.execute(insert(Conversation), [
+        {
+            "user_message": f"I have been feeling worried about work lately, message {i}",
+            "ai_response": f"It sounds like work has been weighing on you. What part of it feels heaviest? ({i})",
+            "timestamp": start + timedelta(seconds=i)
+        }
+        for i in range(max(args.rows))
+    ])
+    db.commit()
+    db.close()
+
+    print(f"{'rows':>8} {'orm ms':>10} {'rows ms':>10} {'speedup':>8}")
+    for count in args.rows:
+        # Both paths must produce the same document
+        assert json.loads(orm_path(session_factory, count)) == json.loads(rows_path(session_factory, count))
+        orm_ms = best_of(lambda: orm_path(session_factory, count), args.repeat)
+        rows_ms = best_of(lambda: rows_path(session_factory, count), args.repeat)
+        print(f"{count:>8} {orm_ms:>10.2f} {rows_ms:>10.2f} {orm_ms / rows_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
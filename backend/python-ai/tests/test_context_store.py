@@ -0,0 +1,76 @@
+"""
+Tests for the per-user conversation context store
+"""
+
+from app.services.context_store import ConversationContextStore, ConversationTurn
+
+def turn(conversation_id, text="hi") -> ConversationTurn:
+    return ConversationTurn(conversation_id, text, "hello")
+
+def make_store(turns_per_key=3) -> ConversationContextStore:
+    return ConversationContextStore(turns_per_key=turns_per_key, max_keys=10, max_bytes=10_000)
+
+def test_fill_keeps_turns_appended_while_it_was_in_flight():
+    store = make_store()
+    fill = store.begin_fill("user:1")
+    # A write-behind turn the database read will not see
+    pending = turn(None, "unsaved")
+    store.append("user:1", pending)
+
+    loaded = store.put("user:1", [turn(2), turn(1)], fill)
+
+    assert loaded == [pending, turn(2), turn(1)]
+    assert store.get("user:1", 3) == loaded
+
+def test_fill_does_not_duplicate_appended_turns_the_read_saw():
+    store = make_store()
+    fill = store.begin_fill("user:1")
+    store.append("user:1", turn(3))
+
+    assert [t.id for t in store.put("user:1", [turn(3), turn(2), turn(1)], fill)] == [3, 2, 1]
+
+def test_assigned_id_deduplicates_a_flushed_write_behind_turn():
+    store = make_store()
+    fill = store.begin_fill("user:1")
+    pending = turn(None)
+    store.append("user:1", pending)
+    store.assign_id(["user:1"], pending, 5)
+
+    assert [t.id for t in store.put("user:1", [turn(5), turn(4)], fill)] == [5, 4]
+
+def test_fill_keeps_only_the_newest_turns():
+    store = make_store(turns_per_key=2)
+    fill = store.begin_fill("user:1")
+    for conversation_id in (7, 8, 9):
+        store.append("user:1", turn(conversation_id))
+
+    assert [t.id for t in store.put("user:1", [turn(6)], fill)] == [9, 8]
+
+def test_appends_only_reach_fills_still_in_flight():
+    store = make_store()
+    first = store.begin_fill("user:1")
+    store.append("user:1", turn(2))
+    store.put("user:1", [turn(1)], first)
+    store.clear()
+
+    second = store.begin_fill("user:1")
+    assert [t.id for t in store.put("user:1", [turn(2), turn(1)], second)] == [2, 1]
+    assert first == [turn(2)]
+
+def test_cancelled_fill_leaves_the_key_unloaded():
+    store = make_store()
+    fill = store.begin_fill("user:1")
+    store.append("user:1", turn(1))
+    store.cancel_fill("user:1", fill)
+
+    assert store.get("user:1", 1) is None
+    store.append("user:1", turn(2))
+    assert fill == [turn(1)]
+
+def test_removed_conversation_is_not_restored_by_a_fill():
+    store = make_store()
+    fill = store.begin_fill("user:1")
+    store.append("user:1", turn(4))
+    store.remove_conversation(4)
+
+    assert [t.id for t in store.put("user:1", [turn(3)], fill)] == [3]
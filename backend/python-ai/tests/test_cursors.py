@@ -0,0 +1,37 @@
+"""
+Tests for the keyset pagination cursors of conversation listing and search
+"""
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.conversation_service import ConversationService
+from app.services.search_service import SearchService
+
+def test_conversation_cursor_round_trip():
+    timestamp = datetime(2026, 3, 14, 15, 9, 26, 535897, tzinfo=timezone.utc)
+    cursor = ConversationService.encode_cursor(SimpleNamespace(id=42, timestamp=timestamp))
+    assert ConversationService.decode_cursor(cursor) == (timestamp, 42)
+
+def test_conversation_cursor_is_url_safe_and_unpadded():
+    timestamp = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for conversation_id in range(1, 50):
+        cursor = ConversationService.encode_cursor(SimpleNamespace(id=conversation_id, timestamp=timestamp))
+        assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+        assert ConversationService.decode_cursor(cursor)[1] == conversation_id
+
+def test_search_cursor_round_trip():
+    cursor = SearchService.encode_cursor(0.0607927, 1234)
+    assert SearchService.decode_cursor(cursor) == (0.0607927, 1234)
+
+def test_search_cursor_keeps_the_exact_rank():
+    rank = 1 / 3
+    assert SearchService.decode_cursor(SearchService.encode_cursor(rank, 1))[0] == rank
+
+@pytest.mark.parametrize("decode", [ConversationService.decode_cursor, SearchService.decode_cursor])
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "W10", "WyJ4Il0", "eyJhIjogMX0"])
+def test_malformed_cursors_raise_value_error(decode, cursor):
+    with pytest.raises(ValueError):
+        decode(cursor)
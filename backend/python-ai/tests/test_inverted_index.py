@@ -0,0 +1,80 @@
+"""
+Tests for the BM25 inverted index used by conversation search
+"""
+
+from app.utils.inverted_index import InvertedIndex, tokenize
+
+def build(documents) -> InvertedIndex:
+    index = InvertedIndex()
+    for doc_id, (text, owner) in documents.items():
+        index.add(doc_id, text, owner)
+    return index
+
+def test_tokenize_lowercases_and_drops_stop_words():
+    assert tokenize("I am SO tired of the Night shifts") == ["so", "tired", "night", "shifts"]
+
+def test_every_query_term_must_match():
+    index = build({
+        1: ("trouble sleeping before exams", None),
+        2: ("exams went well", None),
+        3: ("sleeping better lately", None)
+    })
+    assert [doc_id for _, doc_id in index.search("exams sleeping")] == [1]
+    assert index.search("exams holiday") == []
+    assert index.search("the and of") == []
+
+def test_higher_term_frequency_ranks_first():
+    index = build({
+        1: ("anxious today", None),
+        2: ("anxious anxious anxious today", None),
+        3: ("calm today", None)
+    })
+    results = index.search("anxious")
+    assert [doc_id for _, doc_id in results] == [2, 1]
+    assert results[0][0] > results[1][0] > 0
+
+def test_shorter_documents_rank_first_for_equal_frequency():
+    index = build({
+        1: ("work stress", None),
+        2: ("work stress deadlines meetings commute overtime", None)
+    })
+    assert [doc_id for _, doc_id in index.search("stress")] == [1, 2]
+
+def test_rare_terms_weigh_more():
+    index = build({
+        1: ("panic work", None),
+        2: ("work", None),
+        3: ("work", None),
+        4: ("work", None)
+    })
+    (panic_score, _), = index.search("panic")
+    work_scores = [score for score, doc_id in index.search("work") if doc_id != 1]
+    assert all(panic_score > score for score in work_scores)
+
+def test_ties_put_the_highest_id_first():
+    index = build({1: ("lonely", None), 2: ("lonely", None), 3: ("lonely", None)})
+    assert [doc_id for _, doc_id in index.search("lonely")] == [3, 2, 1]
+
+def test_owner_filter():
+    index = build({1: ("grief", 7), 2: ("grief", 8), 3: ("grief", None)})
+    assert [doc_id for _, doc_id in index.search("grief", owner=7)] == [1]
+    assert len(index.search("grief")) == 3
+
+def test_replace_and_remove():
+    index = build({1: ("stressed about money", None), 2: ("money is fine", None)})
+    index.add(1, "stressed about school", None)
+    assert [doc_id for _, doc_id in index.search("money")] == [2]
+    assert [doc_id for _, doc_id in index.search("school")] == [1]
+
+    index.remove(2)
+    index.remove(99)
+    assert index.search("money") == []
+    assert len(index) == 1
+    assert index.last_id == 2
+
+def test_clear():
+    index = build({5: ("hopeful", None)})
+    index.clear()
+    assert len(index) == 0
+    assert index.last_id == 0
+    assert index.search("hopeful") == []
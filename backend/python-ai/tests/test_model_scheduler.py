@@ -0,0 +1,99 @@
+"""
+Tests for the model scheduler's token bucket and retry-hint parsing
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import model_scheduler
+from app.services.model_scheduler import TokenBucket, parse_retry_after
+
+class FakeClock:
+    """Stands in for time.monotonic so refills are deterministic"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    fake = FakeClock()
+    monkeypatch.setattr(model_scheduler.time, "monotonic", fake)
+    return fake
+
+def test_bucket_starts_full(clock):
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.capacity == 60
+    assert bucket.delay_for(60) == 0.0
+
+def test_delay_until_refilled(clock):
+    bucket = TokenBucket(per_minute=60)
+    bucket.take(60)
+    assert bucket.delay_for(1) == pytest.approx(1.0)
+    assert bucket.delay_for(30) == pytest.approx(30.0)
+
+    clock.now += 10
+    assert bucket.delay_for(10) == 0.0
+    assert bucket.delay_for(15) == pytest.approx(5.0)
+
+def test_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(per_minute=60, capacity=10)
+    bucket.take(10)
+    clock.now += 3600
+    bucket.take(0)
+    assert bucket.tokens == pytest.approx(10)
+
+def test_overdraw_delays_following_requests(clock):
+    bucket = TokenBucket(per_minute=60)
+    bucket.take(90)
+    assert bucket.tokens == pytest.approx(-30)
+    assert bucket.delay_for(1) == pytest.approx(31.0)
+
+def test_requests_larger_than_capacity_wait_for_a_full_bucket(clock):
+    bucket = TokenBucket(per_minute=60)
+    bucket.take(60)
+    assert bucket.delay_for(600) == pytest.approx(60.0)
+
+def test_give_back_returns_unused_tokens(clock):
+    bucket = TokenBucket(per_minute=60)
+    bucket.take(50)
+    bucket.give_back(20)
+    assert bucket.tokens == pytest.approx(30)
+    bucket.give_back(1000)
+    assert bucket.tokens == pytest.approx(60)
+
+def test_zero_rate_disables_the_bucket(clock):
+    bucket = TokenBucket(per_minute=0)
+    assert not bucket.enabled
+    bucket.take(100)
+    assert bucket.delay_for(100) == 0.0
+
+def test_retry_after_from_retry_info_details():
+    error = Exception("quota exceeded")
+    error.details = [SimpleNamespace(retry_delay=SimpleNamespace(seconds=7, nanos=500_000_000))]
+    assert parse_retry_after(error) == pytest.approx(7.5)
+
+def test_retry_after_from_response_header():
+    error = Exception("429 Too Many Requests")
+    error.response = SimpleNamespace(headers={"Retry-After": "3"})
+    assert parse_retry_after(error) == 3.0
+
+def test_unparseable_header_falls_back_to_the_message():
+    error = Exception("Please retry in 2s.")
+    error.response = SimpleNamespace(headers={"Retry-After": "Wed, 21 Oct 2026 07:28:00 GMT"})
+    assert parse_retry_after(error) == 2.0
+
+@pytest.mark.parametrize("message, expected", [
+    ("429 Resource has been exhausted. Please retry in 12.3s.", 12.3),
+    ("Please RETRY IN 250ms", 0.25),
+    ("429 quota exceeded [retry_delay {\n  seconds: 4\n}]", 4.0),
+    ("retry_delay { seconds: 1 nanos: 250000000 }", 1.25),
+])
+def test_retry_after_from_message(message, expected):
+    assert parse_retry_after(Exception(message)) == pytest.approx(expected)
+
+def test_no_retry_hint():
+    assert parse_retry_after(Exception("500 Internal error")) is None
@@ -0,0 +1,140 @@
+"""
+Tests for the extractive conversation summarizer
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.models.database import Base, Conversation, ConversationSummary
+from app.services import summary_service
+from app.services.context_store import ConversationTurn
+from app.services.summary_service import ConversationSummarizer
+from app.utils.summarization import FEELINGS_PREFIX, POINTS_HEADER, TOPICS_PREFIX, ExtractiveSummarizer
+
+def turn(user_message: str) -> ConversationTurn:
+    return ConversationTurn(id=None, user_message=user_message, ai_response="I hear you.")
+
+def test_summary_lists_topics_feelings_and_opening_sentences():
+    summary = ExtractiveSummarizer().summarize(None, [
+        turn("I feel anxious about my exams. They start next week."),
+        turn("My exams and work deadlines make me anxious and sad.")
+    ])
+    lines = summary.splitlines()
+    assert lines[0].startswith(TOPICS_PREFIX)
+    assert "exams" in lines[0]
+    assert lines[1] == FEELINGS_PREFIX + "anxious, sad"
+    assert lines[2] == POINTS_HEADER
+    assert lines[3:] == [
+        "- I feel anxious about my exams.",
+        "- My exams and work deadlines make me anxious and sad."
+    ]
+
+def test_summary_is_deterministic():
+    turns = [turn("Work has been stressful and I can't sleep.")]
+    assert ExtractiveSummarizer().summarize(None, turns) == ExtractiveSummarizer().summarize(None, turns)
+
+def test_folding_keeps_earlier_summary_with_newest_first():
+    summarizer = ExtractiveSummarizer()
+    first = summarizer.summarize(None, [turn("I feel anxious about my exams.")])
+    second = summarizer.summarize(first, [turn("Work is better now, I am happy!")])
+    lines = second.splitlines()
+    assert lines[1] == FEELINGS_PREFIX + "happy, anxious"
+    assert lines[-2:] == ["- I feel anxious about my exams.", "- Work is better now, I am happy!"]
+    assert lines[0].startswith(TOPICS_PREFIX + "work")
+    assert "feel anxious" in lines[0]
+
+def test_only_the_most_recent_points_are_kept():
+    summarizer = ExtractiveSummarizer(max_points=2)
+    summary = summarizer.summarize(None, [turn(f"Message number {i}.") for i in range(5)])
+    assert summary.splitlines()[-2:] == ["- Message number 3.", "- Message number 4."]
+
+def test_long_statements_and_summaries_are_cut():
+    summarizer = ExtractiveSummarizer(max_point_chars=20, max_chars=120)
+    summary = summarizer.summarize(None, [turn("word " * 50) for _ in range(10)])
+    assert len(summary) <= 120
+    points = [line for line in summary.splitlines() if line.startswith("- ")]
+    assert points and all(len(point) <= 2 + 20 and point.endswith("...") for point in points)
+
+def test_empty_messages_give_an_empty_summary():
+    assert ExtractiveSummarizer().summarize(None, [turn("")]) == ""
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    """Point the summarizer at a fresh SQLite database"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'summaries.db'}", poolclass=NullPool)
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_tables())
+    factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    monkeypatch.setattr(summary_service, "AsyncSessionLocal", factory)
+    return factory
+
+def add_turns(sessions, user_ids) -> list:
+    """Save one conversation per entry of user_ids, returning their IDs"""
+    async def save():
+        async with sessions() as db:
+            result = await db.execute(insert(Conversation).returning(Conversation.id, sort_by_parameter_order=True), [
+                {"user_message": f"Turn {i} about my exams.", "ai_response": "I hear you.", "user_id": user_id}
+                for i, user_id in enumerate(user_ids)
+            ])
+            ids = list(result.scalars())
+            await db.commit()
+            return ids
+    return asyncio.run(save())
+
+def stored_summary(sessions, user_id):
+    async def load():
+        async with sessions() as db:
+            return await db.get(ConversationSummary, user_id)
+    return asyncio.run(load())
+
+def make_summarizer(keep_recent_turns=2, max_turns_per_run=2) -> ConversationSummarizer:
+    return ConversationSummarizer(
+        enabled=True,
+        trigger_turns=1,
+        keep_recent_turns=keep_recent_turns,
+        max_turns_per_run=max_turns_per_run,
+        max_chars=1000,
+        backend="local",
+        cache_size=10
+    )
+
+def test_newest_turns_are_left_out_of_the_summary(sessions):
+    # User 2's turns are interleaved and must not count towards user 1's
+    ids = add_turns(sessions, [1, 2, 1, 2, 1, 1, 1])
+    summarizer = make_summarizer()
+
+    # Batches of two until the cutoff: user 1's three oldest turns
+    assert asyncio.run(summarizer.summarize_user(1)) == 3
+    row = stored_summary(sessions, 1)
+    assert row.last_conversation_id == ids[4]
+    assert row.turns_summarized == 3
+    assert "Turn 4" in row.summary and "Turn 5" not in row.summary
+    assert stored_summary(sessions, 2) is None
+
+def test_later_runs_continue_after_the_last_summarized_turn(sessions):
+    ids = add_turns(sessions, [1, 1, 1])
+    summarizer = make_summarizer()
+    assert asyncio.run(summarizer.summarize_user(1)) == 1
+
+    ids += add_turns(sessions, [1, 1])
+    assert asyncio.run(summarizer.summarize_user(1)) == 2
+    row = stored_summary(sessions, 1)
+    assert row.last_conversation_id == ids[2]
+    assert row.turns_summarized == 3
+
+    # Nothing new has aged past the cutoff
+    assert asyncio.run(summarizer.summarize_user(1)) == 0
+    assert stored_summary(sessions, 1).last_conversation_id == ids[2]
+
+def test_users_with_only_recent_turns_get_no_summary(sessions):
+    add_turns(sessions, [1, 1])
+    assert asyncio.run(make_summarizer().summarize_user(1)) == 0
+    assert stored_summary(sessions, 1) is None
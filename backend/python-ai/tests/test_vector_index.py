@@ -0,0 +1,121 @@
+"""
+Tests for the IVF vector index behind conversation memory
+"""
+
+import numpy as np
+import pytest
+
+from app.utils.vector_index import INITIAL_CAPACITY, IVFIndex
+
+DIM = 16
+
+def unit(vector: np.ndarray) -> np.ndarray:
+    return (vector / np.linalg.norm(vector)).astype(np.float32)
+
+def random_vectors(count: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.stack([unit(rng.normal(size=DIM)) for _ in range(count)])
+
+def exact_top(vectors: np.ndarray, ids, query: np.ndarray, k: int):
+    scores = vectors @ query
+    return [ids[i] for i in np.argsort(-scores, kind="stable")[:k]]
+
+def test_exhaustive_search_is_exact():
+    vectors = random_vectors(50)
+    index = IVFIndex(DIM, train_threshold=1000)
+    for doc_id, vector in enumerate(vectors, start=1):
+        index.add(doc_id, vector)
+
+    query = vectors[9]
+    results = index.search(query, 5)
+    assert not index.trained
+    assert [doc_id for _, doc_id in results] == exact_top(vectors, list(range(1, 51)), query, 5)
+    assert results[0] == (pytest.approx(1.0), 10)
+    assert [score for score, _ in results] == sorted((score for score, _ in results), reverse=True)
+
+def test_search_leaves_out_excluded_ids():
+    vectors = random_vectors(20)
+    index = IVFIndex(DIM, train_threshold=1000)
+    for doc_id, vector in enumerate(vectors, start=1):
+        index.add(doc_id, vector)
+
+    results = index.search(vectors[0], 3, exclude=[1, 2])
+    ids = [doc_id for _, doc_id in results]
+    assert len(ids) == 3 and 1 not in ids and 2 not in ids
+    assert ids == [doc_id for doc_id in exact_top(vectors, list(range(1, 21)), vectors[0], 5) if doc_id not in (1, 2)][:3]
+
+def test_search_edge_cases():
+    index = IVFIndex(DIM)
+    assert index.search(random_vectors(1)[0], 3) == []
+    index.add(1, random_vectors(1)[0])
+    assert index.search(random_vectors(1)[0], 0) == []
+    assert len(index.search(random_vectors(1)[0], 10)) == 1
+
+def test_training_clusters_and_finds_self_matches():
+    vectors = random_vectors(400)
+    index = IVFIndex(DIM, nprobe=4, train_threshold=256)
+    for doc_id, vector in enumerate(vectors):
+        index.add(doc_id, vector)
+
+    assert index.trained
+    assert index.stats()["lists"] == round(np.sqrt(256))
+    # A stored vector is always in the closest list, so it finds itself
+    for doc_id in (0, 123, 399):
+        assert index.search(vectors[doc_id], 1)[0][1] == doc_id
+
+def test_retrains_after_doubling():
+    index = IVFIndex(DIM, train_threshold=64)
+    for doc_id, vector in enumerate(random_vectors(128)):
+        index.add(doc_id, vector)
+    assert index.stats()["lists"] == round(np.sqrt(128))
+
+def test_add_replaces_a_documents_vector():
+    first, second = random_vectors(2)
+    index = IVFIndex(DIM)
+    index.add(1, first)
+    index.add(1, second)
+    assert len(index) == 1
+    assert index.search(second, 1) == [(pytest.approx(1.0), 1)]
+
+def test_remove_and_compact():
+    vectors = random_vectors(100)
+    index = IVFIndex(DIM, train_threshold=1000)
+    for doc_id, vector in enumerate(vectors):
+        index.add(doc_id, vector)
+    capacity = index.nbytes
+
+    for doc_id in range(80):
+        index.remove(doc_id)
+    index.remove(1000)
+    assert len(index) == 20
+    assert 5 not in index and 95 in index
+    # Tombstones were compacted away and the storage shrank
+    assert index.nbytes < capacity
+    assert {doc_id for _, doc_id in index.search(vectors[0], 100)} == set(range(80, 100))
+    assert index.search(vectors[90], 1)[0][1] == 90
+
+def test_trim_keeps_the_newest_ids():
+    vectors = random_vectors(300)
+    index = IVFIndex(DIM, train_threshold=128)
+    for doc_id, vector in enumerate(vectors):
+        index.add(doc_id, vector)
+    assert index.trained
+
+    index.trim(100)
+    assert len(index) == 100
+    assert min(doc_id for _, doc_id in index.search(vectors[250], 300)) >= 200
+    # Too few vectors left to cluster: back to exact search
+    assert not index.trained
+    assert index.search(vectors[250], 1)[0][1] == 250
+
+    index.trim(500)
+    assert len(index) == 100
+
+def test_storage_grows_and_shrinks_in_powers_of_two():
+    index = IVFIndex(DIM, train_threshold=1000)
+    empty = index.nbytes
+    for doc_id, vector in enumerate(random_vectors(INITIAL_CAPACITY + 1)):
+        index.add(doc_id, vector)
+    assert index.nbytes == 2 * empty
+    index.trim(1)
+    assert index.nbytes == empty
@@ -0,0 +1,29 @@
+-- Pre-aggregated conversation counts for analytics
+-- This script runs after 03-intake-forms.sql
+
+-- One row per (granularity, bucket):
+--   'hour'  - UTC hour buckets
+--   'day'   - UTC day buckets (their sum is the overall count)
+-- The Python AI service increments these on every save/delete and
+-- periodically reconciles recent buckets against the conversations table.
+CREATE TABLE IF NOT EXISTS conversation_rollups (
+    granularity VARCHAR(16) NOT NULL,
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    conversation_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket)
+);
+
+-- Backfill from existing conversations
+INSERT INTO conversation_rollups (granularity, bucket, conversation_count)
+SELECT 'hour', date_trunc('hour', timestamp, 'UTC'), COUNT(*)
+FROM conversations
+GROUP BY date_trunc('hour', timestamp, 'UTC')
+ON CONFLICT (granularity, bucket) DO NOTHING;
+
+INSERT INTO conversation_rollups (granularity, bucket, conversation_count)
+SELECT 'day', date_trunc('day', timestamp, 'UTC'), COUNT(*)
+FROM conversations
+GROUP BY date_trunc('day', timestamp, 'UTC')
+ON CONFLICT (granularity, bucket) DO NOTHING;
+
+COMMENT ON TABLE conversation_rollups IS 'Incrementally maintained conversation counts (per UTC day and per UTC hour)';
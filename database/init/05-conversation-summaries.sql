@@ -0,0 +1,15 @@
+-- Running summaries of older conversation turns, one per user
+-- This script runs after 04-analytics-rollups.sql
+
+-- Written by the Python AI service's background summarizer. Each summary
+-- covers the user's conversations up to last_conversation_id; newer turns
+-- are sent to the model verbatim.
+CREATE TABLE IF NOT EXISTS conversation_summaries (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    summary TEXT NOT NULL,
+    last_conversation_id INTEGER NOT NULL DEFAULT 0,
+    turns_summarized INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE conversation_summaries IS 'Rolling per-user summaries of older conversation turns';
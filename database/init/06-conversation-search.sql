@@ -0,0 +1,14 @@
+-- Full-text search over conversations
+-- This script runs after 05-conversation-summaries.sql
+
+-- Kept up to date by Postgres itself; the Python AI service's
+-- /conversations/search endpoint matches and ranks against it.
+ALTER TABLE conversations
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        to_tsvector('english', coalesce(user_message, '') || ' ' || coalesce(ai_response, ''))
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_conversations_search ON conversations USING GIN (search_vector);
+
+COMMENT ON COLUMN conversations.search_vector IS 'Full-text search document of the user message and AI response';
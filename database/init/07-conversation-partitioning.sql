@@ -0,0 +1,113 @@
+-- Monthly range partitioning of conversations, with archival of old months
+-- This script runs after 06-conversation-search.sql
+
+-- conversations is rebuilt as a table partitioned by UTC month on timestamp,
+-- named conversations_pYYYYMM, so queries on recent data only touch the
+-- newest partitions and old months can be removed as a whole. Rows outside
+-- every monthly partition land in conversations_default.
+--
+-- The Python AI service creates upcoming partitions ahead of time and
+-- exports months past its retention window to compressed JSONL files before
+-- detaching (and by default dropping) them; conversation_archives records
+-- where each archived month went so records can still be read by id.
+
+-- Create the partition for the UTC month containing month_start (no-op if it exists)
+CREATE OR REPLACE FUNCTION create_conversation_partition(month_start DATE)
+RETURNS TEXT AS $$
+DECLARE
+    start_at TIMESTAMP := date_trunc('month', month_start::timestamp);
+    partition_name TEXT := 'conversations_p' || to_char(start_at, 'YYYYMM');
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF conversations FOR VALUES FROM (%L) TO (%L)',
+        partition_name,
+        start_at AT TIME ZONE 'UTC',
+        (start_at + INTERVAL '1 month') AT TIME ZONE 'UTC'
+    );
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    first_month DATE;
+    current_month DATE := date_trunc('month', now() AT TIME ZONE 'UTC');
+    month_start DATE;
+BEGIN
+    -- Already partitioned
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'conversations'::regclass) THEN
+        RETURN;
+    END IF;
+
+    -- Move the existing table aside, freeing its index and constraint names
+    ALTER TABLE conversations RENAME TO conversations_unpartitioned;
+    ALTER TABLE conversations_unpartitioned RENAME CONSTRAINT conversations_pkey TO conversations_unpartitioned_pkey;
+    DROP INDEX IF EXISTS idx_conversations_timestamp;
+    DROP INDEX IF EXISTS idx_conversations_user_id;
+    DROP INDEX IF EXISTS idx_conversations_search;
+    -- Keep issuing ids from the same sequence
+    ALTER SEQUENCE conversations_id_seq OWNED BY NONE;
+
+    -- The partition key must be part of the primary key; ids stay unique
+    -- on their own because they all come from conversations_id_seq
+    CREATE TABLE conversations (
+        id INTEGER NOT NULL DEFAULT nextval('conversations_id_seq'),
+        user_message TEXT NOT NULL,
+        ai_response TEXT NOT NULL,
+        timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        user_id INTEGER REFERENCES users(id),
+        search_vector tsvector GENERATED ALWAYS AS (
+            to_tsvector('english', coalesce(user_message, '') || ' ' || coalesce(ai_response, ''))
+        ) STORED,
+        PRIMARY KEY (id, timestamp)
+    ) PARTITION BY RANGE (timestamp);
+    ALTER SEQUENCE conversations_id_seq OWNED BY conversations.id;
+
+    -- One partition per month from the oldest conversation to three months ahead
+    SELECT date_trunc('month', min(coalesce(timestamp, created_at)) AT TIME ZONE 'UTC')
+    INTO first_month
+    FROM conversations_unpartitioned;
+    FOR month_start IN
+        SELECT generate_series(coalesce(first_month, current_month), current_month + INTERVAL '3 months', INTERVAL '1 month')::date
+    LOOP
+        PERFORM create_conversation_partition(month_start);
+    END LOOP;
+    CREATE TABLE conversations_default PARTITION OF conversations DEFAULT;
+
+    INSERT INTO conversations (id, user_message, ai_response, timestamp, created_at, updated_at, user_id)
+    SELECT id, user_message, ai_response, coalesce(timestamp, created_at, CURRENT_TIMESTAMP), created_at, updated_at, user_id
+    FROM conversations_unpartitioned;
+
+    DROP TABLE conversations_unpartitioned;
+END $$;
+
+-- Indexes on the parent are created on every partition, present and future
+CREATE INDEX IF NOT EXISTS idx_conversations_timestamp ON conversations(timestamp);
+CREATE INDEX IF NOT EXISTS idx_conversations_user_id ON conversations(user_id);
+CREATE INDEX IF NOT EXISTS idx_conversations_search ON conversations USING GIN (search_vector);
+
+DROP TRIGGER IF EXISTS update_conversations_updated_at ON conversations;
+CREATE TRIGGER update_conversations_updated_at
+    BEFORE UPDATE ON conversations
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- One row per archived monthly partition
+CREATE TABLE IF NOT EXISTS conversation_archives (
+    partition_name VARCHAR(63) PRIMARY KEY,
+    range_start TIMESTAMP WITH TIME ZONE NOT NULL,
+    range_end TIMESTAMP WITH TIME ZONE NOT NULL,
+    min_id INTEGER,
+    max_id INTEGER,
+    row_count BIGINT NOT NULL DEFAULT 0,
+    file_path TEXT NOT NULL,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_conversation_archives_ids ON conversation_archives(min_id, max_id);
+
+COMMENT ON TABLE conversations IS 'Chat turns, range partitioned by UTC month on timestamp';
+COMMENT ON COLUMN conversations.search_vector IS 'Full-text search document of the user message and AI response';
+COMMENT ON TABLE conversation_archives IS 'Monthly conversation partitions exported to compressed JSONL files';